@@ -0,0 +1,186 @@
+#api.py
+# Versioned, read-only JSON API (/api/v1) for the map and mobile clients.
+# Every route works out a validator first and answers a matching
+# conditional GET with an empty 304 before loading or serializing anything.
+import math
+
+from flask import Blueprint, request, jsonify
+from flask_login import login_required, current_user
+
+from models import db, User, FoodPost
+from schemas import POST_SCHEMA, POST_DETAIL_FIELDS, USER_SCHEMA, REQUEST_SCHEMA
+from http_cache import make_etag, not_modified, set_validators
+from queries import (LIVE_POST_FILTER, PAGE_SIZE, MAX_PAGE_SIZE, post_record_page, nearby_page, decode_cursor,
+                     decode_distance_cursor, live_feed_stamp, dashboard_stamp, post_with_author,
+                     posts_with_requests, requests_with_posts, ratings_by_request)
+from cache import live_posts
+from search import search_posts, search_nearby
+
+api_v1 = Blueprint('api_v1', __name__, url_prefix='/api/v1')
+
+
+class BadRequest(ValueError):
+    pass
+
+
+@api_v1.errorhandler(BadRequest)
+def bad_request(e):
+    return jsonify({"error": str(e)}), 400
+
+
+def page_args(ranked=False, nearby=False):
+    """
+    (cursor, limit) from the query string; ranked results use an offset as
+    the cursor, nearby ones a (distance, id) key.
+    """
+    cursor = request.args.get('cursor') or None
+    try:
+        if cursor and ranked:
+            if int(cursor) < 0:
+                raise ValueError(cursor)
+        elif cursor and nearby:
+            decode_distance_cursor(cursor)
+        elif cursor:
+            decode_cursor(cursor)
+        limit = int(request.args.get('limit', PAGE_SIZE))
+    except ValueError:
+        raise BadRequest("Invalid cursor or limit.")
+    if not 0 < limit <= MAX_PAGE_SIZE:
+        raise BadRequest(f"limit must be between 1 and {MAX_PAGE_SIZE}.")
+    return cursor, limit
+
+
+def fields_arg(schema, default=None):
+    if not request.args.get('fields') and default:
+        return default
+    try:
+        return schema.parse_fields(request.args.get('fields'))
+    except ValueError as e:
+        raise BadRequest(str(e))
+
+
+def location_args():
+    """(lat, lon, radius_km), or None when the request isn't a nearby search."""
+    if 'lat' not in request.args and 'lon' not in request.args:
+        return None
+    try:
+        lat = float(request.args['lat'])
+        lon = float(request.args['lon'])
+        radius_km = float(request.args.get('radius_km', 5))
+    except (KeyError, ValueError):
+        raise BadRequest("Invalid location or radius parameters.")
+    # nan fails every comparison, so test finiteness first
+    if not math.isfinite(radius_km) or radius_km <= 0 or not -90 <= lat <= 90 or not -180 <= lon <= 180:
+        raise BadRequest("Invalid location or radius parameters.")
+    return lat, lon, radius_km
+
+
+# --- Posts ---
+@api_v1.route('/posts')
+@login_required
+def posts():
+    """
+    Live posts, newest first; with lat/lon (and radius_km) only those nearby,
+    closest first, with distance_km. With q, only posts matching the text,
+    best match first.
+    """
+    q = request.args.get('q', '').strip()
+    location = location_args()
+    cursor, limit = page_args(ranked=bool(q), nearby=location is not None)
+    fields = fields_arg(POST_SCHEMA)
+
+    # ETag only: a deleted post doesn't move the newest update stamp, so a
+    # Last-Modified date would 304 a list that lost a row (the count catches it)
+    etag = make_etag(*live_feed_stamp())
+    cached = not_modified(etag)
+    if cached:
+        return cached
+
+    if q:
+        # Ranked by relevance, so paged by offset: the cursor is a plain number here
+        offset = int(cursor or 0)
+        if location:
+            records, in_range, next_offset = search_nearby(q, *location, *LIVE_POST_FILTER,
+                                                           offset=offset, limit=limit)
+            data = [POST_SCHEMA.dump(post, fields, distance_km=round(in_range[post.id], 2)) for post in records]
+        else:
+            records = search_posts(q, *LIVE_POST_FILTER, limit=limit + 1, offset=offset)
+            next_offset = offset + limit if len(records) > limit else None
+            data = POST_SCHEMA.dump_many(records[:limit], fields)
+        next_cursor = str(next_offset) if next_offset is not None else None
+    elif location:
+        records, in_range, next_cursor = nearby_page(*location, cursor, limit)
+        data = [POST_SCHEMA.dump(post, fields, distance_km=round(in_range[post.id], 2)) for post in records]
+    else:
+        if limit == PAGE_SIZE:  # the home page's pages, so share its cache entries
+            records, next_cursor = live_posts.get(('home', cursor), lambda: post_record_page(
+                *LIVE_POST_FILTER, cursor=cursor))
+        else:
+            records, next_cursor = post_record_page(*LIVE_POST_FILTER, cursor=cursor, limit=limit)
+        data = POST_SCHEMA.dump_many(records, fields)
+    return set_validators(jsonify({"posts": data, "next_cursor": next_cursor}), etag)
+
+
+@api_v1.route('/posts/<int:post_id>')
+@login_required
+def post_detail(post_id):
+    fields = fields_arg(POST_SCHEMA, default=POST_DETAIL_FIELDS)
+    stamp = FoodPost.query.with_entities(FoodPost.updated_at).filter_by(id=post_id).first_or_404()
+    last_modified = stamp.updated_at
+    etag = make_etag(post_id, last_modified)
+    cached = not_modified(etag, last_modified)
+    if cached:
+        return cached
+
+    post = post_with_author(post_id)
+    return set_validators(jsonify(POST_SCHEMA.dump(post, fields)), etag, last_modified)
+
+
+# --- Profiles ---
+@api_v1.route('/users/<username>')
+@login_required
+def user_profile(username):
+    fields = fields_arg(USER_SCHEMA)
+    # Fresh row, not the cached current_user: the ETag comes from its updated_at
+    user = User.query.filter_by(username=username).populate_existing().first_or_404()
+    # The stats are counters on the user row, so its stamp covers the whole profile
+    etag = make_etag(user.id, user.updated_at)
+    cached = not_modified(etag, user.updated_at)
+    if cached:
+        return cached
+    return set_validators(jsonify(USER_SCHEMA.dump(user, fields)), etag, user.updated_at)
+
+
+# --- Dashboard ---
+@api_v1.route('/dashboard')
+@login_required
+def dashboard():
+    """The current user's stats, posts (with incoming requests) and pickup requests."""
+    fields = fields_arg(POST_SCHEMA)
+    # ETag only, like the post list: the counts in the stamp are what catch deletes
+    etag = make_etag(current_user.id, *dashboard_stamp(current_user.id))
+    cached = not_modified(etag)
+    if cached:
+        return cached
+
+    my_posts = posts_with_requests(current_user)
+    my_requests = requests_with_posts(current_user)
+    ratings = ratings_by_request([req.id for post in my_posts for req in post.requests] +
+                                 [req.id for req in my_requests])
+
+    def dump_request(req):
+        rating = ratings.get(req.id)
+        return REQUEST_SCHEMA.dump(req, rating=rating.score if rating else None)
+
+    posts_data = []
+    for post in my_posts:
+        item = POST_SCHEMA.dump(post, fields)
+        item['requests'] = [dump_request(req) for req in post.requests]
+        posts_data.append(item)
+
+    user = db.session.get(User, current_user.id, populate_existing=True)  # fresh stats, not the cached row
+    return set_validators(jsonify({
+        "stats": USER_SCHEMA.dump(user),
+        "posts": posts_data,
+        "requests": [dump_request(req) for req in my_requests],
+    }), etag)
@@ -0,0 +1,60 @@
+#bench_distance.py
+# Batch distance engine (geo.nearest) vs. calling the scalar haversine()
+# once per point, at 1k, 10k and 100k points.
+#
+# Usage (from backend/):  python benchmarks/bench_distance.py
+import os
+import random
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+import geo  # noqa: E402
+
+SIZES = [1000, 10000, 100000]
+ORIGIN = (19.0760, 72.8777)
+RADIUS_KM = 50
+
+
+def per_row(lats, lons):
+    hits = []
+    for i, (lat, lon) in enumerate(zip(lats, lons)):
+        distance = geo.haversine(ORIGIN[0], ORIGIN[1], lat, lon)
+        if distance <= RADIUS_KM:
+            hits.append((i, distance))
+    hits.sort(key=lambda p: p[1])
+    return hits
+
+
+def batch(lats, lons):
+    return geo.nearest(ORIGIN[0], ORIGIN[1], lats, lons, max_km=RADIUS_KM)
+
+
+def best_of(fn, repeat=5):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1000
+
+
+def main():
+    rng = random.Random(42)
+    backend = 'numpy' if geo.np is not None else 'pure-python'
+    print(f'batch backend: {backend}')
+    print(f'{"points":>8} {"per_row_ms":>11} {"batch_ms":>9} {"speedup":>8}')
+    for size in SIZES:
+        lats = [ORIGIN[0] + rng.uniform(-2, 2) for _ in range(size)]
+        lons = [ORIGIN[1] + rng.uniform(-2, 2) for _ in range(size)]
+        assert [i for i, _ in per_row(lats, lons)] == [i for i, _ in batch(lats, lons)]
+        row_ms = best_of(lambda: per_row(lats, lons))
+        batch_ms = best_of(lambda: batch(lats, lons))
+        print(f'{size:>8} {row_ms:>11.2f} {batch_ms:>9.2f} {row_ms / batch_ms:>7.1f}x')
+
+
+if __name__ == '__main__':
+    main()
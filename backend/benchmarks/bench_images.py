@@ -0,0 +1,81 @@
+#bench_images.py
+# Processing time and byte savings of imaging.process_image.
+# Without --corpus it generates phone-sized JPEGs (with EXIF) to work on.
+#
+# Usage (from backend/):  python benchmarks/bench_images.py [--corpus DIR]
+import argparse
+import io
+import os
+import random
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from PIL import Image, ImageDraw, ImageFilter  # noqa: E402
+
+from imaging import process_image, output_format  # noqa: E402
+
+SYNTHETIC_SIZES = [(4032, 3024), (3024, 4032), (4000, 3000), (2560, 1920), (1280, 960)]
+
+
+def synthetic_photo(size, rng):
+    """A noisy, blurred 'photo' with an EXIF block, saved as a camera-quality JPEG."""
+    img = Image.effect_noise(size, 60).convert('RGB')
+    draw = ImageDraw.Draw(img)
+    for _ in range(40):
+        x, y = rng.randrange(size[0]), rng.randrange(size[1])
+        r = rng.randrange(50, 600)
+        color = tuple(rng.randrange(256) for _ in range(3))
+        draw.ellipse((x - r, y - r, x + r, y + r), fill=color)
+    img = img.filter(ImageFilter.GaussianBlur(2))
+    exif = Image.Exif()
+    exif[0x0112] = 6            # Orientation: rotate 90
+    exif[0x010F] = 'BenchCam'   # Make
+    buf = io.BytesIO()
+    img.save(buf, 'JPEG', quality=92, exif=exif)
+    return buf.getvalue()
+
+
+def load_corpus(path):
+    for name in sorted(os.listdir(path)):
+        with open(os.path.join(path, name), 'rb') as f:
+            yield name, f.read()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--corpus', help='directory of sample images')
+    parser.add_argument('--count', type=int, default=10, help='synthetic images to generate')
+    args = parser.parse_args()
+
+    if args.corpus:
+        samples = list(load_corpus(args.corpus))
+    else:
+        rng = random.Random(42)
+        samples = [(f'synthetic_{i}_{w}x{h}.jpg', synthetic_photo((w, h), rng))
+                   for i, (w, h) in enumerate(SYNTHETIC_SIZES[i % len(SYNTHETIC_SIZES)] for i in range(args.count))]
+
+    print(f'output format: {output_format()[0]}')
+    print(f'{"image":<32} {"in_kb":>8} {"out_kb":>8} {"thumb_kb":>9} {"saved":>6} {"ms":>7}')
+    total_in = total_out = total_thumb = total_ms = 0
+    for name, data in samples:
+        start = time.perf_counter()
+        result = process_image(data)
+        ms = (time.perf_counter() - start) * 1000
+        total_in += len(data)
+        total_out += len(result.data)
+        total_thumb += len(result.thumbnail)
+        total_ms += ms
+        saved = 1 - len(result.data) / len(data)
+        print(f'{name:<32} {len(data) / 1024:>8.0f} {len(result.data) / 1024:>8.0f} '
+              f'{len(result.thumbnail) / 1024:>9.1f} {saved:>6.0%} {ms:>7.1f}')
+
+    print(f'{"total":<32} {total_in / 1024:>8.0f} {total_out / 1024:>8.0f} '
+          f'{total_thumb / 1024:>9.1f} {1 - total_out / total_in:>6.0%} {total_ms:>7.1f}')
+    print(f'A card now downloads the thumbnail: {total_thumb / total_in:.1%} of the original bytes.')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+#bench_nearby.py
+# Latency of /api/nearby_posts with the geohash + bounding-box prefilter,
+# cold and from the quantized result cache (a query from a few hundred
+# metres away, as when the marker is dragged), compared with the old
+# full-table haversine scan. Also checks that cached answers match the scan
+# and that paging through them returns every post, closest first.
+#
+# Usage (from backend/):  python benchmarks/bench_nearby.py [--posts 100000]
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+_db_dir = tempfile.mkdtemp(prefix='leftoverlink-bench-')
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(_db_dir, 'bench.db')
+os.environ.setdefault('SECRET_KEY', 'bench')
+
+from app import app  # noqa: E402
+from models import db, User, FoodPost  # noqa: E402
+from geo import haversine, encode_geohash  # noqa: E402
+from cache import nearby_results  # noqa: E402
+from queries import nearby_candidates  # noqa: E402
+
+CENTER = (19.0760, 72.8777)  # Mumbai
+SPREAD_DEG = 2.0             # posts are scattered over roughly 450 x 450 km
+RADII_KM = [1, 5, 10, 25, 50]
+
+
+def seed(num_posts):
+    rng = random.Random(42)
+    user = User(username='bench', email='bench@example.com', password_hash='x')
+    db.session.add(user)
+    db.session.commit()
+
+    rows = []
+    for i in range(num_posts):
+        lat = CENTER[0] + rng.uniform(-SPREAD_DEG, SPREAD_DEG)
+        lon = CENTER[1] + rng.uniform(-SPREAD_DEG, SPREAD_DEG)
+        rows.append(dict(
+            food_name=f'Food {i}', description='Synthetic post', quantity='1 box',
+            city='Mumbai', lat=lat, lon=lon, geohash=encode_geohash(lat, lon),
+            image_url='https://example.com/img.jpg', phone_number='0000000000',
+            status='available', approval_status='approved', user_id=user.id
+        ))
+    db.session.execute(db.insert(FoodPost), rows)
+    db.session.commit()
+    return user
+
+
+def full_scan(lat, lon, radius_km):
+    posts = FoodPost.query.filter(FoodPost.status == 'available', FoodPost.approval_status == 'approved').all()
+    return [p for p in posts if haversine(lat, lon, p.lat, p.lon) <= radius_km]
+
+
+def walk_pages(client, url):
+    """Post ids from every page of a nearby search, in the order served."""
+    ids, cursor = [], None
+    while True:
+        data = client.get(url + '&limit=100' + (f'&cursor={cursor}' if cursor else '')).get_json()
+        ids.extend(post['id'] for post in data['posts'])
+        cursor = data['next_cursor']
+        if not cursor:
+            return ids
+
+
+def timed(fn, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--posts', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    with app.app_context():
+        db.create_all()
+        print(f'Seeding {args.posts} posts...')
+        user = seed(args.posts)
+        db.session.execute(db.text("ANALYZE"))
+
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess['_user_id'] = str(user.id)
+            sess['_fresh'] = True
+
+        lat, lon = CENTER
+        moved = (lat + 0.002, lon - 0.002)  # ~300 m away
+        print(f'{"radius_km":>10} {"page":>8} {"indexed_ms":>11} {"cached_ms":>10} {"full_scan_ms":>13}')
+        for radius in RADII_KM:
+            url = f'/api/nearby_posts?lat={lat}&lon={lon}&radius_km={radius}'
+            moved_url = f'/api/nearby_posts?lat={moved[0]}&lon={moved[1]}&radius_km={radius}'
+            # Cold cache, so every run goes to the database
+            indexed_ms, response = timed(lambda: (nearby_results.discard_cells(), client.get(url))[1], args.repeat)
+            cached_ms, _ = timed(lambda: client.get(moved_url), args.repeat)
+            scan_ms, expected = timed(lambda: full_scan(*moved, radius), 1)
+            found = {r.id for r in nearby_candidates(*moved, radius) if haversine(*moved, r.lat, r.lon) <= radius}
+            assert found == {p.id for p in expected}, f'cached candidates differ from the scan at {radius} km'
+            assert walk_pages(client, moved_url) == [p.id for p in sorted(
+                expected, key=lambda p: (haversine(*moved, p.lat, p.lon), p.id))], f'pages out of order at {radius} km'
+            db.session.expunge_all()
+            page = len(response.get_json()['posts'])
+            print(f'{radius:>10} {page:>8} {indexed_ms:>11.1f} {cached_ms:>10.1f} {scan_ms:>13.1f}')
+
+
+if __name__ == '__main__':
+    main()
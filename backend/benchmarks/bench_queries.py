@@ -0,0 +1,105 @@
+#bench_queries.py
+# Counts the SQL statements each page issues. Seeds a donor with 50 posts
+# and 200 incoming requests (with ratings) and fails if any page goes over
+# its statement budget, i.e. if an N+1 loop has crept back into a template.
+#
+# Usage (from backend/):  python benchmarks/bench_queries.py
+import os
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+_db_dir = tempfile.mkdtemp(prefix='leftoverlink-bench-')
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(_db_dir, 'bench.db')
+os.environ.setdefault('SECRET_KEY', 'bench')
+
+from sqlalchemy import event  # noqa: E402
+
+from app import app  # noqa: E402
+from models import db, User, FoodPost, Request, Rating  # noqa: E402
+from geo import encode_geohash  # noqa: E402
+
+NUM_POSTS = 50
+NUM_REQUESTERS = 4   # 50 posts x 4 requesters = 200 requests
+MAX_STATEMENTS = 8   # per page, independent of NUM_POSTS / NUM_REQUESTERS
+
+
+def seed():
+    donor = User(username='donor', email='donor@example.com', password_hash='x')
+    requesters = [User(username=f'req{i}', email=f'req{i}@example.com', password_hash='x')
+                  for i in range(NUM_REQUESTERS)]
+    db.session.add_all([donor, *requesters])
+    db.session.flush()
+
+    for i in range(NUM_POSTS):
+        lat, lon = 19.0 + i * 0.001, 72.8
+        post = FoodPost(food_name=f'Food {i}', description='Synthetic post', quantity='1 box',
+                        city='Mumbai', lat=lat, lon=lon, geohash=encode_geohash(lat, lon),
+                        image_url='https://example.com/img.jpg', phone_number='0000000000',
+                        status='claimed' if i % 2 else 'available', approval_status='approved',
+                        author=donor)
+        db.session.add(post)
+        for j, requester in enumerate(requesters):
+            accepted = i % 2 and j == 0
+            req = Request(requester=requester, food_post=post, status='accepted' if accepted else 'pending')
+            db.session.add(req)
+            if accepted:
+                db.session.flush()
+                db.session.add(Rating(score=5, from_user_id=requester.id, to_user_id=donor.id, request_id=req.id))
+    db.session.commit()
+    return donor, requesters[0]
+
+
+def count_statements(client, url):
+    statements = []
+
+    def before_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    engine = db.engine
+    event.listen(engine, 'before_cursor_execute', before_execute)
+    try:
+        response = client.get(url)
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_execute)
+    assert response.status_code == 200, f'{url} returned {response.status_code}'
+    return len(statements)
+
+
+def login(user):
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['_user_id'] = str(user.id)
+        sess['_fresh'] = True
+    return client
+
+
+def main():
+    with app.app_context():
+        db.create_all()
+        donor, requester = seed()
+        donor_client, requester_client = login(donor), login(requester)
+        first_post = FoodPost.query.first().id
+
+    pages = [
+        (donor_client, '/'),
+        (donor_client, '/dashboard'),
+        (requester_client, '/dashboard'),
+        (donor_client, '/profile/donor'),
+        (requester_client, f'/post/{first_post}'),
+    ]
+    failed = False
+    print(f'{"page":<24} {"statements":>10}')
+    for client, url in pages:
+        with app.app_context():
+            count = count_statements(client, url)
+        flag = '' if count <= MAX_STATEMENTS else '  <-- over budget'
+        failed = failed or bool(flag)
+        print(f'{url:<24} {count:>10}{flag}')
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,210 @@
+#bench_routes.py
+# Latency and queries-per-request for the main routes, driven through the
+# Flask test client against a seeded database (seed.py). Cloudinary is
+# replaced by an in-process stub, so nothing leaves the machine.
+#
+# Reports p50/p95/p99 and SQL statements per request for each scenario;
+# --max-p95-ms / --max-queries turn it into a pre-deploy gate (exit 1),
+# and --json writes the numbers out for comparing two runs.
+#
+# Usage (from backend/):
+#   python benchmarks/bench_routes.py [--users 2000 --posts 50000 --iterations 200]
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+_db_dir = tempfile.mkdtemp(prefix='leftoverlink-bench-')
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(_db_dir, 'bench.db')
+os.environ.setdefault('SECRET_KEY', 'bench')
+os.environ['IMAGE_STORAGE'] = 'cloudinary'  # the real backend code, talking to the stub below
+
+import cloudinary.api  # noqa: E402
+import cloudinary.uploader  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+
+from app import app  # noqa: E402
+from models import db, User, FoodPost, Request  # noqa: E402
+from expiry import post_sweeper  # noqa: E402
+import migrations  # noqa: E402
+import seed  # noqa: E402
+
+
+class CloudinaryStub:
+    """Stands in for the Cloudinary upload/admin APIs and counts the calls."""
+
+    def __init__(self):
+        self.calls = {'upload': 0, 'destroy': 0, 'delete_resources': 0}
+
+    def upload(self, file, **options):
+        self.calls['upload'] += 1
+        return {'secure_url': f'https://res.cloudinary.com/stub/image/upload/v1/stub{self.calls["upload"]}.jpg'}
+
+    def destroy(self, public_id, **options):
+        self.calls['destroy'] += 1
+        return {'result': 'ok'}
+
+    def delete_resources(self, public_ids, **options):
+        self.calls['delete_resources'] += 1
+        return {'deleted': {public_id: 'deleted' for public_id in public_ids}}
+
+    def install(self):
+        cloudinary.uploader.upload = self.upload
+        cloudinary.uploader.destroy = self.destroy
+        cloudinary.api.delete_resources = self.delete_resources
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+
+def login(user_id):
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['_user_id'] = str(user_id)
+        sess['_fresh'] = True
+    return client
+
+
+class Recorder:
+    """Counts the SQL statements issued while a request runs."""
+
+    def __init__(self, engine):
+        self.count = 0
+        event.listen(engine, 'before_cursor_execute', self._count)
+
+    def _count(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+
+def scenarios(rng, iterations):
+    """(name, [(client, method, url), ...]) for every scenario, built from the seeded data."""
+    with app.app_context():
+        donors = [row.user_id for row in db.session.execute(
+            db.select(FoodPost.user_id).group_by(FoodPost.user_id)
+            .order_by(db.func.count(FoodPost.id).desc()).limit(20))]
+        users = list(db.session.execute(db.select(User.id, User.username).limit(200)))
+        live = list(db.session.execute(db.select(FoodPost.id, FoodPost.lat, FoodPost.lon, FoodPost.user_id)
+                                       .where(FoodPost.status == 'available',
+                                              FoodPost.approval_status == 'approved').limit(5000)))
+        pending = list(db.session.execute(
+            db.select(Request.id, FoodPost.user_id).join(FoodPost, Request.food_id == FoodPost.id)
+            .where(Request.status == 'pending').limit(iterations)))
+        requested = {(row.requester_id, row.food_id) for row in db.session.execute(
+            db.select(Request.requester_id, Request.food_id))}
+
+    clients = {}
+
+    def client(user_id):
+        if user_id not in clients:
+            clients[user_id] = login(user_id)
+        return clients[user_id]
+
+    def repeat(make):
+        return [make() for _ in range(iterations)]
+
+    request_food = []
+    while len(request_food) < iterations:
+        user_id = rng.choice(users).id
+        post = rng.choice(live)
+        if post.user_id != user_id and (user_id, post.id) not in requested:
+            requested.add((user_id, post.id))
+            request_food.append((client(user_id), 'POST', f'/request_food/{post.id}'))
+
+    return [
+        ('home', repeat(lambda: (client(rng.choice(users).id), 'GET', '/'))),
+        ('dashboard (donor)', repeat(lambda: (client(rng.choice(donors)), 'GET', '/dashboard'))),
+        ('dashboard (requester)', repeat(lambda: (client(rng.choice(users).id), 'GET', '/dashboard'))),
+        ('profile', repeat(lambda: (client(rng.choice(users).id), 'GET', f'/profile/{rng.choice(users).username}'))),
+        ('nearby_posts 5km', repeat(lambda: (client(rng.choice(users).id), 'GET', '/api/nearby_posts?lat={}&lon={}&radius_km=5'
+                                             .format(*rng.choice(live)[1:3])))),
+        ('nearby_posts 25km', repeat(lambda: (client(rng.choice(users).id), 'GET', '/api/nearby_posts?lat={}&lon={}&radius_km=25'
+                                              .format(*rng.choice(live)[1:3])))),
+        ('request_food', request_food),
+        # Each pending request is accepted by its donor once
+        ('handle_request', [(client(donor), 'GET', f'/handle_request/{request_id}/accept')
+                            for request_id, donor in pending]),
+    ]
+
+
+def run(name, calls, recorder):
+    latencies, queries = [], []
+    for client, method, url in calls:
+        recorder.count = 0
+        start = time.perf_counter()
+        response = client.open(url, method=method)
+        latencies.append((time.perf_counter() - start) * 1000)
+        queries.append(recorder.count)
+        assert response.status_code in (200, 302, 304), f'{name}: {url} returned {response.status_code}'
+    return {
+        'requests': len(calls),
+        'p50_ms': percentile(latencies, 50),
+        'p95_ms': percentile(latencies, 95),
+        'p99_ms': percentile(latencies, 99),
+        'queries_avg': sum(queries) / len(queries),
+        'queries_max': max(queries),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--posts', type=int, default=50000)
+    parser.add_argument('--iterations', type=int, default=200, help='requests per scenario')
+    parser.add_argument('--max-p95-ms', type=float, help='fail if any scenario has a slower p95')
+    parser.add_argument('--max-queries', type=int, help='fail if any request issues more statements')
+    parser.add_argument('--json', help='write the results to this file')
+    args = parser.parse_args()
+
+    stub = CloudinaryStub()
+    stub.install()
+    rng = random.Random(7)
+
+    with app.app_context():
+        migrations.upgrade()
+        start = time.perf_counter()
+        counts = seed.seed(args.users, args.posts)
+        print(f'Seeded {counts} in {time.perf_counter() - start:.1f}s')
+        # Steady state: old claimed/expired posts already moved to the archive
+        expired, archived = post_sweeper.sweep()
+        print(f'Swept: {expired} expired, {archived} archived')
+        db.session.execute(db.text('ANALYZE'))
+        db.session.commit()
+        engine = db.engine
+
+    recorder = Recorder(engine)
+    results = {}
+    failed = []
+    print(f'{"scenario":<24} {"n":>5} {"p50_ms":>8} {"p95_ms":>8} {"p99_ms":>8} {"q_avg":>6} {"q_max":>6}')
+    for name, calls in scenarios(rng, args.iterations):
+        if not calls:
+            continue
+        result = results[name] = run(name, calls, recorder)
+        flags = []
+        if args.max_p95_ms is not None and result['p95_ms'] > args.max_p95_ms:
+            flags.append('p95')
+        if args.max_queries is not None and result['queries_max'] > args.max_queries:
+            flags.append('queries')
+        if flags:
+            failed.append(name)
+        print(f'{name:<24} {result["requests"]:>5} {result["p50_ms"]:>8.1f} {result["p95_ms"]:>8.1f} '
+              f'{result["p99_ms"]:>8.1f} {result["queries_avg"]:>6.1f} {result["queries_max"]:>6}'
+              + (f'  <-- over budget ({", ".join(flags)})' if flags else ''))
+    print(f'Cloudinary stub calls: {stub.calls}')
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'seed': counts, 'results': results}, f, indent=2)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+#bench_search.py
+# Full-text search (FTS5 on SQLite, see search.py) against a naive
+# LIKE '%term%' scan over food_name, description and city, on their own
+# and combined with the nearby radius filter.
+#
+# Usage (from backend/):  python benchmarks/bench_search.py [--posts 100000]
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+_db_dir = tempfile.mkdtemp(prefix='leftoverlink-bench-')
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(_db_dir, 'bench.db')
+os.environ.setdefault('SECRET_KEY', 'bench')
+
+from sqlalchemy import and_, or_  # noqa: E402
+
+from app import app  # noqa: E402
+from models import db, User, FoodPost  # noqa: E402
+from geo import encode_geohash, haversine  # noqa: E402
+from queries import LIVE_POST_FILTER, post_records  # noqa: E402
+from search import search_posts, search_nearby, search_terms, has_search_index  # noqa: E402
+import migrations  # noqa: E402
+
+CENTER = (19.0760, 72.8777)  # Mumbai
+SPREAD_DEG = 2.0
+RADIUS_KM = 10
+LIMIT = 24
+
+FOODS = ['rice', 'bread', 'dal', 'chapati', 'biryani', 'idli', 'dosa', 'samosa', 'paneer', 'curry',
+         'noodles', 'pasta', 'sandwich', 'fruit', 'banana', 'apples', 'milk', 'cake', 'cookies', 'soup']
+WORDS = ['fresh', 'homemade', 'leftover', 'party', 'extra', 'vegetarian', 'spicy', 'sweet', 'packed',
+         'warm', 'today', 'evening', 'lunch', 'dinner', 'boxes', 'plates', 'family', 'wedding', 'hostel']
+CITIES = ['Mumbai', 'Thane', 'Navi Mumbai', 'Pune', 'Nashik', 'Lonavala']
+QUERIES = ['rice', 'bread', 'paneer curry', 'fresh biryani', 'cook', 'wedding cake']
+
+
+def seed(num_posts):
+    rng = random.Random(42)
+    user = User(username='bench', email='bench@example.com', password_hash='x')
+    db.session.add(user)
+    db.session.commit()
+
+    rows = []
+    for i in range(num_posts):
+        lat = CENTER[0] + rng.uniform(-SPREAD_DEG, SPREAD_DEG)
+        lon = CENTER[1] + rng.uniform(-SPREAD_DEG, SPREAD_DEG)
+        food = rng.choice(FOODS)
+        rows.append(dict(
+            food_name=f'{rng.choice(WORDS).title()} {food}',
+            description=' '.join(rng.choice(WORDS + FOODS) for _ in range(rng.randrange(8, 40))),
+            quantity='1 box', city=rng.choice(CITIES), lat=lat, lon=lon, geohash=encode_geohash(lat, lon),
+            image_url='https://example.com/img.jpg', phone_number='0000000000',
+            status=rng.choice(['available'] * 4 + ['claimed']), approval_status='approved', user_id=user.id
+        ))
+    db.session.execute(db.insert(FoodPost), rows)
+    db.session.commit()
+
+
+def like_search(q, *criteria):
+    """The naive baseline: every term LIKE'd against every column, newest first."""
+    for term in search_terms(q):
+        pattern = f'%{term}%'
+        criteria += (or_(FoodPost.food_name.like(pattern), FoodPost.description.like(pattern),
+                         FoodPost.city.like(pattern)),)
+    return post_records(*criteria, order_by=(FoodPost.post_date.desc(),))[:LIMIT]
+
+
+def like_nearby(q, lat, lon, radius_km):
+    deg = radius_km / 111.0
+    box = and_(FoodPost.lat.between(lat - deg, lat + deg), FoodPost.lon.between(lon - deg * 1.1, lon + deg * 1.1))
+    records = like_search(q, *LIVE_POST_FILTER, box)
+    return [r for r in records if haversine(lat, lon, r.lat, r.lon) <= radius_km]
+
+
+def timed(fn, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--posts', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    with app.app_context():
+        db.create_all()
+        print(f'Seeding {args.posts} posts...')
+        seed(args.posts)
+        start = time.perf_counter()
+        migrations.upgrade()  # builds the FTS index over the seeded rows
+        print(f'Schema upgrade incl. full-text index build: {time.perf_counter() - start:.1f}s')
+        assert has_search_index()
+
+        lat, lon = CENTER
+        print(f'{"query":<16} {"mode":<8} {"hits":>5} {"fts_ms":>8} {"like_ms":>8} {"speedup":>8}')
+        for q in QUERIES:
+            fts_ms, hits = timed(lambda: search_posts(q, *LIVE_POST_FILTER, limit=LIMIT), args.repeat)
+            like_ms, _ = timed(lambda: like_search(q, *LIVE_POST_FILTER), args.repeat)
+            print(f'{q:<16} {"all":<8} {len(hits):>5} {fts_ms:>8.1f} {like_ms:>8.1f} {like_ms / fts_ms:>7.1f}x')
+
+            fts_ms, (hits, _, _) = timed(lambda: search_nearby(q, lat, lon, RADIUS_KM, *LIVE_POST_FILTER,
+                                                               limit=LIMIT), args.repeat)
+            like_ms, _ = timed(lambda: like_nearby(q, lat, lon, RADIUS_KM), args.repeat)
+            print(f'{q:<16} {f"{RADIUS_KM}km":<8} {len(hits):>5} {fts_ms:>8.1f} {like_ms:>8.1f} '
+                  f'{like_ms / fts_ms:>7.1f}x')
+
+
+if __name__ == '__main__':
+    main()
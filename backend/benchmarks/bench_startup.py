@@ -0,0 +1,112 @@
+#bench_startup.py
+# How long a fresh process takes to become useful: importing app (which
+# builds the app through create_app) and serving its first request, each
+# run in a new interpreter so nothing is cached. Also reports whether the
+# Cloudinary and Pillow packages got imported along the way (they shouldn't),
+# the one-time schema bootstrap, and what a worker forked from a preloaded
+# master (gunicorn --preload) still pays: just its first request.
+#
+# Usage (from backend/):  python benchmarks/bench_startup.py [--runs 7]
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in a fresh interpreter; prints one JSON line of timings
+COLD_START = r'''
+import json, sys, time
+start = time.perf_counter()
+from app import app
+imported = time.perf_counter()
+client = app.test_client()
+with client.session_transaction() as sess:
+    sess['_user_id'] = '1'
+    sess['_fresh'] = True
+assert client.get('/').status_code == 200
+served = time.perf_counter()
+print(json.dumps({
+    'import_ms': (imported - start) * 1000,
+    'first_request_ms': (served - imported) * 1000,
+    'heavy_modules': [name for name in ('cloudinary', 'PIL') if name in sys.modules],
+}))
+'''
+
+# Imports once, then forks workers like gunicorn --preload and times each one's first request
+PRELOADED_WORKERS = r'''
+import json, os, time
+from app import app
+results = []
+for _ in range(WORKERS):
+    read_end, write_end = os.pipe()
+    forked = time.perf_counter()
+    pid = os.fork()
+    if pid == 0:
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess['_user_id'] = '1'
+            sess['_fresh'] = True
+        ok = client.get('/').status_code == 200
+        os.write(write_end, json.dumps({'ok': ok, 'ms': (time.perf_counter() - forked) * 1000}).encode())
+        os._exit(0)
+    os.close(write_end)
+    with os.fdopen(read_end) as f:
+        results.append(json.loads(f.read()))
+    os.waitpid(pid, 0)
+assert all(r['ok'] for r in results)
+print(json.dumps([r['ms'] for r in results]))
+'''
+
+BOOTSTRAP = r'''
+import json, time
+start = time.perf_counter()
+from app import app
+from models import db, User
+with app.app_context():
+    db.session.add(User(username='startup', email='startup@example.com', password_hash='x'))
+    db.session.commit()
+print(json.dumps({'import_and_bootstrap_ms': (time.perf_counter() - start) * 1000}))
+'''
+
+
+def run(code, env):
+    out = subprocess.run([sys.executable, '-c', code], cwd=BACKEND_DIR, env=env,
+                         capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=7)
+    parser.add_argument('--workers', type=int, default=4, help='workers forked in the preload measurement')
+    args = parser.parse_args()
+
+    db_dir = tempfile.mkdtemp(prefix='leftoverlink-startup-')
+    env = dict(os.environ, DATABASE_URL='sqlite:///' + os.path.join(db_dir, 'startup.db'),
+               SECRET_KEY='bench', EXPIRY_SWEEP_INTERVAL='0')
+
+    bootstrap = run(BOOTSTRAP, dict(env, BOOTSTRAP_SCHEMA='1'))
+    print(f'import + one-time schema bootstrap: {bootstrap["import_and_bootstrap_ms"]:.0f} ms')
+
+    runs = [run(COLD_START, env) for _ in range(args.runs)]
+    imports = [r['import_ms'] for r in runs]
+    firsts = [r['first_request_ms'] for r in runs]
+    totals = [r['import_ms'] + r['first_request_ms'] for r in runs]
+    print(f'cold process, median of {args.runs}:')
+    print(f'  import app          {statistics.median(imports):7.0f} ms')
+    print(f'  first request       {statistics.median(firsts):7.0f} ms')
+    print(f'  total               {statistics.median(totals):7.0f} ms')
+    print(f'  heavy modules loaded: {", ".join(runs[0]["heavy_modules"]) or "none"}')
+
+    if hasattr(os, 'fork'):
+        forked = run(PRELOADED_WORKERS.replace('WORKERS', str(args.workers)), env)
+        print(f'worker forked from a preloaded master, fork to first response: '
+              f'median {statistics.median(forked):.0f} ms over {len(forked)} workers')
+
+
+if __name__ == '__main__':
+    main()
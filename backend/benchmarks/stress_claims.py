@@ -0,0 +1,143 @@
+#stress_claims.py
+# Fires concurrent request_food and handle_request calls at a single post
+# and checks the claim flow's invariants afterwards:
+#   - no duplicate (requester, post) requests, even with every click doubled
+#   - exactly one accepted request, the post claimed, every other request declined
+#   - the stats counters equal a full recompute (stats.recompute_stats)
+#
+# Runs on a temporary SQLite file by default; pass --database-url to point it
+# at a scratch PostgreSQL database (its tables are created, not dropped).
+#
+# Usage (from backend/):  python benchmarks/stress_claims.py [--requesters 40 --rounds 5]
+import argparse
+import os
+import sys
+import tempfile
+import threading
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+parser = argparse.ArgumentParser()
+parser.add_argument('--requesters', type=int, default=40)
+parser.add_argument('--rounds', type=int, default=5, help='posts to fight over, one after another')
+parser.add_argument('--database-url')
+args = parser.parse_args()
+
+if args.database_url:
+    os.environ['DATABASE_URL'] = args.database_url
+else:
+    _db_dir = tempfile.mkdtemp(prefix='leftoverlink-stress-')
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(_db_dir, 'stress.db')
+os.environ.setdefault('SECRET_KEY', 'stress')
+os.environ['IMAGE_STORAGE'] = 'local'
+# Room for every thread to hold a connection
+os.environ.setdefault('DB_POOL_SIZE', str(2 * args.requesters + 8))
+
+from sqlalchemy import func  # noqa: E402
+
+from app import app  # noqa: E402
+from models import db, User, FoodPost, Request  # noqa: E402
+from stats import RATING_COLUMNS, adjust_counts, recompute_stats  # noqa: E402
+import migrations  # noqa: E402
+
+COUNTERS = ('donations_count', 'claimed_count', 'available_count', 'food_claimed_count', *RATING_COLUMNS.values())
+
+
+def login(user_id):
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['_user_id'] = str(user_id)
+        sess['_fresh'] = True
+    return client
+
+
+def in_parallel(calls):
+    """Run (client, method, url) calls on one thread each, released together. Returns the status codes."""
+    barrier = threading.Barrier(len(calls))
+    statuses = [None] * len(calls)
+
+    def worker(i, client, method, url):
+        barrier.wait()
+        statuses[i] = client.open(url, method=method).status_code
+
+    threads = [threading.Thread(target=worker, args=(i, *call)) for i, call in enumerate(calls)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return statuses
+
+
+def counters():
+    rows = db.session.execute(db.select(User.id, *[getattr(User, c) for c in COUNTERS]).order_by(User.id))
+    return [tuple(row) for row in rows]
+
+
+def main():
+    with app.app_context():
+        migrations.upgrade()
+        donor = User(username='donor', email='donor@example.com', password_hash='x')
+        requesters = [User(username=f'stress{i}', email=f'stress{i}@example.com', password_hash='x')
+                      for i in range(args.requesters)]
+        db.session.add_all([donor, *requesters])
+        db.session.commit()
+        donor_id, requester_ids = donor.id, [u.id for u in requesters]
+
+    donor_clients = [login(donor_id) for _ in range(args.requesters)]
+    requester_clients = {user_id: [login(user_id), login(user_id)] for user_id in requester_ids}
+    failures = []
+
+    for round_no in range(1, args.rounds + 1):
+        with app.app_context():
+            post = FoodPost(food_name=f'Stress {round_no}', description='d', quantity='1', city='Mumbai',
+                            lat=19.07, lon=72.87, image_url='/static/img/placeholder.png', phone_number='1',
+                            status='available', approval_status='approved', user_id=donor_id)
+            db.session.add(post)
+            adjust_counts(donor_id, donations_count=1, available_count=1)  # as the create route does
+            db.session.commit()
+            post_id = post.id
+
+        # Every requester clicks "request" twice at the same moment
+        statuses = in_parallel([(client, 'POST', f'/request_food/{post_id}')
+                                for clients in requester_clients.values() for client in clients])
+        errors = [s for s in statuses if s >= 500]
+
+        with app.app_context():
+            request_ids = list(db.session.execute(db.select(Request.id).where(Request.food_id == post_id)).scalars())
+        # ...then the donor accepts all of them at once (from as many tabs)
+        statuses = in_parallel([(donor_clients[i % len(donor_clients)], 'GET', f'/handle_request/{request_id}/accept')
+                                for i, request_id in enumerate(request_ids)])
+        errors += [s for s in statuses if s >= 500]
+
+        with app.app_context():
+            by_status = dict(db.session.execute(db.select(Request.status, func.count(Request.id))
+                                                .where(Request.food_id == post_id).group_by(Request.status)).all())
+            post_status = db.session.get(FoodPost, post_id).status
+        problems = []
+        if len(request_ids) != args.requesters:
+            problems.append(f'{len(request_ids)} requests for {args.requesters} requesters')
+        if by_status.get('accepted') != 1 or by_status.get('pending'):
+            problems.append(f'request statuses {by_status}')
+        if post_status != 'claimed':
+            problems.append(f'post is {post_status!r}')
+        if errors:
+            problems.append(f'{len(errors)} server errors')
+        print(f'round {round_no}: {by_status}, post {post_status}' + (f'  FAILED: {"; ".join(problems)}'
+                                                                       if problems else ''))
+        failures += problems
+
+    with app.app_context():
+        before = counters()
+        recompute_stats()
+        db.session.commit()
+        if counters() != before:
+            failures.append('stats counters drifted from a full recompute')
+            print('FAILED: stats counters drifted from a full recompute')
+
+    print('OK' if not failures else f'{len(failures)} problems')
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+#stress_uploads.py
+# Restart safety of the upload queue (uploads.py). A first process creates
+# posts through /post_food and is killed while its only upload worker is
+# stuck on the first image, so one job is claimed and the rest are still
+# queued. A second, fresh process then serves one request and must finish
+# every image on its own, taking over the dead worker's claim once it lapses:
+#   - every post ends up 'ready' with a stored image and thumbnail
+#   - the pending_upload table ends up empty
+#
+# Usage (from backend/):  python benchmarks/stress_uploads.py [--posts 4]
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+COMMON = r'''
+import io, json, os, time
+from PIL import Image
+from app import app
+from models import db, User, FoodPost, PendingUpload
+from storage import LocalStorage
+from uploads import upload_queue
+
+def login(user_id):
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['_user_id'] = str(user_id)
+        sess['_fresh'] = True
+    return client
+'''
+
+# Queues the posts, then dies mid-upload without any cleanup
+FIRST_PROCESS = COMMON + r'''
+import migrations
+
+class StuckStorage(LocalStorage):
+    def upload(self, data, filename=None):
+        time.sleep(3600)  # the process is killed before this returns
+
+upload_queue.storage = StuckStorage(os.environ['UPLOAD_ROOT'])
+with app.app_context():
+    migrations.upgrade()
+    user = User(username='uploader', email='uploader@example.com', password_hash='x')
+    db.session.add(user)
+    db.session.commit()
+    user_id = user.id
+
+buf = io.BytesIO()
+Image.new('RGB', (1600, 1200), (200, 120, 40)).save(buf, 'JPEG')
+client = login(user_id)
+for i in range(POSTS):
+    response = client.post('/post_food', content_type='multipart/form-data', data={
+        'food_name': f'Upload {i}', 'description': 'd', 'quantity': '1', 'phone_number': '1',
+        'city': 'Mumbai', 'lat': '19.07', 'lon': '72.87', 'image': (io.BytesIO(buf.getvalue()), 'photo.jpg')})
+    assert response.status_code == 302, response.status_code
+
+with app.app_context():
+    deadline = time.monotonic() + 10
+    while not PendingUpload.query.filter(PendingUpload.claimed_at.is_not(None)).count():
+        assert time.monotonic() < deadline, 'the upload worker never claimed a job'
+        db.session.rollback()
+        time.sleep(0.05)
+    print(json.dumps({'user_id': user_id, 'jobs': PendingUpload.query.count()}))
+os._exit(0)
+'''
+
+# A fresh worker: one request, then wait for the queue to drain
+SECOND_PROCESS = COMMON + r'''
+upload_queue.storage = LocalStorage(os.environ['UPLOAD_ROOT'])
+assert login(USER_ID).get('/').status_code == 200
+with app.app_context():
+    deadline = time.monotonic() + 30
+    while PendingUpload.query.count() and time.monotonic() < deadline:
+        db.session.rollback()
+        time.sleep(0.1)
+    posts = FoodPost.query.order_by(FoodPost.id).all()
+    print(json.dumps({
+        'jobs_left': PendingUpload.query.count(),
+        'posts': [[post.image_status, post.image_url, post.thumbnail_url] for post in posts],
+    }))
+'''
+
+
+def run(code, env):
+    out = subprocess.run([sys.executable, '-c', code], cwd=BACKEND_DIR, env=env,
+                         capture_output=True, text=True, timeout=120)
+    if out.returncode != 0:
+        sys.exit(f'process failed:\n{out.stderr}')
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--posts', type=int, default=4)
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix='leftoverlink-uploads-')
+    env = dict(os.environ, DATABASE_URL='sqlite:///' + os.path.join(work_dir, 'uploads.db'),
+               SECRET_KEY='stress', EXPIRY_SWEEP_INTERVAL='0', IMAGE_STORAGE='local',
+               UPLOAD_ROOT=os.path.join(work_dir, 'uploads'), UPLOAD_WORKERS='1', UPLOAD_LEASE_SECONDS='2')
+
+    first = run(FIRST_PROCESS.replace('POSTS', str(args.posts)), env)
+    print(f'first process killed with {first["jobs"]} uploads queued (one of them claimed)')
+    second = run(SECOND_PROCESS.replace('USER_ID', str(first['user_id'])), env)
+
+    stored = set(os.listdir(env['UPLOAD_ROOT'])) if os.path.isdir(env['UPLOAD_ROOT']) else set()
+    problems = []
+    if second['jobs_left']:
+        problems.append(f'{second["jobs_left"]} uploads still queued')
+    for i, (status, image_url, thumbnail_url) in enumerate(second['posts']):
+        if status != 'ready':
+            problems.append(f'post {i} is {status!r}')
+        elif not {os.path.basename(image_url), os.path.basename(thumbnail_url)} <= stored:
+            problems.append(f'post {i} points at images that were not stored')
+    print(f'after restart: {[post[0] for post in second["posts"]]}')
+    print('OK' if not problems else 'FAILED: ' + '; '.join(problems))
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == '__main__':
+    main()
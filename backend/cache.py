@@ -0,0 +1,425 @@
+#cache.py
+# Process-local caches: snapshots of live posts, nearby-search candidates,
+# and the users behind current_user. Every gunicorn worker keeps its own
+# copy; commits that touch FoodPost / User rows clear them through the
+# SQLAlchemy session events registered in init_cache().
+import os
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, make_transient_to_detached
+from sqlalchemy.sql import operators
+from sqlalchemy.sql.elements import BinaryExpression, BooleanClauseList
+
+from models import db, User, FoodPost
+
+# Compact, read-only view of a FoodPost plus its author's username
+PostRecord = namedtuple('PostRecord', [
+    'id', 'food_name', 'description', 'quantity', 'city', 'lat', 'lon',
+    'image_url', 'thumbnail_url', 'status', 'approval_status', 'phone_number', 'post_date',
+    'geohash', 'author_username', 'updated_at'
+])
+
+# One keyset page of PostRecords, see queries.post_record_page
+Page = namedtuple('Page', ['records', 'next_cursor'])
+
+
+class LivePostCache:
+    """
+    Small LRU of post snapshots keyed by name (e.g. ('home', cursor),
+    ('admin_pending', cursor)). A snapshot is a tuple of records or a Page.
+    Entries expire after ttl seconds; snapshots with more than max_records
+    records are served but not stored, so one huge result can't pin memory.
+    """
+
+    def __init__(self, ttl=30, max_entries=256, max_records=5000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_records = max_records
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        # Bumped by every invalidation, so a load that raced one isn't stored
+        self._generation = 0
+
+    def get(self, key, loader):
+        """Return the snapshot for key, calling loader() to build it on a miss."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            generation = self._generation
+
+        return self._store(key, loader(), now, generation)
+
+    def get_many(self, keys, loader):
+        """
+        Like get() for several keys at once. loader(missing_keys) must return
+        a dict key -> snapshot covering every missing key, so all misses are
+        filled by a single load.
+        """
+        now = time.monotonic()
+        found, missing = {}, []
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is not None and entry[0] > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    found[key] = entry[1]
+                else:
+                    self.misses += 1
+                    missing.append(key)
+            generation = self._generation
+
+        if missing:
+            loaded = loader(missing)
+            for key in missing:
+                found[key] = self._store(key, loaded.get(key, ()), now, generation)
+        return found
+
+    def _store(self, key, value, now, generation):
+        if isinstance(value, Page):
+            value = Page(tuple(value.records), value.next_cursor)
+            size = len(value.records)
+        else:
+            value = tuple(value)
+            size = len(value)
+        if size <= self.max_records:
+            with self._lock:
+                # A commit invalidated the cache while this was loading: serve it, don't keep it
+                if generation == self._generation:
+                    self._entries[key] = (now + self.ttl, value)
+                    self._entries.move_to_end(key)
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+        return value
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+            self.invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "pid": os.getpid(),
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "invalidations": self.invalidations,
+            }
+
+
+live_posts = LivePostCache(
+    ttl=float(os.environ.get('LIVE_POST_CACHE_TTL', 30)),
+    max_entries=int(os.environ.get('LIVE_POST_CACHE_ENTRIES', 256)),
+    max_records=int(os.environ.get('LIVE_POST_CACHE_MAX_RECORDS', 5000))
+)
+
+
+
+# --- Nearby search cache ---
+class NearbyCache:
+    """
+    LRU of nearby-search candidates keyed by geo.quantize_query's
+    (cell, bucket_km), so queries from the same neighbourhood with similar
+    radii share one entry. Each entry is indexed under the geohash prefixes
+    its search area covers, and a commit that changes a post drops only the
+    entries covering that post's cell; everything else stays warm. Other
+    workers catch up after ttl seconds, as with live_posts.
+    """
+
+    def __init__(self, ttl=30, max_entries=512, max_records=5000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_records = max_records
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._entries = OrderedDict()  # key -> (expires, prefixes, records)
+        self._by_prefix = {}           # geohash prefix -> keys of the entries covering it
+        self._lock = threading.Lock()
+        # Bumped by every invalidation, so a load that raced one isn't stored
+        self._generation = 0
+
+    def get(self, key, prefixes, loader):
+        """
+        Candidates for key, calling loader() on a miss. prefixes are the
+        geohash cells holding every post the entry can contain.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[2]
+            self.misses += 1
+            generation = self._generation
+
+        records = tuple(loader())
+        if len(records) <= self.max_records:
+            with self._lock:
+                if generation == self._generation:
+                    self._drop(key)
+                    self._entries[key] = (now + self.ttl, tuple(prefixes), records)
+                    for prefix in prefixes:
+                        self._by_prefix.setdefault(prefix, set()).add(key)
+                    while len(self._entries) > self.max_entries:
+                        self._drop(next(iter(self._entries)))
+        return records
+
+    def _drop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            for prefix in entry[1]:
+                keys = self._by_prefix.get(prefix)
+                keys.discard(key)
+                if not keys:
+                    del self._by_prefix[prefix]
+
+    def discard_cells(self, geohashes=None):
+        """Drop the entries covering any of the given post geohashes, or every entry when None."""
+        with self._lock:
+            if geohashes is None:
+                self._entries.clear()
+                self._by_prefix.clear()
+            else:
+                for geohash in geohashes:
+                    for length in range(1, len(geohash) + 1):
+                        for key in list(self._by_prefix.get(geohash[:length], ())):
+                            self._drop(key)
+            self._generation += 1
+            self.invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "pid": os.getpid(),
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "invalidations": self.invalidations,
+            }
+
+
+nearby_results = NearbyCache(
+    ttl=float(os.environ.get('NEARBY_CACHE_TTL', 30)),
+    max_entries=int(os.environ.get('NEARBY_CACHE_ENTRIES', 512)),
+    max_records=int(os.environ.get('LIVE_POST_CACHE_MAX_RECORDS', 5000))
+)
+
+# --- User identity cache ---
+class UserCache:
+    """
+    LRU of user rows for the login manager's user_loader, keyed by id.
+    Entries are plain dicts of column values, turned back into a User
+    attached to the current session without a query. Commits that change a
+    user drop that entry in this worker; other workers notice after ttl
+    seconds, so keep it short.
+    """
+
+    def __init__(self, ttl=30, max_entries=1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        # Bumped by every invalidation, so a load that raced one isn't stored
+        self._generation = 0
+        self._columns = [attr.key for attr in inspect(User).column_attrs]
+
+    def load(self, user_id):
+        """The User with user_id in the current session (or None), from cache when fresh."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return self._attach(entry[1])
+            self.misses += 1
+            generation = self._generation
+
+        user = db.session.get(User, user_id)
+        if user is not None:
+            values = {key: getattr(user, key) for key in self._columns}
+            with self._lock:
+                if generation == self._generation:
+                    self._entries[user_id] = (now + self.ttl, values)
+                    self._entries.move_to_end(user_id)
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+        return user
+
+    def _attach(self, values):
+        user = User(**values)
+        make_transient_to_detached(user)
+        # No SELECT: the snapshot becomes the session's persistent User
+        return db.session.merge(user, load=False)
+
+    def discard(self, user_ids=None):
+        """Drop the given users, or every entry when user_ids is None."""
+        with self._lock:
+            if user_ids is None:
+                self._entries.clear()
+            else:
+                for user_id in user_ids:
+                    self._entries.pop(user_id, None)
+            self._generation += 1
+            self.invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "pid": os.getpid(),
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "invalidations": self.invalidations,
+            }
+
+
+user_cache = UserCache(
+    ttl=float(os.environ.get('USER_CACHE_TTL', 30)),
+    max_entries=int(os.environ.get('USER_CACHE_ENTRIES', 1024))
+)
+
+
+# --- Invalidation ---
+_CHANGED = 'live_posts_changed'
+_USERS_CHANGED = 'users_changed'  # set of user ids, or None for "all of them"
+_CELLS_CHANGED = 'post_cells_changed'  # geohashes of changed posts, or None for "all of them"
+
+
+def _changed_posts(session):
+    return [obj for obj in (*session.new, *session.dirty, *session.deleted) if isinstance(obj, FoodPost)]
+
+
+def _post_cells(session, posts):
+    """Geohashes of the given posts, before and after any pending move."""
+    cells, moved = set(), []
+    for post in posts:
+        history = inspect(post).attrs.geohash.history
+        cells.update(cell for cell in (post.geohash, *history.deleted) if cell)
+        if history.added and not history.deleted and post.id is not None:
+            moved.append(post.id)  # the old value was never loaded, so it's only in the table
+    if moved:
+        cells.update(session.execute(
+            db.select(FoodPost.geohash).where(FoodPost.id.in_(moved), FoodPost.geohash.is_not(None))).scalars())
+    return cells
+
+
+def _targeted_ids(statement, table):
+    """
+    Ids from a bulk `WHERE table.id = x` / `IN (...)` clause, also when ANDed
+    with other criteria, or None if the statement targets anything else.
+    """
+    clause = statement.whereclause
+    clauses = (clause.clauses if isinstance(clause, BooleanClauseList) and clause.operator is operators.and_
+               else [clause])
+    for clause in clauses:
+        if (isinstance(clause, BinaryExpression) and getattr(clause.left, 'table', None) is table
+                and clause.left.key == 'id' and hasattr(clause.right, 'value')):
+            if clause.operator is operators.eq:
+                return {clause.right.value}
+            if clause.operator is operators.in_op:
+                return set(clause.right.value)
+    return None
+
+
+def _mark_users(session, user_ids):
+    if user_ids is None:
+        session.info[_USERS_CHANGED] = None
+    else:
+        changed = session.info.setdefault(_USERS_CHANGED, set())
+        if changed is not None:
+            changed.update(user_ids)
+
+
+def _mark_cells(session, cells):
+    if cells is None:
+        session.info[_CELLS_CHANGED] = None
+    else:
+        changed = session.info.setdefault(_CELLS_CHANGED, set())
+        if changed is not None:
+            changed.update(cells)
+
+
+def _mark_flush(session, flush_context, instances):
+    posts = _changed_posts(session)
+    if posts:
+        session.info[_CHANGED] = True
+        _mark_cells(session, _post_cells(session, posts))
+    user_ids = {obj.id for obj in (*session.dirty, *session.deleted) if isinstance(obj, User)}
+    if user_ids:
+        _mark_users(session, user_ids)
+
+
+def _mark_bulk(orm_execute_state):
+    # Query.update()/delete() skip the flush, so catch them here
+    if orm_execute_state.is_update or orm_execute_state.is_delete:
+        session = orm_execute_state.session
+        mapper = orm_execute_state.bind_mapper
+        if mapper is not None and mapper.class_ is FoodPost:
+            session.info[_CHANGED] = True
+            # Bulk changes by id (expiry, moderation) look up the cells they touch
+            post_ids = _targeted_ids(orm_execute_state.statement, FoodPost.__table__)
+            _mark_cells(session, None if post_ids is None else set(session.execute(
+                db.select(FoodPost.geohash).where(FoodPost.id.in_(post_ids), FoodPost.geohash.is_not(None))
+            ).scalars()))
+        elif mapper is not None and mapper.class_ is User:
+            # e.g. stats.adjust_counts(); recompute_stats() has no id filter and drops everyone
+            _mark_users(session, _targeted_ids(orm_execute_state.statement, User.__table__))
+
+
+def _invalidate(session):
+    if session.info.pop(_CHANGED, False):
+        live_posts.invalidate()
+    if _CELLS_CHANGED in session.info:
+        nearby_results.discard_cells(session.info.pop(_CELLS_CHANGED))
+    if _USERS_CHANGED in session.info:
+        user_cache.discard(session.info.pop(_USERS_CHANGED))
+
+
+def _reset(session):
+    session.info.pop(_CHANGED, None)
+    session.info.pop(_CELLS_CHANGED, None)
+    session.info.pop(_USERS_CHANGED, None)
+
+
+_SESSION_HOOKS = (
+    ('before_flush', _mark_flush),
+    ('do_orm_execute', _mark_bulk),
+    ('after_commit', _invalidate),
+    ('after_rollback', _reset),
+)
+
+
+def init_cache():
+    """
+    Register the session hooks that clear the caches after post and user
+    changes. The caches are per process, so the hooks are added once no
+    matter how many apps create_app() builds.
+    """
+    for name, hook in _SESSION_HOOKS:
+        if not event.contains(Session, name, hook):
+            event.listen(Session, name, hook)
@@ -0,0 +1,69 @@
+#claims.py
+# The claim flow: a donor accepting one request for a post declines the
+# others and marks the post claimed. Concurrent clicks must not claim a
+# post twice, so every change to a post's requests first locks the post
+# row (lock_post) and then re-reads what it is about to change.
+#
+# Duplicate requests are prevented by the unique (requester_id, food_id)
+# index (migration 9), not by a check-then-insert.
+from sqlalchemy import bindparam, text
+
+from models import db, FoodPost, Request
+from stats import adjust_counts
+
+
+def lock_post(post_id):
+    """
+    Lock a post's row until the transaction ends and return it, freshly
+    loaded. PostgreSQL uses SELECT ... FOR UPDATE. SQLite has no row locks,
+    so a no-op write takes the database write lock instead (and waits up to
+    busy_timeout for it, see config.py).
+    """
+    if db.session.get_bind().dialect.name == 'sqlite':
+        db.session.execute(text('UPDATE food_post SET id = id WHERE id = :id'), {'id': post_id})
+    return db.session.execute(
+        db.select(FoodPost).where(FoodPost.id == post_id).with_for_update()
+        .execution_options(populate_existing=True)
+    ).scalar_one_or_none()
+
+
+def lock_posts(post_ids):
+    """lock_post for many posts at once (moderation.py); returns the ones that exist, by id."""
+    if db.session.get_bind().dialect.name == 'sqlite':
+        db.session.execute(text('UPDATE food_post SET id = id WHERE id IN :ids')
+                           .bindparams(bindparam('ids', expanding=True)), {'ids': list(post_ids)})
+    return db.session.execute(
+        db.select(FoodPost).where(FoodPost.id.in_(post_ids)).order_by(FoodPost.id).with_for_update()
+        .execution_options(populate_existing=True)
+    ).scalars().all()
+
+
+def accept_request(req, post):
+    """
+    Accept req and decline every other pending request for the post, with
+    the post locked (lock_post). Returns False, changing nothing, if the
+    post was already claimed through another request or has expired.
+    """
+    if req.status == 'accepted':
+        return True  # a repeated click
+    if post.status != 'available':
+        return False
+
+    # Keep the donor's and requester's counters in step
+    adjust_counts(req.requester_id, food_claimed_count=1)
+    adjust_counts(post.user_id, claimed_count=1, available_count=-1)
+    req.status = 'accepted'
+    post.status = 'claimed'
+    db.session.execute(
+        db.update(Request)
+        .where(Request.food_id == post.id, Request.status == 'pending', Request.id != req.id)
+        .values(status='declined')
+    )
+    return True
+
+
+def decline_request(req):
+    """Decline req (the post stays claimed if req had been accepted)."""
+    if req.status == 'accepted':
+        adjust_counts(req.requester_id, food_claimed_count=-1)
+    req.status = 'declined'
@@ -0,0 +1,106 @@
+#commands.py
+# `flask --app app <command>` maintenance commands. They live on a
+# blueprint without a CLI group (registered in create_app), so they show up
+# at the top level: flask db-upgrade, flask seed, flask check-indexes...
+import click
+from flask import Blueprint, current_app
+
+from models import db
+import migrations
+import seed
+from stats import recompute_stats
+from uploads import upload_queue
+from outbox import deletion_flusher
+from expiry import post_sweeper
+from events import event_feed
+from config import check_database, without_statement_timeout
+
+commands = Blueprint('commands', __name__, cli_group=None)
+
+
+@commands.cli.command('repair-stats')
+def repair_stats():
+    """Recompute every user's stats counters from the posts/requests/ratings tables."""
+    without_statement_timeout(db.session)
+    updated = recompute_stats()
+    db.session.commit()
+    print(f"Recomputed stats for {updated} users.")
+
+@commands.cli.command('process-uploads')
+def process_uploads():
+    """Upload every queued post image now instead of waiting for the web workers."""
+    handled = upload_queue.run_all()
+    print(f"Processed {handled} queued uploads.")
+    stats = upload_queue.stats()
+    if stats['in_progress']:
+        print(f"{stats['in_progress']} uploads are claimed by a worker (retried once their claim lapses).")
+
+@commands.cli.command('flush-deletions')
+def flush_deletions():
+    """Delete every queued image from storage now instead of waiting for the background flusher."""
+    flushed = deletion_flusher.flush_all()
+    print(f"Deleted {flushed} queued images.")
+    stats = deletion_flusher.stats()
+    if stats['pending']:
+        print(f"{stats['pending']} deletions still pending (failed or over the retry limit).")
+
+@commands.cli.command('sweep-posts')
+def sweep_posts():
+    """Expire posts past expires_at and archive old claimed/expired posts now."""
+    without_statement_timeout(db.session)
+    expired, archived = post_sweeper.sweep()
+    print(f"Expired {expired} posts, archived {archived}.")
+
+@commands.cli.command('prune-events')
+def prune_events():
+    """Delete live-feed events older than the retention window (database broker only)."""
+    if event_feed.broker.name != 'database':
+        print("The memory broker keeps no table to prune.")
+        return
+    deleted = event_feed.broker.prune(db.session)
+    db.session.commit()
+    print(f"Deleted {deleted} old events.")
+
+@commands.cli.command('seed')
+@click.option('--users', default=500, show_default=True, help='Users to create.')
+@click.option('--posts', default=10000, show_default=True, help='Food posts to create.')
+@click.option('--requests-per-post', default=2.0, show_default=True, help='Average requests per approved post.')
+@click.option('--seed', 'seed_value', default=42, show_default=True, help='Random seed.')
+def seed_command(users, posts, requests_per_post, seed_value):
+    """Fill the database with synthetic users, posts, requests and ratings (for benchmarks)."""
+    migrations.upgrade()
+    without_statement_timeout(db.session)
+    counts = seed.seed(users, posts, requests_per_post, seed_value=seed_value)
+    print("Created " + ", ".join(f"{count} {name}" for name, count in counts.items())
+          + f". Every seeded user's password is '{seed.SEED_PASSWORD}'.")
+
+@commands.cli.command('db-upgrade')
+def db_upgrade():
+    """Create missing tables and apply pending schema migrations."""
+    applied = migrations.upgrade()
+    for version, description in applied:
+        print(f"Applied migration {version}: {description}")
+    if not applied:
+        print("Schema is up to date.")
+
+@commands.cli.command('check-db')
+def check_db():
+    """Print the effective database settings, connect with them and compare them with the server."""
+    failed = False
+    for ok, message in check_database(current_app._get_current_object(), db):
+        print(f"[{'ok' if ok else 'FAIL'}] {message}")
+        failed = failed or not ok
+    if failed:
+        raise SystemExit(1)
+
+@commands.cli.command('check-indexes')
+def check_indexes():
+    """EXPLAIN each route's main query and fail if any of them scans a whole table."""
+    failed = False
+    for route, (plan, uses_index) in migrations.check_indexes().items():
+        print(f"[{'ok' if uses_index else 'NO INDEX'}] {route}")
+        for line in plan:
+            print(f"    {line}")
+        failed = failed or not uses_index
+    if failed:
+        raise SystemExit(1)
@@ -0,0 +1,214 @@
+#config.py
+# Database engine settings per deployment profile. DB_PROFILE picks the
+# defaults ('production' when DATABASE_URL points at PostgreSQL, otherwise
+# 'development'); any DB_* environment variable overrides its profile value.
+#
+# Each gunicorn worker (WEB_CONCURRENCY of them) has its own pool, sized
+# for the threads that can hold a connection at once: request threads
+# (WEB_THREADS), the upload workers and the deletion flusher.
+# DB_MAX_CONNECTIONS is the server's connection budget; the startup check
+# refuses settings whose pools could add up to more than that.
+#
+#   flask --app app check-db    print the effective settings and test them
+import time
+
+from sqlalchemy import event, exc, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+
+from instrumentation import instrumentation
+
+PROFILES = {
+    # Local runs, usually SQLite: a small pool, WAL so page views don't block on a write
+    'development': {
+        'DB_POOL_SIZE': 5,
+        'DB_MAX_OVERFLOW': 5,
+        'DB_POOL_TIMEOUT': 30,
+        'DB_POOL_RECYCLE': -1,
+        'DB_PRE_PING': False,
+        'DB_STATEMENT_TIMEOUT_MS': 0,
+        'SQLITE_BUSY_TIMEOUT_MS': 5000,
+    },
+    # gunicorn against a hosted PostgreSQL
+    'production': {
+        'DB_POOL_SIZE': None,  # worker_demand() unless set
+        'DB_MAX_OVERFLOW': 2,
+        'DB_POOL_TIMEOUT': 10,
+        # Recycle before the ~5 minute idle cutoff of hosted databases and their proxies
+        'DB_POOL_RECYCLE': 280,
+        'DB_PRE_PING': True,
+        'DB_STATEMENT_TIMEOUT_MS': 5000,
+        'SQLITE_BUSY_TIMEOUT_MS': 5000,
+    },
+}
+
+
+def _parse(value, default):
+    if isinstance(default, bool):
+        return value.lower() in ('1', 'true', 'yes', 'on')
+    if isinstance(default, float):
+        return float(value)
+    return int(value)
+
+
+def database_settings(database_uri, environ):
+    """The DB_* settings for app.config: profile defaults overridden by the environment."""
+    url = make_url(database_uri)
+    profile = environ.get('DB_PROFILE') or ('production' if url.get_backend_name() == 'postgresql'
+                                            else 'development')
+    settings = {'DB_PROFILE': profile}
+    for name, default in PROFILES.get(profile, PROFILES['development']).items():
+        value = environ.get(name)
+        settings[name] = _parse(value, default if default is not None else 0) if value else default
+    settings['WEB_CONCURRENCY'] = int(environ.get('WEB_CONCURRENCY', 1))
+    settings['WEB_THREADS'] = int(environ.get('WEB_THREADS', 1))
+    settings['DB_MAX_CONNECTIONS'] = int(environ['DB_MAX_CONNECTIONS']) if environ.get('DB_MAX_CONNECTIONS') else None
+    return settings
+
+
+def worker_demand(config):
+    """Connections one worker can hold at once: request threads, upload workers, deletion flusher."""
+    return config['WEB_THREADS'] + config.get('UPLOAD_WORKERS', 2) + 1
+
+
+# Live-feed capacity. An open /events/stream (or /events/poll) holds one of
+# its worker's WEB_THREADS for up to EVENT_STREAM_SECONDS, reconnecting ~2s
+# after each close, and the database broker runs one event_log query per
+# EVENT_POLL_INTERVAL for it (on a briefly checked-out pooled connection,
+# already counted in WEB_THREADS above). A worker therefore keeps at most
+# event_listeners() tabs live and WEB_THREADS - event_listeners() threads
+# for pages; further tabs get a 503 and retry (events.py). With the
+# Procfile's 8 threads: 4 live tabs and 4 page threads per worker, so
+# WEB_CONCURRENCY x 4 live tabs in all and ~4 event_log queries a second
+# per worker.
+def event_listeners(config):
+    """Open streams/long-polls one worker serves at once: EVENT_MAX_LISTENERS, else half its threads."""
+    return config.get('EVENT_MAX_LISTENERS') or max(config['WEB_THREADS'] // 2, 1)
+
+
+def pool_size(config):
+    return config['DB_POOL_SIZE'] or worker_demand(config)
+
+
+def _in_memory(url):
+    return url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:')
+
+
+def validate_database_config(config):
+    """Raise ValueError listing every problem with the DB_* settings."""
+    problems = []
+    if config['DB_PROFILE'] not in PROFILES:
+        problems.append(f"DB_PROFILE must be one of {', '.join(PROFILES)}, not {config['DB_PROFILE']!r}")
+    if config['WEB_CONCURRENCY'] < 1 or config['WEB_THREADS'] < 1:
+        problems.append("WEB_CONCURRENCY and WEB_THREADS must be at least 1")
+    size, overflow = pool_size(config), config['DB_MAX_OVERFLOW']
+    if size < 1:
+        problems.append("DB_POOL_SIZE must be at least 1")
+    if overflow < 0:
+        problems.append("DB_MAX_OVERFLOW must be 0 or more")
+    elif size + overflow < worker_demand(config):
+        problems.append(f"pool {size} + overflow {overflow} is less than the {worker_demand(config)} threads "
+                        f"per worker that use the database (WEB_THREADS + UPLOAD_WORKERS + 1)")
+    if config['DB_POOL_TIMEOUT'] <= 0:
+        problems.append("DB_POOL_TIMEOUT must be positive")
+    if config['DB_STATEMENT_TIMEOUT_MS'] < 0 or config['SQLITE_BUSY_TIMEOUT_MS'] < 0:
+        problems.append("DB_STATEMENT_TIMEOUT_MS and SQLITE_BUSY_TIMEOUT_MS must be 0 or more")
+    budget = config['DB_MAX_CONNECTIONS']
+    if budget is not None and config['WEB_CONCURRENCY'] * (size + overflow) > budget:
+        problems.append(f"{config['WEB_CONCURRENCY']} workers x (pool {size} + overflow {overflow}) "
+                        f"can open more than DB_MAX_CONNECTIONS={budget} connections")
+    if problems:
+        raise ValueError("Invalid database settings:\n  " + "\n  ".join(problems))
+
+
+def engine_options(config):
+    """SQLALCHEMY_ENGINE_OPTIONS for the configured database and profile."""
+    url = make_url(config['SQLALCHEMY_DATABASE_URI'])
+    if _in_memory(url):
+        return {}  # Flask-SQLAlchemy uses a StaticPool for these
+    options = {
+        'pool_size': pool_size(config),
+        'max_overflow': config['DB_MAX_OVERFLOW'],
+        'pool_timeout': config['DB_POOL_TIMEOUT'],
+        'pool_recycle': config['DB_POOL_RECYCLE'],
+        'pool_pre_ping': config['DB_PRE_PING'],
+    }
+    if config.get('INSTRUMENTATION'):
+        options['poolclass'] = TimedQueuePool
+    backend = url.get_backend_name()
+    if backend == 'postgresql' and config['DB_STATEMENT_TIMEOUT_MS']:
+        # Server-side, so a runaway query is cancelled even if the worker has been killed
+        options['connect_args'] = {'options': f"-c statement_timeout={config['DB_STATEMENT_TIMEOUT_MS']}"}
+    elif backend == 'sqlite':
+        options['connect_args'] = {'timeout': config['SQLITE_BUSY_TIMEOUT_MS'] / 1000}
+    return options
+
+
+def init_engine(app, db):
+    """Per-connection setup that engine options can't express (SQLite pragmas)."""
+    with app.app_context():
+        engine = db.engine
+    if engine.dialect.name != 'sqlite' or _in_memory(engine.url):
+        return
+    busy_timeout = app.config['SQLITE_BUSY_TIMEOUT_MS']
+
+    @event.listens_for(engine, 'connect')
+    def _sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        # Readers no longer wait for the writer, and a commit syncs only the log
+        cursor.execute('PRAGMA journal_mode=WAL')
+        cursor.execute('PRAGMA synchronous=NORMAL')
+        cursor.execute(f'PRAGMA busy_timeout={int(busy_timeout)}')
+        cursor.close()
+
+
+def without_statement_timeout(conn):
+    """Lift the statement timeout for the rest of this transaction (migrations, batch jobs)."""
+    dialect = conn.dialect if hasattr(conn, 'dialect') else conn.get_bind().dialect  # Connection or Session
+    if dialect.name == 'postgresql':
+        conn.execute(text('SET LOCAL statement_timeout = 0'))
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that reports how long each checkout waited (see instrumentation.py)."""
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            instrumentation.observe_pool_wait(self, time.perf_counter() - start, timed_out=True)
+            raise
+        instrumentation.observe_pool_wait(self, time.perf_counter() - start)
+        return connection
+
+
+def check_database(app, db):
+    """
+    Connect with the configured settings and compare them with the server.
+    Returns [(ok, message), ...].
+    """
+    config = app.config
+    results = []
+    size, overflow = pool_size(config), config['DB_MAX_OVERFLOW']
+    results.append((True, f"profile {config['DB_PROFILE']}: {config['WEB_CONCURRENCY']} workers x "
+                          f"(pool {size} + overflow {overflow}), timeout {config['DB_POOL_TIMEOUT']}s, "
+                          f"recycle {config['DB_POOL_RECYCLE']}s, pre-ping {config['DB_PRE_PING']}"))
+    try:
+        with app.app_context(), db.engine.connect() as conn:
+            if conn.dialect.name == 'postgresql':
+                server_max = int(conn.execute(text('SHOW max_connections')).scalar())
+                total = config['WEB_CONCURRENCY'] * (size + overflow)
+                results.append((total < server_max, f"up to {total} connections of the server's "
+                                                    f"max_connections={server_max}"))
+                timeout = conn.execute(text('SHOW statement_timeout')).scalar()
+                expected = config['DB_STATEMENT_TIMEOUT_MS']
+                results.append((not expected or timeout not in ('0', '0ms'), f"statement_timeout={timeout}"))
+            elif conn.dialect.name == 'sqlite':
+                mode = conn.execute(text('PRAGMA journal_mode')).scalar()
+                busy = conn.execute(text('PRAGMA busy_timeout')).scalar()
+                in_memory = _in_memory(conn.engine.url)
+                results.append((in_memory or mode == 'wal', f"journal_mode={mode}, busy_timeout={busy}ms"))
+    except exc.SQLAlchemyError as e:
+        results.append((False, f"could not connect: {e}"))
+    return results
@@ -0,0 +1,254 @@
+#events.py
+# Live feed of post-approved / post-claimed / request-received events for
+# the /events/stream (SSE) and /events/poll (long-poll) endpoints.
+# Routes call publish() next to their other changes; an event is delivered
+# only if that transaction commits. Two brokers:
+#   MemoryBroker    - ring buffer in this process (single worker, development)
+#   DatabaseBroker  - the event_log table, written in the route's own
+#                     transaction, so every gunicorn worker sees every event
+# Each open stream or long-poll holds a request thread, so a worker serves
+# only event_listeners() of them at once (config.py); the rest get a 503.
+#
+# Readers resume from a position string (the SSE id / the poll's last_id):
+# a horizon id every earlier event is settled below, plus the ids above it
+# already delivered, e.g. "42" or "42:44,45". With the database broker an
+# event's id is assigned at insert but shows up at commit, so a lower id can
+# appear after a higher one; the horizon only moves past events older than
+# EVENT_COMMIT_GRACE seconds, and anything newer is re-read until then.
+import json
+import threading
+import time
+from collections import deque, namedtuple
+from datetime import datetime, timedelta
+
+from sqlalchemy import event, func
+from sqlalchemy.orm import Session
+
+from models import db, EventLog
+from config import event_listeners
+
+Event = namedtuple('Event', ['id', 'type', 'data', 'user_id'])
+
+# session.info key holding the events staged by the current transaction
+_STAGED = 'feed_events'
+
+
+def _visible(ev, user_id):
+    return ev.user_id is None or ev.user_id == user_id
+
+
+def format_position(horizon, delivered=()):
+    """Position string for a reader: horizon id plus the ids above it it already has."""
+    if not delivered:
+        return str(horizon)
+    return f"{horizon}:{','.join(map(str, sorted(delivered)))}"
+
+
+def parse_position(position):
+    """(horizon, frozenset of delivered ids) from a position string. Raises ValueError if malformed."""
+    horizon, _, delivered = str(position).partition(':')
+    return int(horizon), frozenset(int(event_id) for event_id in delivered.split(',') if delivered)
+
+
+class MemoryBroker:
+    """Keeps the last max_events events of this process in memory."""
+    name = 'memory'
+
+    def __init__(self, max_events=1000):
+        self._events = deque(maxlen=max_events)
+        self._cond = threading.Condition()
+        self._last_id = 0
+
+    def stage(self, session, event_type, data, user_id):
+        pass  # nothing to write; committed() receives the staged events
+
+    def committed(self, staged):
+        with self._cond:
+            for event_type, data, user_id in staged:
+                self._last_id += 1
+                self._events.append(Event(self._last_id, event_type, data, user_id))
+            self._cond.notify_all()
+
+    def start(self):
+        return self._last_id, frozenset()
+
+    def _after(self, after_id, user_id):
+        return [ev for ev in self._events if ev.id > after_id and _visible(ev, user_id)]
+
+    def read(self, horizon, delivered, user_id, timeout):
+        # Ids are handed out at commit, in order, so the horizon alone is enough here
+        with self._cond:
+            # Ids restart with the process; a client ahead of us starts over from now
+            if horizon > self._last_id:
+                horizon = self._last_id
+            events = self._after(horizon, user_id)
+            deadline = time.monotonic() + timeout
+            while not events and (remaining := deadline - time.monotonic()) > 0:
+                self._cond.wait(remaining)
+                events = self._after(horizon, user_id)
+            return events, (events[-1].id if events else horizon), frozenset()
+
+
+class DatabaseBroker:
+    """
+    Stores events in event_log. Readers poll the table every poll_interval
+    seconds (sooner when this process commits an event) using short-lived
+    connections, so an open stream doesn't hold a pooled connection. Events
+    younger than grace seconds stay above the reader's horizon, so one whose
+    transaction commits after a higher id's is still picked up.
+    """
+    name = 'database'
+
+    def __init__(self, poll_interval=1.0, retention=3600, prune_every=200, grace=10.0, batch_size=100):
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self.prune_every = prune_every
+        self.grace = timedelta(seconds=grace)
+        self.batch_size = batch_size
+        self._cond = threading.Condition()
+        self._staged_count = 0
+
+    def stage(self, session, event_type, data, user_id):
+        session.add(EventLog(event_type=event_type, payload=json.dumps(data), user_id=user_id))
+        self._staged_count += 1
+        if self._staged_count % self.prune_every == 0:
+            self.prune(session)
+
+    def committed(self, staged):
+        with self._cond:
+            self._cond.notify_all()
+
+    def prune(self, session):
+        """Delete events older than the retention window; returns the row count."""
+        cutoff = datetime.utcnow() - timedelta(seconds=self.retention)
+        result = session.execute(db.delete(EventLog).where(EventLog.created_at < cutoff))
+        return result.rowcount
+
+    def start(self):
+        # Events older than the grace period are settled; newer ones count as already seen
+        cutoff = datetime.utcnow() - self.grace
+        with db.engine.connect() as conn:
+            horizon = conn.execute(db.select(func.max(EventLog.id)).where(EventLog.created_at <= cutoff)).scalar()
+            recent = conn.execute(db.select(EventLog.id).where(EventLog.id > (horizon or 0))).scalars().all()
+        return horizon or 0, frozenset(recent)
+
+    def _after(self, horizon):
+        # Every row above the horizon, not just the reader's: they all move the horizon
+        stmt = (db.select(EventLog.id, EventLog.event_type, EventLog.payload, EventLog.user_id, EventLog.created_at)
+                .where(EventLog.id > horizon)
+                .order_by(EventLog.id)
+                .limit(self.batch_size))
+        with db.engine.connect() as conn:
+            return conn.execute(stmt).all()
+
+    def _advance(self, horizon, delivered, user_id):
+        """Read past the position once: (new events for user_id, horizon, delivered, more rows waiting)."""
+        rows = self._after(horizon)
+        cutoff = datetime.utcnow() - self.grace
+        events, delivered = [], set(delivered)
+        for row in rows:
+            if row.id in delivered:
+                continue
+            delivered.add(row.id)
+            ev = Event(row.id, row.event_type, json.loads(row.payload), row.user_id)
+            if _visible(ev, user_id):
+                events.append(ev)
+        # Rows come in id order; those older than the grace period can't have a lower id still to come
+        for row in rows:
+            if row.created_at > cutoff:
+                break
+            horizon = row.id
+        return events, horizon, frozenset(i for i in delivered if i > horizon), len(rows) == self.batch_size
+
+    def read(self, horizon, delivered, user_id, timeout):
+        deadline = time.monotonic() + timeout
+        while True:
+            events, horizon, delivered, more = self._advance(horizon, delivered, user_id)
+            remaining = deadline - time.monotonic()
+            if events or remaining <= 0:
+                return events, horizon, delivered
+            if more:
+                continue  # a full batch of other users' events; keep reading
+            with self._cond:
+                self._cond.wait(min(self.poll_interval, remaining))
+
+
+class EventFeed:
+    """Front end for the configured broker (EVENT_BROKER: 'database' or 'memory')."""
+
+    def __init__(self, app=None):
+        self.broker = None
+        self.turned_away = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        kind = app.config.get('EVENT_BROKER', 'database')
+        if kind == 'memory':
+            self.broker = MemoryBroker()
+        elif kind == 'database':
+            self.broker = DatabaseBroker(
+                poll_interval=float(app.config.get('EVENT_POLL_INTERVAL', 1.0)),
+                retention=int(app.config.get('EVENT_RETENTION', 3600)),
+                grace=float(app.config.get('EVENT_COMMIT_GRACE', 10)),
+            )
+        else:
+            raise ValueError(f"Unknown EVENT_BROKER: {kind!r}")
+        self.max_listeners = event_listeners(app.config)
+        self._listeners = threading.BoundedSemaphore(self.max_listeners)
+        for name, hook in _SESSION_HOOKS:
+            if not event.contains(Session, name, hook):
+                event.listen(Session, name, hook)
+
+    def publish(self, event_type, data, user_id=None):
+        """Stage an event for everyone (or only user_id) in the current transaction."""
+        db.session.info.setdefault(_STAGED, []).append((event_type, data, user_id))
+        self.broker.stage(db.session, event_type, data, user_id)
+
+    def join(self):
+        """Take one of this worker's listener slots; False when all are in use. Pair with leave()."""
+        if self._listeners.acquire(blocking=False):
+            return True
+        self.turned_away += 1
+        return False
+
+    def leave(self):
+        self._listeners.release()
+
+    def start(self):
+        """Position string for a reader starting now."""
+        return format_position(*self.broker.start())
+
+    def read(self, position, user_id, timeout):
+        """
+        (events past position visible to user_id, new position), waiting up
+        to timeout seconds for an event. Raises ValueError for a malformed position.
+        """
+        events, horizon, delivered = self.broker.read(*parse_position(position), user_id, timeout)
+        return events, format_position(horizon, delivered)
+
+
+def format_sse(ev, position=None):
+    """One Server-Sent Events message; position, when given, becomes its id (Last-Event-ID)."""
+    head = f"id: {position}\n" if position is not None else ""
+    return f"{head}event: {ev.type}\ndata: {json.dumps(ev.data)}\n\n"
+
+
+event_feed = EventFeed()
+
+
+# --- Session hooks ---
+def _deliver(session):
+    staged = session.info.pop(_STAGED, None)
+    if staged:
+        event_feed.broker.committed(staged)
+
+
+def _discard(session):
+    session.info.pop(_STAGED, None)
+
+
+_SESSION_HOOKS = (
+    ('after_commit', _deliver),
+    ('after_rollback', _discard),
+)
@@ -0,0 +1,205 @@
+#expiry.py
+# Leftover food goes bad. Every post gets an expires_at when it is created
+# (the donor picks from POST_TTL_CHOICES; POST_TTL_HOURS by default), and
+# PostSweeper turns available posts past it into 'expired', a batch at a
+# time with one bulk UPDATE, declining their pending requests on the way.
+#
+# Claimed and expired posts older than ARCHIVE_AFTER_DAYS then move, with
+# their requests and ratings, into the *_archive tables (models.py), so the
+# tables behind the hot queries only hold recent posts. The stats counters
+# count the archives too; only the available -> expired move changes them.
+# A claimed post whose pickup hasn't been rated yet stays until
+# RATING_WINDOW_DAYS have passed, so the claimant can still rate it from the
+# dashboard. Archived posts' images go through the deletion outbox.
+#
+#   flask --app app sweep-posts    expire and archive now
+import logging
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+from models import db, FoodPost, Request, Rating, food_post_archive, request_archive, rating_archive
+from stats import adjust_counts
+from events import event_feed
+from outbox import queue_deletion
+
+log = logging.getLogger(__name__)
+
+DEFAULT_POST_TTL_HOURS = 24
+POST_TTL_CHOICES = (6, 12, 24, 48, 72)  # hours, offered on the post form
+
+
+def post_expiry(hours, default_hours=DEFAULT_POST_TTL_HOURS):
+    """expires_at for a post created now, lasting hours if that is one of the offered choices."""
+    if hours not in POST_TTL_CHOICES:
+        hours = default_hours
+    return datetime.utcnow() + timedelta(hours=hours)
+
+
+def due_for_expiry(now, limit):
+    """Ids of available posts past expires_at, oldest first (partial index ix_food_post_expiry)."""
+    return (db.select(FoodPost.id)
+            .where(FoodPost.status == 'available', FoodPost.expires_at <= now)
+            .order_by(FoodPost.expires_at)
+            .limit(limit))
+
+
+def awaiting_rating():
+    """True for a post with an accepted request its requester hasn't rated yet."""
+    rated = db.exists().where(Rating.request_id == Request.id, Rating.from_user_id == Request.requester_id)
+    return db.exists().where(Request.food_id == FoodPost.id, Request.status == 'accepted', ~rated)
+
+
+def due_for_archive(cutoff, rating_cutoff, limit):
+    """
+    Ids of claimed/expired posts last changed before cutoff, oldest first.
+    Posts with a pickup still awaiting its rating wait until rating_cutoff.
+    """
+    return (db.select(FoodPost.id)
+            .where(FoodPost.status.in_(('claimed', 'expired')), FoodPost.updated_at < cutoff,
+                   db.or_(FoodPost.updated_at < rating_cutoff, ~awaiting_rating()))
+            .order_by(FoodPost.updated_at)
+            .limit(limit))
+
+
+def _move(model, archive, criteria, archived_at):
+    """Copy model's rows matching criteria into archive, then delete them."""
+    columns = [model.__table__.c[name] for name in archive.c.keys() if name != 'archived_at']
+    db.session.execute(archive.insert().from_select(
+        [column.name for column in columns] + ['archived_at'],
+        db.select(*columns, db.literal(archived_at, db.DateTime)).where(criteria)))
+    db.session.execute(db.delete(model).where(criteria), execution_options={'synchronize_session': False})
+
+
+class PostSweeper:
+    """
+    Expires and archives posts from a background thread every interval
+    seconds. The thread starts with the first request a worker serves, so
+    each forked gunicorn worker runs one; batches from different workers
+    don't overlap (guarded UPDATEs, SKIP LOCKED on PostgreSQL).
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self._thread = None
+        self._lock = threading.Lock()
+        self.expired = 0
+        self.archived = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.interval = float(app.config.get('EXPIRY_SWEEP_INTERVAL', 60))
+        self.archive_after = timedelta(days=float(app.config.get('ARCHIVE_AFTER_DAYS', 30)))
+        # How long a claimant has to rate a pickup before its post may be archived anyway
+        self.rating_window = timedelta(days=float(app.config.get('RATING_WINDOW_DAYS', 90)))
+        self.batch_size = int(app.config.get('SWEEP_BATCH_SIZE', 500))
+        if self.interval > 0:
+            app.before_request(self._ensure_started)
+
+    def _ensure_started(self):
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._loop, name='post-sweeper', daemon=True)
+                    self._thread.start()
+
+    def _loop(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                with self.app.app_context():
+                    self.sweep()
+            except Exception:
+                log.exception("Post sweep failed")
+
+    def sweep(self, now=None):
+        """Expire, then archive, until both are caught up. Returns (expired, archived)."""
+        now = now or datetime.utcnow()
+        expired = archived = 0
+        while True:
+            handled = self.expire_batch(now)
+            expired += handled
+            if handled < self.batch_size:
+                break
+        while True:
+            handled = self.archive_batch(now)
+            archived += handled
+            if handled < self.batch_size:
+                break
+        return expired, archived
+
+    # --- Expiry ---
+    def expire_batch(self, now=None):
+        """Expire one batch of available posts past expires_at; returns how many were looked at."""
+        now = now or datetime.utcnow()
+        post_ids = db.session.execute(due_for_expiry(now, self.batch_size)).scalars().all()
+        if not post_ids:
+            db.session.commit()
+            return 0
+
+        # Guarded on status, so a post claimed in the meantime is left alone;
+        # RETURNING says exactly which posts (and donors) changed
+        expired = db.session.execute(
+            db.update(FoodPost)
+            .where(FoodPost.id.in_(post_ids), FoodPost.status == 'available')
+            .values(status='expired')
+            .returning(FoodPost.id, FoodPost.user_id),
+            execution_options={'synchronize_session': False}
+        ).all()
+        expired_ids = [row.id for row in expired]
+        if expired_ids:
+            db.session.execute(
+                db.update(Request)
+                .where(Request.food_id.in_(expired_ids), Request.status == 'pending')
+                .values(status='declined'),
+                execution_options={'synchronize_session': False})
+            for user_id, count in Counter(row.user_id for row in expired).items():
+                adjust_counts(user_id, available_count=-count)
+            event_feed.publish('posts-expired', {"post_ids": expired_ids})
+        db.session.commit()
+        self.expired += len(expired_ids)
+        return len(post_ids)
+
+    # --- Archival ---
+    def archive_batch(self, now=None):
+        """Move one batch of old claimed/expired posts and their requests and ratings to the archive."""
+        now = now or datetime.utcnow()
+        post_ids = db.session.execute(
+            due_for_archive(now - self.archive_after, now - self.rating_window, self.batch_size)
+            .with_for_update(skip_locked=True)
+        ).scalars().all()
+        if not post_ids:
+            db.session.commit()
+            return 0
+
+        # Nothing shows an archived post, so its images can go (once this commits)
+        images = db.session.execute(
+            db.select(FoodPost.image_url, FoodPost.thumbnail_url).where(FoodPost.id.in_(post_ids))).all()
+        queue_deletion(*(url for row in images for url in row))
+
+        request_ids = db.session.execute(
+            db.select(Request.id).where(Request.food_id.in_(post_ids))).scalars().all()
+        # Children first, for the foreign keys
+        if request_ids:
+            _move(Rating, rating_archive, Rating.request_id.in_(request_ids), now)
+            _move(Request, request_archive, Request.food_id.in_(post_ids), now)
+        _move(FoodPost, food_post_archive, FoodPost.id.in_(post_ids), now)
+        db.session.commit()
+        self.archived += len(post_ids)
+        return len(post_ids)
+
+    def stats(self):
+        return {
+            'expired': self.expired,
+            'archived': self.archived,
+            'due_to_expire': FoodPost.query.filter(FoodPost.status == 'available',
+                                                   FoodPost.expires_at <= datetime.utcnow()).count(),
+            'archived_posts': db.session.execute(
+                db.select(db.func.count()).select_from(food_post_archive)).scalar(),
+        }
+
+
+post_sweeper = PostSweeper()
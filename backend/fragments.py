@@ -0,0 +1,100 @@
+#fragments.py
+# Rendered-markup cache for the pieces of a page that are the same for
+# every viewer: post cards and the rating breakdown. Templates call
+#
+#   {{ fragment('partials/home_post_card.html', (post.id, post.updated_at), post=post) }}
+#
+# and get the partial's HTML from cache when the key has been seen before.
+# The key carries a version stamp (updated_at, request statuses, counts...),
+# so any change to what the fragment shows makes a new key and the stale
+# entry simply ages out; nothing has to be invalidated across workers.
+# Entries are bounded by total size (FRAGMENT_CACHE_BYTES) with LRU eviction.
+import os
+import threading
+from collections import OrderedDict
+
+from flask import current_app
+from markupsafe import Markup
+
+
+class FragmentCache:
+    def __init__(self, max_bytes=4 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, render):
+        """The markup cached under key, calling render() to build it on a miss."""
+        with self._lock:
+            html = self._entries.get(key)
+            if html is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return html
+            self.misses += 1
+
+        html = Markup(render())
+        if len(html) <= self.max_bytes // 16:  # one oversized fragment can't flush the rest
+            with self._lock:
+                if key not in self._entries:
+                    self._entries[key] = html
+                    self.size += len(html)
+                    while self.size > self.max_bytes:
+                        _, evicted = self._entries.popitem(last=False)
+                        self.size -= len(evicted)
+                        self.evictions += 1
+        return html
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "pid": os.getpid(),
+                "entries": len(self._entries),
+                "bytes": self.size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "evictions": self.evictions,
+            }
+
+
+fragment_cache = FragmentCache(max_bytes=int(os.environ.get('FRAGMENT_CACHE_BYTES', 4 * 1024 * 1024)))
+
+
+def fragment(template_name, key, **context):
+    """
+    Render a partial template with context, cached under (template_name, key).
+    The partial may only use its context and Jinja globals such as url_for,
+    not request/current_user, since its markup is shared between viewers.
+    """
+    template = current_app.jinja_env.get_template(template_name)
+    return fragment_cache.get((template_name, key), lambda: template.render(**context))
+
+
+# --- Version stamps ---
+def donor_card_version(post, ratings_by_request):
+    """Everything a dashboard post card shows about the post's requests, for its key."""
+    return (post.updated_at, post.status, tuple(
+        (req.id, req.status, req.updated_at, req.requester.username,
+         ratings_by_request[req.id].score if req.id in ratings_by_request else None)
+        for req in post.requests))
+
+
+def rating_version(user, rating_counts):
+    """The rating breakdown only depends on these numbers, so users with the same ones share it."""
+    return (user.num_ratings, user.avg_rating, tuple(rating_counts[i] for i in range(1, 6)))
+
+
+def init_fragments(app):
+    app.jinja_env.globals.update(fragment=fragment, donor_card_version=donor_card_version,
+                                 rating_version=rating_version)
@@ -0,0 +1,232 @@
+#geo.py
+# Spatial helpers for the nearby search: batch distance calculation,
+# geohash encoding and the bounding-box / cell cover used to prefilter
+# posts in SQL.
+import heapq
+from array import array
+from math import radians, degrees, cos, sin, asin, sqrt, floor
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional, the pure-Python path is used instead
+    np = None
+
+EARTH_RADIUS_KM = 6371
+GEOHASH_PRECISION = 9  # ~5m x 5m cells, stored on every FoodPost
+MAX_COVER_CELLS = 16   # upper bound on prefix ranges per nearby query
+
+_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+
+def haversine(lat1, lon1, lat2, lon2):
+    """
+    Calculate the great-circle distance between two points
+    on the earth (specified in decimal degrees)
+    """
+    # convert decimal degrees to radians
+    lat1, lon1, lat2, lon2 = map(radians, [lat1, lon1, lat2, lon2])
+
+    # haversine formula
+    dlon = lon2 - lon1
+    dlat = lat2 - lat1
+    a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
+    c = 2 * asin(sqrt(a))
+    return c * EARTH_RADIUS_KM
+
+
+# --- Batch distances ---
+def distances_km(lat, lon, lats, lons):
+    """
+    Distances in km from one origin to every point in lats/lons.
+    Returns a numpy array when numpy is installed, otherwise an array('d').
+    """
+    if np is not None:
+        lat0, lon0 = np.radians(lat), np.radians(lon)
+        lat_r = np.radians(np.asarray(lats, dtype=np.float64))
+        lon_r = np.radians(np.asarray(lons, dtype=np.float64))
+        a = np.sin((lat_r - lat0) / 2) ** 2 + np.cos(lat0) * np.cos(lat_r) * np.sin((lon_r - lon0) / 2) ** 2
+        return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+    lat0, lon0 = radians(lat), radians(lon)
+    cos_lat0 = cos(lat0)
+    out = array('d', bytes(8 * len(lats)))
+    for i, (plat, plon) in enumerate(zip(lats, lons)):
+        plat, plon = radians(plat), radians(plon)
+        a = sin((plat - lat0) / 2) ** 2 + cos_lat0 * cos(plat) * sin((plon - lon0) / 2) ** 2
+        out[i] = 2 * EARTH_RADIUS_KM * asin(sqrt(min(a, 1.0)))
+    return out
+
+
+def nearest(lat, lon, lats, lons, max_km=None, k=None, ids=None, after=None):
+    """
+    (index, distance_km) pairs for the points, closest first, ties broken
+    by ids (the point's index when not given). max_km drops points further
+    away, after=(distance_km, id) drops points at or before that key (for
+    keyset paging), and k keeps only the first k, found without sorting
+    the rest.
+    """
+    dists = distances_km(lat, lon, lats, lons)
+    if np is not None:
+        keys = np.arange(len(dists)) if ids is None else np.asarray(ids)
+        mask = np.ones(len(dists), dtype=bool)
+        if max_km is not None:
+            mask &= dists <= max_km
+        if after is not None:
+            mask &= (dists > after[0]) | ((dists == after[0]) & (keys > after[1]))
+        idx = np.flatnonzero(mask)
+        if k is not None and k < len(idx):
+            # Everything up to the k-th smallest distance, ties at the cut included, so
+            # the id tie-break below still picks the right ones
+            cut = np.partition(dists[idx], k - 1)[k - 1]
+            idx = idx[dists[idx] <= cut]
+        idx = idx[np.lexsort((keys[idx], dists[idx]))][:k]
+        return [(int(i), float(dists[i])) for i in idx]
+
+    keys = range(len(dists)) if ids is None else ids
+    entries = [(d, keys[i], i) for i, d in enumerate(dists)
+               if (max_km is None or d <= max_km) and (after is None or (d, keys[i]) > tuple(after))]
+    entries = heapq.nsmallest(k, entries) if k is not None else sorted(entries)
+    return [(i, d) for d, _, i in entries]
+
+
+# --- Geohash ---
+def encode_geohash(lat, lon, precision=GEOHASH_PRECISION):
+    """Encode a point as a geohash string of the given length."""
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bit, ch, even = 0, 0, True
+    while len(chars) < precision:
+        rng, value = (lon_range, lon) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        if value >= mid:
+            ch = (ch << 1) | 1
+            rng[0] = mid
+        else:
+            ch = ch << 1
+            rng[1] = mid
+        even = not even
+        bit += 1
+        if bit == 5:
+            chars.append(_BASE32[ch])
+            bit, ch = 0, 0
+    return ''.join(chars)
+
+
+def cell_size(precision):
+    """Return (lat_degrees, lon_degrees) covered by one geohash cell."""
+    bits = 5 * precision
+    lat_bits = bits // 2
+    lon_bits = bits - lat_bits
+    return 180.0 / (1 << lat_bits), 360.0 / (1 << lon_bits)
+
+
+# --- Bounding boxes ---
+def bounding_boxes(lat, lon, radius_km):
+    """
+    Return the lat/lon boxes that contain every point within radius_km of
+    (lat, lon), as (min_lat, min_lon, max_lat, max_lon) tuples. A box that
+    crosses the antimeridian is split in two.
+    """
+    dlat = degrees(radius_km / EARTH_RADIUS_KM)
+    min_lat, max_lat = lat - dlat, lat + dlat
+    if min_lat <= -90 or max_lat >= 90:
+        # The circle contains a pole, so every longitude is in range
+        return [(max(min_lat, -90.0), -180.0, min(max_lat, 90.0), 180.0)]
+
+    dlon = degrees(asin(min(1.0, sin(radius_km / EARTH_RADIUS_KM) / cos(radians(lat)))))
+    min_lon, max_lon = lon - dlon, lon + dlon
+    if min_lon < -180:
+        return [(min_lat, min_lon + 360, max_lat, 180.0), (min_lat, -180.0, max_lat, max_lon)]
+    if max_lon > 180:
+        return [(min_lat, min_lon, max_lat, 180.0), (min_lat, -180.0, max_lat, max_lon - 360)]
+    return [(min_lat, min_lon, max_lat, max_lon)]
+
+
+def _cell_span(min_value, max_value, origin, step):
+    first = int(floor((min_value - origin) / step))
+    last = int(floor((max_value - origin) / step))
+    return first, last
+
+
+def cover_cells(boxes, max_cells=MAX_COVER_CELLS):
+    """
+    Return the geohash prefixes that together cover all the given boxes.
+    Picks the longest prefix length that needs at most max_cells prefixes,
+    so small radii hit a handful of tight ranges and large radii fall back
+    to a few coarse ones.
+    """
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        h, w = cell_size(precision)
+        spans = []
+        count = 0
+        for min_lat, min_lon, max_lat, max_lon in boxes:
+            lat_span = _cell_span(min_lat, max_lat, -90.0, h)
+            lon_span = _cell_span(min_lon, max_lon, -180.0, w)
+            spans.append((lat_span, lon_span))
+            count += (lat_span[1] - lat_span[0] + 1) * (lon_span[1] - lon_span[0] + 1)
+        if count <= max_cells:
+            break
+
+    cells = set()
+    for (lat_first, lat_last), (lon_first, lon_last) in spans:
+        for i in range(lat_first, lat_last + 1):
+            center_lat = min(-90.0 + (i + 0.5) * h, 90.0)
+            for j in range(lon_first, lon_last + 1):
+                center_lon = min(-180.0 + (j + 0.5) * w, 180.0)
+                cells.add(encode_geohash(center_lat, center_lon, precision))
+    return sorted(cells)
+
+
+def prefix_upper_bound(prefix):
+    """Exclusive upper bound for a prefix range scan ('~' sorts after 'z')."""
+    return prefix + '~'
+
+
+def decode_cell(geohash):
+    """Return the (min_lat, min_lon, max_lat, max_lon) box of a geohash cell."""
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    even = True
+    for char in geohash:
+        value = _BASE32.index(char)
+        for shift in range(4, -1, -1):
+            rng = lon_range if even else lat_range
+            mid = (rng[0] + rng[1]) / 2
+            if (value >> shift) & 1:
+                rng[0] = mid
+            else:
+                rng[1] = mid
+            even = not even
+    return lat_range[0], lon_range[0], lat_range[1], lon_range[1]
+
+
+# --- Quantized nearby queries (see cache.NearbyCache) ---
+# (largest radius in km, geohash precision of the query's cell); the cell
+# shrinks with the radius so the shared search area stays close to the asked one
+RADIUS_BUCKETS = ((1, 6), (2, 6), (5, 6), (10, 6), (25, 5), (50, 5), (100, 5), (250, 4), (500, 4))
+
+
+def quantize_query(lat, lon, radius_km):
+    """
+    (cell, bucket_km) for a nearby query: the geohash cell holding the point
+    and the radius rounded up to a bucket. None when the radius is past the
+    largest bucket.
+    """
+    for bucket_km, precision in RADIUS_BUCKETS:
+        if radius_km <= bucket_km:
+            return encode_geohash(lat, lon, precision), bucket_km
+    return None
+
+
+def query_circle(cell, bucket_km):
+    """
+    (lat, lon, radius_km) of a circle around the cell's center holding every
+    point within bucket_km of anywhere in the cell, i.e. everything any
+    query quantized to (cell, bucket_km) can return.
+    """
+    min_lat, min_lon, max_lat, max_lon = decode_cell(cell)
+    lat, lon = (min_lat + max_lat) / 2, (min_lon + max_lon) / 2
+    to_corner = max(haversine(lat, lon, corner_lat, corner_lon)
+                    for corner_lat in (min_lat, max_lat) for corner_lon in (min_lon, max_lon))
+    return lat, lon, bucket_km + to_corner * 1.01  # a little slack for the curvature
@@ -0,0 +1,85 @@
+#http_cache.py
+# Conditional GET and response compression for the JSON API.
+# Routes compute a cheap validator (stamps and counts from one small query)
+# before doing any real work; not_modified() turns a matching
+# If-None-Match / If-Modified-Since into an empty 304.
+# Only single-row responses pass a last_modified: for a list, deleting a
+# row leaves the newest update stamp where it was, so If-Modified-Since
+# would wrongly match. Lists send just an ETag, whose parts include the
+# row counts.
+import gzip
+import hashlib
+from datetime import timezone
+
+from flask import request, Response
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, gzip is always available
+    brotli = None
+
+MIN_COMPRESS_BYTES = 512
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+def make_etag(*parts):
+    """Weak ETag value built from the validator parts and the full query string."""
+    digest = hashlib.sha1(repr((request.full_path,) + parts).encode()).hexdigest()
+    return digest[:20]
+
+
+def _http_date(stamp):
+    # Stamps are naive UTC; HTTP dates have whole seconds
+    if stamp is None:
+        return None
+    return stamp.replace(tzinfo=timezone.utc, microsecond=0)
+
+
+def not_modified(etag, last_modified=None):
+    """
+    An empty 304 if the client's copy is current, else None. Without
+    last_modified, If-Modified-Since is ignored and only the ETag counts.
+    """
+    if request.if_none_match:
+        fresh = request.if_none_match.contains_weak(etag)
+    elif request.if_modified_since and last_modified is not None:
+        fresh = _http_date(last_modified) <= request.if_modified_since
+    else:
+        fresh = False
+    if not fresh:
+        return None
+    response = Response(status=304)
+    set_validators(response, etag, last_modified)
+    return response
+
+
+def set_validators(response, etag, last_modified=None):
+    response.set_etag(etag, weak=True)
+    if last_modified is not None:
+        response.last_modified = _http_date(last_modified)
+    # Per-user data: browsers may keep it, but must revalidate every time
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def compress(response):
+    """Brotli or gzip a JSON body when the client accepts it (after_request hook)."""
+    if (response.status_code != 200 or response.direct_passthrough
+            or 'Content-Encoding' in response.headers
+            or response.mimetype != 'application/json'):
+        return response
+    response.vary.add('Accept-Encoding')
+    data = response.get_data()
+    if len(data) < MIN_COMPRESS_BYTES:
+        return response
+    accepted = request.accept_encodings
+    if brotli is not None and accepted['br']:
+        body, encoding = brotli.compress(data, quality=BROTLI_QUALITY), 'br'
+    elif accepted['gzip']:
+        body, encoding = gzip.compress(data, compresslevel=GZIP_LEVEL), 'gzip'
+    else:
+        return response
+    response.set_data(body)
+    response.headers['Content-Encoding'] = encoding
+    return response
@@ -0,0 +1,61 @@
+#imaging.py
+# Image processing ahead of the upload: apply and strip EXIF, cap the
+# resolution, re-encode (WebP, or JPEG where Pillow lacks WebP) and make
+# the small thumbnail the post cards use.
+import io
+from collections import namedtuple
+
+from PIL import Image, ImageOps, features
+
+MAX_IMAGE_SIZE = 1600   # longest side of the stored image, in pixels
+THUMBNAIL_SIZE = 400    # longest side of the card thumbnail
+IMAGE_QUALITY = 80
+THUMBNAIL_QUALITY = 70
+
+ProcessedImage = namedtuple('ProcessedImage', ['data', 'thumbnail', 'extension', 'width', 'height'])
+
+
+def output_format():
+    """('WEBP', '.webp') when Pillow was built with WebP, else ('JPEG', '.jpg')."""
+    if features.check('webp'):
+        return 'WEBP', '.webp'
+    return 'JPEG', '.jpg'
+
+
+def _encode(img, fmt, quality):
+    buf = io.BytesIO()
+    if fmt == 'JPEG':
+        img.save(buf, fmt, quality=quality, optimize=True, progressive=True)
+    else:
+        img.save(buf, fmt, quality=quality, method=4)
+    return buf.getvalue()
+
+
+def process_image(data, max_size=MAX_IMAGE_SIZE, thumb_size=THUMBNAIL_SIZE):
+    """
+    Turn uploaded image bytes into a resized main image and a thumbnail.
+    Raises PIL.UnidentifiedImageError (an OSError) for files that aren't images.
+    """
+    with Image.open(io.BytesIO(data)) as src:
+        # JPEGs can be decoded straight at a reduced scale (1/2, 1/4, 1/8),
+        # which is much cheaper than decoding 12MP and then shrinking
+        scale = min(1.0, max_size / max(src.size))
+        src.draft('RGB', (int(src.width * scale), int(src.height * scale)))
+        # Rotate according to the EXIF orientation, since the tag itself is dropped
+        img = ImageOps.exif_transpose(src)
+        if img.mode not in ('RGB', 'RGBA'):
+            img = img.convert('RGBA' if 'transparency' in img.info or img.mode in ('LA', 'PA') else 'RGB')
+        fmt, extension = output_format()
+        if fmt == 'JPEG' and img.mode == 'RGBA':
+            img = img.convert('RGB')
+
+        # Re-encoding from pixels only (no exif= / info passed) strips all metadata
+        img.thumbnail((max_size, max_size), Image.LANCZOS)
+        main = _encode(img, fmt, IMAGE_QUALITY)
+        width, height = img.size
+
+        thumb = img.copy()
+        thumb.thumbnail((thumb_size, thumb_size), Image.LANCZOS)
+        thumbnail = _encode(thumb, fmt, THUMBNAIL_QUALITY)
+
+    return ProcessedImage(main, thumbnail, extension, width, height)
@@ -0,0 +1,359 @@
+#instrumentation.py
+# Opt-in request instrumentation (INSTRUMENTATION=1). For every request it
+# records wall time, SQL statement count and time (engine events), template
+# render time (Flask signals) and time spent in image storage calls
+# (Cloudinary or local), plus how long it waited for a pooled database
+# connection (config.TimedQueuePool). Results go out as a Server-Timing header and are
+# aggregated per endpoint for the Prometheus text endpoint /metrics.
+#
+# With PROFILE_SLOW_REQUESTS=1 a sampling profiler also runs: a background
+# thread snapshots the stacks of in-flight requests every few milliseconds,
+# and requests slower than SLOW_REQUEST_MS get their samples written to
+# PROFILE_DIR in collapsed-stack format (flamegraph.pl, speedscope, ...).
+import os
+import sys
+import threading
+import time
+import weakref
+from collections import Counter, defaultdict
+
+from flask import g, request, Response, abort, template_rendered, before_render_template
+from flask_login import current_user
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Request duration histogram buckets, in seconds
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Pool checkout wait buckets: near zero unless the pool is exhausted
+POOL_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0)
+
+# Timings of the request running on each thread; background threads have none
+_local = threading.local()
+
+
+class RequestTiming:
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.template_time = 0.0
+        self.storage_count = 0
+        self.storage_time = 0.0
+        self.pool_wait = 0.0
+        self.samples = Counter()
+        self._template_starts = []
+
+
+def current_timing():
+    return getattr(_local, 'timing', None)
+
+
+class Metrics:
+    """Per-process aggregates, rendered in the Prometheus text format."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = Counter()                 # (endpoint, status) -> count
+        self.duration_sum = Counter()             # endpoint -> seconds
+        self.duration_buckets = defaultdict(lambda: [0] * len(BUCKETS))
+        self.sql_count = Counter()                # endpoint -> statements
+        self.sql_time = Counter()                 # endpoint -> seconds
+        self.template_time = Counter()            # endpoint -> seconds
+        self.storage_calls = Counter()            # operation -> count
+        self.storage_time = Counter()             # operation -> seconds
+        self.slow_profiles = 0
+        self.pool_wait_buckets = [0] * len(POOL_BUCKETS)
+        self.pool_wait_sum = 0.0
+        self.pool_checkouts = 0
+        self.pool_timeouts = 0
+        self.pool = None                          # weakref to the engine's pool, for the gauges
+
+    def observe_request(self, endpoint, status, duration, timing):
+        with self._lock:
+            self.requests[(endpoint, status)] += 1
+            self.duration_sum[endpoint] += duration
+            buckets = self.duration_buckets[endpoint]
+            for i, bound in enumerate(BUCKETS):
+                if duration <= bound:
+                    buckets[i] += 1
+            self.sql_count[endpoint] += timing.sql_count
+            self.sql_time[endpoint] += timing.sql_time
+            self.template_time[endpoint] += timing.template_time
+
+    def observe_storage(self, operation, duration):
+        with self._lock:
+            self.storage_calls[operation] += 1
+            self.storage_time[operation] += duration
+
+    def observe_pool_wait(self, pool, wait, timed_out):
+        with self._lock:
+            self.pool = weakref.ref(pool)
+            if timed_out:
+                self.pool_timeouts += 1
+                return
+            self.pool_checkouts += 1
+            self.pool_wait_sum += wait
+            for i, bound in enumerate(POOL_BUCKETS):
+                if wait <= bound:
+                    self.pool_wait_buckets[i] += 1
+
+    def render(self):
+        lines = []
+
+        def family(name, kind, help_text):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+
+        with self._lock:
+            family('leftoverlink_requests_total', 'counter', 'Requests handled by this worker.')
+            for (endpoint, status), count in sorted(self.requests.items()):
+                lines.append(f'leftoverlink_requests_total{{endpoint="{endpoint}",status="{status}"}} {count}')
+
+            family('leftoverlink_request_duration_seconds', 'histogram', 'Request wall time.')
+            for endpoint, buckets in sorted(self.duration_buckets.items()):
+                total = sum(c for (e, _), c in self.requests.items() if e == endpoint)
+                for bound, count in zip(BUCKETS, buckets):
+                    lines.append(f'leftoverlink_request_duration_seconds_bucket'
+                                 f'{{endpoint="{endpoint}",le="{bound}"}} {count}')
+                lines.append(f'leftoverlink_request_duration_seconds_bucket{{endpoint="{endpoint}",le="+Inf"}} {total}')
+                lines.append(f'leftoverlink_request_duration_seconds_sum{{endpoint="{endpoint}"}} '
+                             f'{self.duration_sum[endpoint]:.6f}')
+                lines.append(f'leftoverlink_request_duration_seconds_count{{endpoint="{endpoint}"}} {total}')
+
+            for name, help_text, values in (
+                ('leftoverlink_sql_statements_total', 'SQL statements executed.', self.sql_count),
+                ('leftoverlink_sql_seconds_total', 'Time spent in SQL statements.', self.sql_time),
+                ('leftoverlink_template_seconds_total', 'Time spent rendering templates.', self.template_time),
+            ):
+                family(name, 'counter', help_text)
+                for endpoint, value in sorted(values.items()):
+                    value = f'{value:.6f}' if isinstance(value, float) else value
+                    lines.append(f'{name}{{endpoint="{endpoint}"}} {value}')
+
+            family('leftoverlink_storage_calls_total', 'counter', 'Image storage (Cloudinary/local) calls.')
+            for operation, count in sorted(self.storage_calls.items()):
+                lines.append(f'leftoverlink_storage_calls_total{{operation="{operation}"}} {count}')
+            family('leftoverlink_storage_seconds_total', 'counter', 'Time spent in image storage calls.')
+            for operation, seconds in sorted(self.storage_time.items()):
+                lines.append(f'leftoverlink_storage_seconds_total{{operation="{operation}"}} {seconds:.6f}')
+
+            family('leftoverlink_db_pool_wait_seconds', 'histogram', 'Time to check a connection out of the pool.')
+            for bound, count in zip(POOL_BUCKETS, self.pool_wait_buckets):
+                lines.append(f'leftoverlink_db_pool_wait_seconds_bucket{{le="{bound}"}} {count}')
+            lines.append(f'leftoverlink_db_pool_wait_seconds_bucket{{le="+Inf"}} {self.pool_checkouts}')
+            lines.append(f'leftoverlink_db_pool_wait_seconds_sum {self.pool_wait_sum:.6f}')
+            lines.append(f'leftoverlink_db_pool_wait_seconds_count {self.pool_checkouts}')
+            family('leftoverlink_db_pool_timeouts_total', 'counter', 'Checkouts that gave up after DB_POOL_TIMEOUT.')
+            lines.append(f'leftoverlink_db_pool_timeouts_total {self.pool_timeouts}')
+            pool = self.pool() if self.pool else None
+            if pool is not None:
+                for name, help_text, value in (
+                    ('leftoverlink_db_pool_size', 'Connections the pool keeps open.', pool.size()),
+                    ('leftoverlink_db_pool_checked_out', 'Connections in use.', pool.checkedout()),
+                    ('leftoverlink_db_pool_overflow', 'Connections open beyond the pool size.',
+                     max(pool.overflow(), 0)),
+                ):
+                    family(name, 'gauge', help_text)
+                    lines.append(f'{name} {value}')
+
+            family('leftoverlink_slow_request_profiles_total', 'counter', 'Slow requests with a stack profile.')
+            lines.append(f'leftoverlink_slow_request_profiles_total {self.slow_profiles}')
+        return '\n'.join(lines) + '\n'
+
+
+class TimedStorage:
+    """Wraps a storage backend (storage.py) so its calls are timed."""
+
+    def __init__(self, storage, metrics):
+        self._storage = storage
+        self._metrics = metrics
+
+    def __getattr__(self, name):
+        attr = getattr(self._storage, name)
+        if name not in ('upload', 'delete', 'delete_many'):
+            return attr
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return attr(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                self._metrics.observe_storage(name, elapsed)
+                timing = current_timing()
+                if timing is not None:
+                    timing.storage_count += 1
+                    timing.storage_time += elapsed
+        return timed
+
+
+class StackSampler(threading.Thread):
+    """Samples the stacks of threads that are serving a request."""
+
+    def __init__(self, interval):
+        super().__init__(name='stack-sampler', daemon=True)
+        self.interval = interval
+        self.active = {}  # thread id -> RequestTiming
+        self._lock = threading.Lock()
+
+    def track(self, timing):
+        with self._lock:
+            self.active[threading.get_ident()] = timing
+
+    def untrack(self):
+        with self._lock:
+            self.active.pop(threading.get_ident(), None)
+
+    def run(self):
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                active = list(self.active.items())
+            if not active:
+                continue
+            frames = sys._current_frames()
+            for thread_id, timing in active:
+                frame = frames.get(thread_id)
+                if frame is not None:
+                    timing.samples[collapse(frame)] += 1
+
+
+def collapse(frame):
+    """A frame's stack as 'module:function;...' from the outermost call in."""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        module = os.path.splitext(os.path.basename(code.co_filename))[0]
+        names.append(f'{module}:{code.co_name}')
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+class Instrumentation:
+    def __init__(self, app=None):
+        self.metrics = Metrics()
+        self.enabled = False
+        self.sampler = None
+        self._sampler_lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = bool(app.config.get('INSTRUMENTATION'))
+        if not self.enabled:
+            return
+        self.slow_seconds = float(app.config.get('SLOW_REQUEST_MS', 500)) / 1000
+        self.profile_dir = app.config.get('PROFILE_DIR') or os.path.join(app.instance_path, 'profiles')
+        self.metrics_token = app.config.get('METRICS_TOKEN')
+        if app.config.get('PROFILE_SLOW_REQUESTS'):
+            self.sampler = StackSampler(float(app.config.get('PROFILE_INTERVAL_MS', 5)) / 1000)
+
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+        # The signals are per app; the Engine hooks are global, so a second
+        # create_app() mustn't add them again (every query would count twice)
+        template_rendered.connect(self._template_rendered, app)
+        before_render_template.connect(self._before_render_template, app)
+        for name, hook in (('before_cursor_execute', self._before_cursor_execute),
+                           ('after_cursor_execute', self._after_cursor_execute)):
+            if not event.contains(Engine, name, hook):
+                event.listen(Engine, name, hook)
+        app.add_url_rule('/metrics', 'metrics', self.metrics_view)
+
+    def wrap_storage(self, storage):
+        """The storage backend, timed when instrumentation is on."""
+        return TimedStorage(storage, self.metrics) if self.enabled else storage
+
+    # --- Request hooks ---
+    def _before_request(self):
+        timing = RequestTiming()
+        _local.timing = g._timing = timing
+        if self.sampler is not None:
+            with self._sampler_lock:
+                # Started on first use, so forked gunicorn workers each get one
+                if not self.sampler.is_alive():
+                    self.sampler.start()
+            self.sampler.track(timing)
+
+    def _after_request(self, response):
+        timing = getattr(g, '_timing', None)
+        if timing is None:
+            return response
+        duration = time.perf_counter() - timing.start
+        if self.sampler is not None:
+            self.sampler.untrack()
+        endpoint = request.endpoint or 'unmatched'
+
+        parts = [f'app;dur={duration * 1000:.1f}',
+                 f'db;dur={timing.sql_time * 1000:.1f};desc="{timing.sql_count} queries"']
+        if timing.template_time:
+            parts.append(f'tpl;dur={timing.template_time * 1000:.1f}')
+        if timing.pool_wait >= 0.001:
+            parts.append(f'pool;dur={timing.pool_wait * 1000:.1f};desc="connection wait"')
+        if timing.storage_count:
+            parts.append(f'storage;dur={timing.storage_time * 1000:.1f};desc="{timing.storage_count} calls"')
+        response.headers['Server-Timing'] = ', '.join(parts)
+
+        self.metrics.observe_request(endpoint, response.status_code, duration, timing)
+        if timing.samples and duration >= self.slow_seconds:
+            self._dump_profile(endpoint, duration, timing)
+        return response
+
+    def _teardown_request(self, exc):
+        if self.sampler is not None:
+            self.sampler.untrack()
+        _local.timing = None
+
+    def _dump_profile(self, endpoint, duration, timing):
+        os.makedirs(self.profile_dir, exist_ok=True)
+        name = f'{time.strftime("%Y%m%d-%H%M%S")}-{endpoint}-{int(duration * 1000)}ms-{os.getpid()}.folded'
+        with open(os.path.join(self.profile_dir, name), 'w') as f:
+            for stack, count in timing.samples.most_common():
+                f.write(f'{stack} {count}\n')
+        with self.metrics._lock:
+            self.metrics.slow_profiles += 1
+
+    # --- Templates ---
+    def _before_render_template(self, sender, template, context, **extra):
+        timing = current_timing()
+        if timing is not None:
+            timing._template_starts.append(time.perf_counter())
+
+    def _template_rendered(self, sender, template, context, **extra):
+        timing = current_timing()
+        if timing is not None and timing._template_starts:
+            timing.template_time += time.perf_counter() - timing._template_starts.pop()
+
+    # --- SQL ---
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if current_timing() is not None:
+            conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        timing = current_timing()
+        starts = conn.info.get('query_start')
+        if timing is not None and starts:
+            timing.sql_count += 1
+            timing.sql_time += time.perf_counter() - starts.pop()
+
+    # --- Connection pool (config.TimedQueuePool) ---
+    def observe_pool_wait(self, pool, wait, timed_out=False):
+        if not self.enabled:
+            return
+        self.metrics.observe_pool_wait(pool, wait, timed_out)
+        timing = current_timing()
+        if timing is not None:
+            timing.pool_wait += wait
+
+    # --- /metrics ---
+    def metrics_view(self):
+        # Prometheus scrapes with the token; admins can look in a browser
+        token = request.headers.get('Authorization', '')
+        if not (self.metrics_token and token == f'Bearer {self.metrics_token}'):
+            if not (current_user.is_authenticated and current_user.is_admin):
+                abort(403)
+        return Response(self.metrics.render(), mimetype='text/plain; version=0.0.4')
+
+
+instrumentation = Instrumentation()
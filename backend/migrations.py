@@ -0,0 +1,260 @@
+#migrations.py
+# Built-in schema versioning. db.create_all() only creates missing tables,
+# so columns and indexes added to existing tables are applied here, one
+# numbered step at a time. The current version lives in schema_version.
+#
+#   flask --app app db-upgrade      apply pending migrations
+#   flask --app app check-indexes   EXPLAIN each route's main query
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import Column, Integer, MetaData, String, Table, inspect, text
+
+from models import db, User, FoodPost, Request, Rating
+from geo import encode_geohash, bounding_boxes, cover_cells
+import queries
+import search
+import stats
+import expiry
+from config import without_statement_timeout
+
+_meta = MetaData()
+schema_version = Table(
+    'schema_version', _meta,
+    Column('version', Integer, nullable=False),
+    Column('description', String(200), nullable=False),
+)
+
+MIGRATIONS = []
+
+
+def migration(version, description):
+    """Register fn(conn) as schema step `version`. Steps must be idempotent."""
+    def register(fn):
+        MIGRATIONS.append((version, description, fn))
+        MIGRATIONS.sort(key=lambda m: m[0])
+        return fn
+    return register
+
+
+# --- Helpers ---
+def has_column(conn, table, column):
+    return column in {c['name'] for c in inspect(conn).get_columns(table)}
+
+
+def add_column(conn, table, column, ddl_type):
+    if not has_column(conn, table, column):
+        quoted = conn.dialect.identifier_preparer.quote(table)  # "user" is reserved on PostgreSQL
+        conn.execute(text(f'ALTER TABLE {quoted} ADD COLUMN {column} {ddl_type}'))
+
+
+def create_indexes(conn, model, *names):
+    """Create the named indexes declared on model (partial WHERE included)."""
+    for index in model.__table__.indexes:
+        if index.name in names:
+            index.create(conn, checkfirst=True)
+
+
+# --- Migrations ---
+@migration(1, 'add food_post.geohash')
+def _add_geohash(conn):
+    add_column(conn, 'food_post', 'geohash', 'VARCHAR(12)')
+    create_indexes(conn, FoodPost, 'ix_food_post_geohash')
+    # Backfill every existing post in one executemany, so the nearby search
+    # (which only reads posts by geohash range) sees them straight away
+    rows = conn.execute(text('SELECT id, lat, lon FROM food_post WHERE geohash IS NULL')).all()
+    if rows:
+        conn.execute(text('UPDATE food_post SET geohash = :g WHERE id = :id'),
+                     [{'g': encode_geohash(lat, lon), 'id': post_id} for post_id, lat, lon in rows])
+
+
+@migration(2, 'keyset pagination indexes on food_post')
+def _pagination_indexes(conn):
+    create_indexes(conn, FoodPost, 'ix_food_post_live_feed', 'ix_food_post_approval_feed',
+                   'ix_food_post_live_geohash')
+
+
+@migration(3, 'indexes for the hot filter columns')
+def _hot_filter_indexes(conn):
+    create_indexes(conn, FoodPost, 'ix_food_post_user_date', 'ix_food_post_user_status',
+                   'ix_food_post_pending_queue')
+    create_indexes(conn, Request, 'ix_request_requester_date', 'ix_request_requester_status',
+                   'ix_request_food_status', 'ix_request_pending')
+    create_indexes(conn, Rating, 'ix_rating_request_from', 'ix_rating_to_user_score')
+
+
+@migration(4, 'per-user stats counters')
+def _user_stats_counters(conn):
+    for column in ('donations_count', 'claimed_count', 'available_count', 'food_claimed_count',
+                   *stats.RATING_COLUMNS.values()):
+        add_column(conn, 'user', column, 'INTEGER NOT NULL DEFAULT 0')
+    # stats_update() also sets user.updated_at (onupdate, migration 7), so that column has to exist already
+    add_column(conn, 'user', 'updated_at', 'TIMESTAMP')
+    conn.execute(stats.stats_update())
+
+
+@migration(5, 'add food_post.image_status')
+def _image_status(conn):
+    add_column(conn, 'food_post', 'image_status', "VARCHAR(20) NOT NULL DEFAULT 'ready'")
+
+
+@migration(6, 'add food_post.thumbnail_url')
+def _thumbnail_url(conn):
+    add_column(conn, 'food_post', 'thumbnail_url', 'VARCHAR(255)')
+
+
+@migration(7, 'updated_at stamps for API validators')
+def _updated_at(conn):
+    for table in ('user', 'food_post', 'request'):
+        add_column(conn, table, 'updated_at', 'TIMESTAMP')
+    quote = conn.dialect.identifier_preparer.quote
+    conn.execute(text(f'UPDATE {quote("user")} SET updated_at = CURRENT_TIMESTAMP WHERE updated_at IS NULL'))
+    conn.execute(text('UPDATE food_post SET updated_at = post_date WHERE updated_at IS NULL'))
+    conn.execute(text('UPDATE request SET updated_at = request_date WHERE updated_at IS NULL'))
+    create_indexes(conn, FoodPost, 'ix_food_post_updated_at')
+
+
+@migration(8, 'full-text search index on food_post')
+def _search_index(conn):
+    search.create_search_index(conn)
+
+
+@migration(9, 'unique (requester_id, food_id) on request')
+def _unique_requests(conn):
+    # Duplicates slipped in through concurrent clicks; keep the accepted one, else the oldest
+    rows = conn.execute(text(
+        'SELECT r.id, r.requester_id, r.food_id, r.status FROM request r '
+        'JOIN (SELECT requester_id, food_id FROM request GROUP BY requester_id, food_id HAVING COUNT(*) > 1) d '
+        'ON r.requester_id = d.requester_id AND r.food_id = d.food_id'
+    )).all()
+    keep = {}
+    for request_id, requester_id, food_id, status in rows:
+        rank = (status != 'accepted', request_id)
+        key = (requester_id, food_id)
+        keep[key] = min(keep.get(key, rank), rank)
+    duplicates = [row.id for row in rows if keep[(row.requester_id, row.food_id)][1] != row.id]
+    if duplicates:
+        conn.execute(db.delete(Rating).where(Rating.request_id.in_(duplicates)))
+        conn.execute(db.delete(Request).where(Request.id.in_(duplicates)))
+        conn.execute(stats.stats_update())  # the deleted requests and ratings were counted
+    conn.execute(text('DROP INDEX IF EXISTS ix_request_requester_food'))
+    create_indexes(conn, Request, 'uq_request_requester_food')
+
+
+@migration(10, 'food_post.expires_at for post expiry')
+def _expires_at(conn):
+    add_column(conn, 'food_post', 'expires_at', 'TIMESTAMP')
+    # Existing posts get the default lifetime from their post date, so the
+    # sweeper expires the stale ones on its first run
+    hours = current_app.config.get('POST_TTL_HOURS', expiry.DEFAULT_POST_TTL_HOURS)
+    if conn.dialect.name == 'postgresql':
+        expires = "post_date + :hours * INTERVAL '1 hour'"
+    else:
+        expires = "datetime(post_date, '+' || :hours || ' hours')"
+    conn.execute(text(f'UPDATE food_post SET expires_at = {expires} WHERE expires_at IS NULL'), {'hours': hours})
+    create_indexes(conn, FoodPost, 'ix_food_post_expiry')
+
+
+# --- Runner ---
+def current_version(conn):
+    _meta.create_all(conn)
+    return conn.execute(db.select(db.func.max(schema_version.c.version))).scalar() or 0
+
+
+def upgrade(engine=None):
+    """Create missing tables, then apply every migration newer than the stored version."""
+    engine = engine or db.engine
+    db.metadata.create_all(engine)
+    applied = []
+    with engine.begin() as conn:
+        version = current_version(conn)
+    for step, description, fn in MIGRATIONS:
+        if step <= version:
+            continue
+        with engine.begin() as conn:
+            without_statement_timeout(conn)  # index builds and backfills can outlast the web timeout
+            fn(conn)
+            conn.execute(schema_version.insert().values(version=step, description=description))
+        applied.append((step, description))
+    if applied:
+        # Refresh planner statistics so the new indexes get picked up
+        with engine.begin() as conn:
+            without_statement_timeout(conn)
+            conn.execute(text('ANALYZE'))
+    return applied
+
+
+# --- EXPLAIN check ---
+def route_queries():
+    """
+    The main statement behind each hot route, with representative
+    parameters, as {route: (driving table, statement)}.
+    """
+    cursor = queries.encode_cursor(datetime(2024, 1, 1), 1)
+    cells = cover_cells(bounding_boxes(19.07, 72.87, 5))
+    return {
+        'home': ('food_post', queries.post_page_select(*queries.LIVE_POST_FILTER, cursor=cursor)),
+        'dashboard (admin pending)': ('food_post', queries.post_page_select(
+            FoodPost.approval_status == 'pending', cursor=cursor, descending=False)),
+        'dashboard (admin approved)': ('food_post', queries.post_page_select(
+            FoodPost.approval_status == 'approved', cursor=cursor)),
+        'dashboard (my posts)': ('food_post', queries.user_posts_query(1).statement),
+        'dashboard (post requests)': ('request', db.select(Request).where(Request.food_id.in_([1, 2, 3]))),
+        'dashboard (my requests)': ('request', queries.user_requests_query(1).statement),
+        'dashboard (ratings)': ('rating', db.select(Rating).where(Rating.request_id.in_([1, 2, 3]))),
+        'profile': ('user', db.select(User).where(User.username == 'someone')),
+        'nearby_posts': ('food_post', queries.post_record_select(*queries.LIVE_POST_FILTER, queries.in_cells(cells))),
+        'search': ('food_post', search.search_select(['rice'], *queries.LIVE_POST_FILTER)),
+        'request_food': ('request', db.select(Request).where(Request.requester_id == 1, Request.food_id == 1)),
+        'handle_request': ('request', db.select(Request).where(Request.food_id == 1, Request.status == 'pending')),
+        'submit_rating': ('rating', db.select(Rating).where(Rating.request_id == 1, Rating.from_user_id == 1)),
+        'expiry sweep': ('food_post', expiry.due_for_expiry(datetime(2024, 1, 1), 500)),
+        'archive sweep': ('food_post', expiry.due_for_archive(datetime(2024, 1, 1), datetime(2023, 10, 1), 500)),
+    }
+
+
+def explain(conn, table, stmt):
+    """
+    Return (plan lines, uses_index) for a statement on the connection's
+    dialect. Only the driving table is judged: joined lookups into tiny
+    tables are allowed to scan.
+    """
+    sql = str(stmt.compile(dialect=conn.dialect, compile_kwargs={'literal_binds': True}))
+    if conn.dialect.name == 'sqlite':
+        # Once ANALYZE has seen that a table is small, SQLite scans it. Plan
+        # without the statistics (dropped in this transaction, which
+        # check_indexes rolls back) to ask whether an index *can* serve the query.
+        stat_tables = conn.execute(text(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE 'sqlite_stat%'")).scalars().all()
+        for stat_table in stat_tables:
+            conn.execute(text(f'DELETE FROM {stat_table}'))
+        if stat_tables:
+            conn.execute(text('ANALYZE sqlite_master'))  # makes the planner reload the (now empty) stats
+        lines = [row[-1] for row in conn.execute(text('EXPLAIN QUERY PLAN ' + sql))]
+        # 'SCAN <table>' without 'USING ... INDEX' is a full table scan
+        full_scans = [line for line in lines
+                      if line.split()[:2] == ['SCAN', table] and 'INDEX' not in line]
+        return lines, not full_scans
+    if conn.dialect.name == 'postgresql':
+        # Small tables always get a seq scan, so ask whether an index *can* serve the query
+        conn.execute(text('SET LOCAL enable_seqscan = off'))
+        lines = [row[0] for row in conn.execute(text('EXPLAIN ' + sql))]
+        return lines, not any(f'Seq Scan on {table}' in line for line in lines)
+    raise RuntimeError(f'EXPLAIN check not supported on {conn.dialect.name}')
+
+
+def check_indexes(engine=None):
+    """EXPLAIN every route query. Returns {route: (plan lines, uses_index)}."""
+    engine = engine or db.engine
+    results = {}
+    for route, (table, stmt) in route_queries().items():
+        with engine.connect() as conn:
+            try:
+                results[route] = explain(conn, table, stmt)
+            finally:
+                # Undo the planner settings explain() changed
+                conn.rollback()
+                if conn.dialect.name == 'sqlite':
+                    conn.execute(text('ANALYZE sqlite_master'))  # reload the restored statistics
+                    conn.commit()
+    return results
@@ -2,6 +2,7 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
 from datetime import datetime
+from sqlalchemy import text
 
 db = SQLAlchemy()
 
@@ -14,6 +15,18 @@ class User(UserMixin, db.Model):
     avg_rating = db.Column(db.Float, default=0.0)
     num_ratings = db.Column(db.Integer, default=0)
     is_admin = db.Column(db.Boolean, default=False)
+    # Denormalized stats, kept in step by the routes (see stats.py)
+    donations_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    claimed_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    available_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    food_claimed_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    rating_1_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    rating_2_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    rating_3_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    rating_4_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    rating_5_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # Bumped by every UPDATE (counters included); the API's Last-Modified/ETag for profiles
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     #Relationships
     posts = db.relationship('FoodPost', backref='author', lazy=True)
@@ -21,6 +34,12 @@ class User(UserMixin, db.Model):
     ratings_given = db.relationship('Rating', foreign_keys='Rating.from_user_id', back_populates='rating_by', lazy=True)
     ratings_received = db.relationship('Rating', foreign_keys='Rating.to_user_id', back_populates='rating_for', lazy=True)
     
+    @property
+    def rating_counts(self):
+        """Ratings received per star, 5 to 1, for the rating histogram."""
+        return {5: self.rating_5_count, 4: self.rating_4_count, 3: self.rating_3_count,
+                2: self.rating_2_count, 1: self.rating_1_count}
+
     def __repr__(self):
         return f"<User {self.username}>"
 
@@ -34,15 +53,41 @@ class FoodPost(db.Model):
     city = db.Column(db.String(100), nullable=False)
     lat = db.Column(db.Float, nullable=False)
     lon = db.Column(db.Float, nullable=False)
+    geohash = db.Column(db.String(12), index=True) # kept in sync with lat/lon, see geo.py
     image_url = db.Column(db.String(255), nullable=False)
-    status = db.Column(db.String(20), nullable=False, default='available') # available, claimed   
+    thumbnail_url = db.Column(db.String(255)) # small variant for post cards, see imaging.py
+    image_status = db.Column(db.String(20), nullable=False, default='ready', server_default='ready') # pending, ready, failed (see uploads.py)
+    status = db.Column(db.String(20), nullable=False, default='available') # available, claimed, expired
     approval_status = db.Column(db.String(20), nullable=False, default='pending') # pending, approved, declined
     phone_number = db.Column(db.String(20), nullable=False)   
     post_date = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime) # an available post turns 'expired' after this, see expiry.py
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow) # see api.py validators
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     
     #Relationships
     requests = db.relationship('Request', backref='food_post', lazy=True, cascade="all, delete-orphan")
+
+    # Keyset pagination indexes: home pages on (post_date, id) within the live
+    # filter, the admin dashboard within an approval_status. The geohash one
+    # keeps the nearby cell ranges from falling back to the live feed index.
+    # Existing databases get these through migrations.py.
+    __table_args__ = (
+        db.Index('ix_food_post_live_feed', 'status', 'approval_status', 'post_date', 'id'),
+        db.Index('ix_food_post_approval_feed', 'approval_status', 'post_date', 'id'),
+        db.Index('ix_food_post_live_geohash', 'status', 'approval_status', 'geohash'),
+        db.Index('ix_food_post_user_date', 'user_id', 'post_date'),
+        db.Index('ix_food_post_user_status', 'user_id', 'status'),
+        db.Index('ix_food_post_updated_at', 'updated_at'),
+        # Partial: what the expiry sweeper scans
+        db.Index('ix_food_post_expiry', 'expires_at',
+                 sqlite_where=text("status = 'available'"),
+                 postgresql_where=text("status = 'available'")),
+        # Partial: only the (small) moderation queue
+        db.Index('ix_food_post_pending_queue', 'post_date', 'id',
+                 sqlite_where=text("approval_status = 'pending'"),
+                 postgresql_where=text("approval_status = 'pending'")),
+    )
     
     def __repr__(self):
         return f"<FoodPost {self.food_name}>"
@@ -53,12 +98,25 @@ class Request(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     status = db.Column(db.String(20), nullable=False, default='pending') # pending, accepted, declined
     request_date = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     requester_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     food_id = db.Column(db.Integer, db.ForeignKey('food_post.id'), nullable=False)
 
     #Relationship
     ratings = db.relationship('Rating', backref='request', lazy=True, cascade="all, delete-orphan")
 
+    __table_args__ = (
+        db.Index('ix_request_requester_date', 'requester_id', 'request_date'),
+        db.Index('ix_request_requester_status', 'requester_id', 'status'),
+        # One request per user and post; also serves the "already requested?" lookups
+        db.Index('uq_request_requester_food', 'requester_id', 'food_id', unique=True),
+        db.Index('ix_request_food_status', 'food_id', 'status'),
+        # Partial: the requests still waiting on a donor
+        db.Index('ix_request_pending', 'food_id',
+                 sqlite_where=text("status = 'pending'"),
+                 postgresql_where=text("status = 'pending'")),
+    )
+
     
     def __repr__(self):
         return f"<Request for post {self.food_id} by user {self.requester_id}>"
@@ -77,3 +135,71 @@ class Rating(db.Model):
     # Relationships
     rating_by = db.relationship('User', foreign_keys=[from_user_id])
     rating_for = db.relationship('User', foreign_keys=[to_user_id])
+
+    __table_args__ = (
+        db.Index('ix_rating_request_from', 'request_id', 'from_user_id'),
+        db.Index('ix_rating_to_user_score', 'to_user_id', 'score'),
+    )
+
+
+
+class PendingDeletion(db.Model):
+    # Outbox of remote images to delete, written in the same transaction as
+    # the post change and drained in batches by outbox.DeletionFlusher
+    id = db.Column(db.Integer, primary_key=True)
+    url = db.Column(db.String(255), nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    last_error = db.Column(db.Text)
+
+    def __repr__(self):
+        return f"<PendingDeletion {self.url}>"
+
+
+class PendingUpload(db.Model):
+    # Image uploads waiting for uploads.UploadQueue, written in the same
+    # transaction as the post so a restart or deploy doesn't lose them.
+    # claimed_at marks a job a worker is on; a claim older than the lease is
+    # taken to belong to a worker that died. No foreign key to the post: a
+    # post deleted mid-upload just leaves a job the worker drops.
+    id = db.Column(db.Integer, primary_key=True)
+    post_id = db.Column(db.Integer, nullable=False, index=True)
+    filename = db.Column(db.String(255))
+    data = db.Column(db.LargeBinary, nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    claimed_at = db.Column(db.DateTime)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<PendingUpload for post {self.post_id}>"
+
+
+class EventLog(db.Model):
+    # Live-feed events for events.DatabaseBroker, so every gunicorn worker
+    # can stream them. user_id is the only recipient, or None for everyone.
+    id = db.Column(db.Integer, primary_key=True)
+    event_type = db.Column(db.String(40), nullable=False)
+    payload = db.Column(db.Text, nullable=False) # JSON
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'))
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+    def __repr__(self):
+        return f"<EventLog {self.id} {self.event_type}>"
+
+
+# --- Archive ---
+# Claimed and expired posts move out of the live tables, with their requests
+# and ratings, once they are ARCHIVE_AFTER_DAYS old (see expiry.py). Each
+# archive table copies its source's columns plus archived_at. There are no
+# foreign keys, so archived rows never hold up changes to the live tables.
+def _archive_table(model, *indexes):
+    columns = [db.Column(c.name, c.type, primary_key=c.primary_key, autoincrement=False, nullable=c.nullable)
+               for c in model.__table__.columns]
+    return db.Table(f'{model.__tablename__}_archive', *columns,
+                    db.Column('archived_at', db.DateTime, nullable=False, default=datetime.utcnow), *indexes)
+
+
+# The stats counters (stats.py) count these alongside the live rows
+food_post_archive = _archive_table(FoodPost, db.Index('ix_food_post_archive_user', 'user_id', 'status'))
+request_archive = _archive_table(Request, db.Index('ix_request_archive_requester', 'requester_id', 'status'))
+rating_archive = _archive_table(Rating, db.Index('ix_rating_archive_to_user', 'to_user_id', 'score'))
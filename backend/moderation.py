@@ -0,0 +1,115 @@
+#moderation.py
+# Bulk moderation for the admin queue: approve, decline or delete many posts
+# in one transaction. However many posts are selected, each action is a
+# single UPDATE/DELETE ... WHERE id IN (...) per table, and a delete undoes
+# the posts' stats contributions with one grouped query per kind of counter.
+# Images of deleted posts go through the outbox (outbox.py), which removes
+# them from storage in batches after the commit.
+from collections import Counter, defaultdict
+
+from models import db, User, FoodPost, Request, Rating
+from stats import adjust_counts, rating_column
+from claims import lock_posts
+from outbox import queue_deletion
+from events import event_feed
+
+MODERATION_ACTIONS = ('approve', 'decline', 'delete')
+MAX_BULK_POSTS = 500
+
+
+def approve_posts(post_ids):
+    """Approve posts, announcing the available ones on the live feed. Returns the ids changed."""
+    approved = db.session.execute(
+        db.update(FoodPost)
+        .where(FoodPost.id.in_(post_ids), FoodPost.approval_status != 'approved')
+        .values(approval_status='approved')
+        .returning(FoodPost.id, FoodPost.status, FoodPost.food_name, FoodPost.description, FoodPost.quantity,
+                   FoodPost.city, FoodPost.image_url, FoodPost.thumbnail_url, FoodPost.user_id),
+        execution_options={'synchronize_session': False}
+    ).all()
+    live = [row for row in approved if row.status == 'available']
+    if live:
+        usernames = dict(db.session.execute(
+            db.select(User.id, User.username).where(User.id.in_({row.user_id for row in live}))).all())
+        for row in sorted(live, key=lambda row: row.id):
+            event_feed.publish('post-approved', {
+                "post_id": row.id, "food_name": row.food_name, "description": row.description,
+                "quantity": row.quantity, "city": row.city,
+                "thumbnail_url": row.thumbnail_url or row.image_url, "author_username": usernames[row.user_id],
+            })
+    return sorted(row.id for row in approved)
+
+
+def decline_posts(post_ids):
+    """Decline posts (they stay in the database, hidden). Returns the ids changed."""
+    declined = db.session.execute(
+        db.update(FoodPost)
+        .where(FoodPost.id.in_(post_ids), FoodPost.approval_status != 'declined')
+        .values(approval_status='declined')
+        .returning(FoodPost.id),
+        execution_options={'synchronize_session': False}
+    ).scalars().all()
+    return sorted(declined)
+
+
+def delete_posts(post_ids):
+    """
+    Delete posts with their requests and ratings, as delete_post() does for
+    one post. The posts are locked first (claims.lock_posts) so a claim
+    can't change their status between counting and deleting. Returns the
+    ids deleted.
+    """
+    posts = lock_posts(post_ids)
+    if not posts:
+        return []
+    ids = [post.id for post in posts]
+    deltas = defaultdict(Counter)
+
+    for post in posts:
+        queue_deletion(post.image_url, post.thumbnail_url)
+        deltas[post.user_id]['donations_count'] -= 1
+        if post.status == 'claimed':
+            deltas[post.user_id]['claimed_count'] -= 1
+        elif post.status != 'expired':
+            deltas[post.user_id]['available_count'] -= 1
+
+    request_ids = db.select(Request.id).where(Request.food_id.in_(ids)).scalar_subquery()
+    accepted = db.session.execute(
+        db.select(Request.requester_id, db.func.count())
+        .where(Request.food_id.in_(ids), Request.status == 'accepted')
+        .group_by(Request.requester_id))
+    for requester_id, count in accepted:
+        deltas[requester_id]['food_claimed_count'] -= count
+    received = db.session.execute(
+        db.select(Rating.to_user_id, Rating.score, db.func.count())
+        .where(Rating.request_id.in_(request_ids))
+        .group_by(Rating.to_user_id, Rating.score))
+    for user_id, score, count in received:
+        column = rating_column(score)
+        if column:
+            deltas[user_id][column] -= count
+
+    for user_id, counts in deltas.items():
+        adjust_counts(user_id, **counts)
+
+    # Children first, for the foreign keys
+    db.session.execute(db.delete(Rating).where(Rating.request_id.in_(request_ids)),
+                       execution_options={'synchronize_session': False})
+    db.session.execute(db.delete(Request).where(Request.food_id.in_(ids)),
+                       execution_options={'synchronize_session': False})
+    db.session.execute(db.delete(FoodPost).where(FoodPost.id.in_(ids)),
+                       execution_options={'synchronize_session': False})
+    for post in posts:
+        db.session.expunge(post)
+    return ids
+
+
+def moderate(action, post_ids):
+    """Apply one of MODERATION_ACTIONS to post_ids, without committing. Returns the ids affected."""
+    if action == 'approve':
+        return approve_posts(post_ids)
+    if action == 'decline':
+        return decline_posts(post_ids)
+    if action == 'delete':
+        return delete_posts(post_ids)
+    raise ValueError(f"Unknown moderation action: {action!r}")
@@ -0,0 +1,159 @@
+#outbox.py
+# Deferred image deletion. Routes call queue_deletion() instead of hitting
+# storage directly: the URLs land in the pending_deletion table in the same
+# transaction as the post change, so a failed commit leaves the images alone
+# and a failed remote call is simply retried. DeletionFlusher drains the
+# table in batches from a background thread (or `flask flush-deletions`).
+import logging
+import os
+import threading
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from models import db, PendingDeletion
+from storage import storage_from_config
+
+log = logging.getLogger(__name__)
+
+# session.info key set when a session has queued deletions
+_QUEUED = 'outbox_queued'
+
+
+def queue_deletion(*urls):
+    """Record image URLs for deletion once the current transaction commits."""
+    queued = False
+    for url in urls:
+        if url and not url.startswith('/static/img/'):  # never delete bundled placeholders
+            db.session.add(PendingDeletion(url=url))
+            queued = True
+    if queued:
+        db.session.info[_QUEUED] = True
+
+
+class DeletionFlusher:
+    """
+    Drains PendingDeletion rows through storage.delete_many. Commits that
+    queued deletions wake the thread right away; it also wakes every
+    interval seconds to retry batches that failed. Like UploadQueue, the
+    thread starts in each forked gunicorn worker, with the first request it
+    serves, so rows left queued by an earlier process are flushed at boot.
+    """
+
+    def __init__(self, app=None, storage=None):
+        self.app = None
+        self.storage = storage
+        self._thread = None
+        self._started_pid = None
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self.flushed = 0
+        self.failures = 0
+        if app is not None:
+            self.init_app(app, storage)
+
+    def init_app(self, app, storage=None):
+        self.app = app
+        self.storage = storage or self.storage or storage_from_config(app)
+        self.batch_size = int(app.config.get('DELETION_BATCH_SIZE', 100))
+        self.interval = float(app.config.get('DELETION_FLUSH_INTERVAL', 60))
+        self.max_attempts = int(app.config.get('DELETION_MAX_ATTEMPTS', 10))
+        app.before_request(self._ensure_started)
+        for name, hook in _SESSION_HOOKS:
+            if not event.contains(Session, name, hook):
+                event.listen(Session, name, hook)
+
+    def _ensure_started(self):
+        # Once per process: flush what a previous process left queued
+        if self._started_pid != os.getpid():
+            self._started_pid = os.getpid()
+            self.kick()
+
+    def kick(self):
+        """Wake the flusher thread, starting it if needed."""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._loop, name='deletion-flusher', daemon=True)
+                self._thread.start()
+        self._wake.set()
+
+    def _loop(self):
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            try:
+                with self.app.app_context():
+                    while self.flush_batch() == self.batch_size:
+                        pass
+            except Exception:
+                log.exception("Deletion flush failed")
+
+    # --- Draining ---
+    def flush_batch(self):
+        """
+        Delete one batch of queued images and drop their rows. Returns the
+        number of rows handled; on a storage error the batch stays queued
+        with its attempt count bumped and 0 is returned.
+        """
+        rows = (PendingDeletion.query
+                .filter(PendingDeletion.attempts < self.max_attempts)
+                .order_by(PendingDeletion.id)
+                .limit(self.batch_size)
+                # Concurrent workers take disjoint batches on PostgreSQL (ignored by SQLite)
+                .with_for_update(skip_locked=True)
+                .all())
+        if not rows:
+            db.session.commit()
+            return 0
+
+        try:
+            self.storage.delete_many([row.url for row in rows])
+        except Exception as e:
+            log.warning("Deleting %s images failed", len(rows), exc_info=True)
+            for row in rows:
+                row.attempts += 1
+                row.last_error = str(e)[:500]
+            db.session.commit()
+            self.failures += 1
+            return 0
+
+        PendingDeletion.query.filter(PendingDeletion.id.in_([row.id for row in rows])) \
+            .delete(synchronize_session=False)
+        db.session.commit()
+        self.flushed += len(rows)
+        return len(rows)
+
+    def flush_all(self):
+        """Drain the table until it is empty or a batch fails; returns rows handled."""
+        total = 0
+        while True:
+            handled = self.flush_batch()
+            total += handled
+            if handled < self.batch_size:
+                return total
+
+    def stats(self):
+        return {
+            'pending': PendingDeletion.query.count(),
+            'flushed': self.flushed,
+            'failed_batches': self.failures,
+        }
+
+
+deletion_flusher = DeletionFlusher()
+
+
+# --- Session hooks ---
+def _kick(session):
+    if session.info.pop(_QUEUED, False):
+        deletion_flusher.kick()
+
+
+def _reset(session):
+    session.info.pop(_QUEUED, None)
+
+
+_SESSION_HOOKS = (
+    ('after_commit', _kick),
+    ('after_rollback', _reset),
+)
@@ -0,0 +1,228 @@
+#queries.py
+# Read queries for the page routes. Each helper loads everything its
+# template renders up front (joins / selectin loads), so a page costs a
+# fixed number of statements no matter how many posts or requests it shows.
+import base64
+from datetime import datetime
+
+from sqlalchemy import and_, func, or_
+from sqlalchemy.orm import joinedload, selectinload
+
+from models import db, User, FoodPost, Request, Rating
+from cache import PostRecord, Page, nearby_results
+from geo import prefix_upper_bound, nearest, bounding_boxes, cover_cells, quantize_query, query_circle
+
+LIVE_POST_FILTER = (FoodPost.status == 'available', FoodPost.approval_status == 'approved')
+PAGE_SIZE = 24
+MAX_PAGE_SIZE = 100
+
+
+def post_record_select(*criteria):
+    return db.select(
+        FoodPost.id, FoodPost.food_name, FoodPost.description, FoodPost.quantity,
+        FoodPost.city, FoodPost.lat, FoodPost.lon, FoodPost.image_url, FoodPost.thumbnail_url,
+        FoodPost.status, FoodPost.approval_status, FoodPost.phone_number,
+        FoodPost.post_date, FoodPost.geohash, User.username, FoodPost.updated_at
+    ).join(User, FoodPost.user_id == User.id).where(*criteria)
+
+
+def in_cells(cells):
+    """SQL condition matching posts whose geohash starts with any of cells."""
+    return or_(*[
+        and_(FoodPost.geohash >= cell, FoodPost.geohash < prefix_upper_bound(cell))
+        for cell in cells
+    ])
+
+
+def in_boxes(boxes):
+    """SQL condition matching posts inside any of the (min_lat, min_lon, max_lat, max_lon) boxes."""
+    return or_(*[
+        and_(FoodPost.lat.between(min_lat, max_lat), FoodPost.lon.between(min_lon, max_lon))
+        for min_lat, min_lon, max_lat, max_lon in boxes
+    ])
+
+
+def post_records(*criteria, order_by=()):
+    """Load PostRecords (post columns + author username) in one query."""
+    rows = db.session.execute(post_record_select(*criteria).order_by(*order_by))
+    return [PostRecord(*row) for row in rows]
+
+
+# --- Keyset pagination on (post_date, id) ---
+def encode_cursor(post_date, post_id):
+    raw = f"{post_date.isoformat()}|{post_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Turn a cursor back into (post_date, id). Raises ValueError if malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        post_date, post_id = raw.split('|')
+        return datetime.fromisoformat(post_date), int(post_id)
+    except (TypeError, ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
+
+
+def after_cursor(cursor, descending=True):
+    """SQL condition selecting the rows that come after cursor."""
+    post_date, post_id = decode_cursor(cursor)
+    if descending:
+        return or_(FoodPost.post_date < post_date,
+                   and_(FoodPost.post_date == post_date, FoodPost.id < post_id))
+    return or_(FoodPost.post_date > post_date,
+               and_(FoodPost.post_date == post_date, FoodPost.id > post_id))
+
+
+def post_page_select(*criteria, cursor=None, limit=PAGE_SIZE, descending=True):
+    """The SELECT behind post_record_page (fetches one extra row to spot the next page)."""
+    if cursor:
+        criteria = (*criteria, after_cursor(cursor, descending))
+    if descending:
+        order_by = [FoodPost.post_date.desc(), FoodPost.id.desc()]
+    else:
+        order_by = [FoodPost.post_date.asc(), FoodPost.id.asc()]
+    return post_record_select(*criteria).order_by(*order_by).limit(limit + 1)
+
+
+def post_record_page(*criteria, cursor=None, limit=PAGE_SIZE, descending=True):
+    """
+    One page of PostRecords ordered by (post_date, id).
+    Returns a Page(records, next_cursor); next_cursor is None on the last page.
+    """
+    rows = db.session.execute(post_page_select(*criteria, cursor=cursor, limit=limit, descending=descending))
+    return _split_page([PostRecord(*row) for row in rows], limit)
+
+
+# --- Keyset pagination on (distance, id), for nearby results ---
+def encode_distance_cursor(distance_km, post_id):
+    raw = f"{distance_km!r}|{post_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_distance_cursor(cursor):
+    """Turn a nearby cursor back into (distance_km, id). Raises ValueError if malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        distance_km, post_id = raw.split('|')
+        return float(distance_km), int(post_id)
+    except (TypeError, ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
+
+
+def _split_page(records, limit):
+    if len(records) > limit:
+        records = records[:limit]
+        return Page(records, encode_cursor(records[-1].post_date, records[-1].id))
+    return Page(records, None)
+
+
+def post_with_author(post_id):
+    """A single post with its author joined in, or 404."""
+    return FoodPost.query.options(joinedload(FoodPost.author)).filter_by(id=post_id).first_or_404()
+
+
+def user_posts_query(user_id):
+    return (FoodPost.query
+            .filter_by(user_id=user_id)
+            .options(selectinload(FoodPost.requests).joinedload(Request.requester))
+            .order_by(FoodPost.post_date.desc()))
+
+
+def posts_with_requests(user):
+    """The user's posts, each with its requests and their requesters."""
+    return user_posts_query(user.id).all()
+
+
+def user_requests_query(user_id):
+    return (Request.query
+            .filter_by(requester_id=user_id)
+            .options(joinedload(Request.food_post).joinedload(FoodPost.author))
+            .order_by(Request.request_date.desc()))
+
+
+def requests_with_posts(user):
+    """The user's pickup requests, each with its post and the post's author."""
+    return user_requests_query(user.id).all()
+
+
+def ratings_by_request(request_ids):
+    """Map request_id -> Rating for the given requests (one query)."""
+    if not request_ids:
+        return {}
+    ratings = Rating.query.filter(Rating.request_id.in_(request_ids)).all()
+    return {rating.request_id: rating for rating in ratings}
+
+
+# --- Nearby search ---
+def _live_posts_in(boxes, cells):
+    """
+    Live posts in the given boxes, newest first. The geohash ranges and the
+    boxes are both in the WHERE clause: the ranges drive the index scan and
+    the boxes drop the corners of the cells before any rows are loaded.
+    """
+    return post_records(*LIVE_POST_FILTER, in_cells(cells), in_boxes(boxes),
+                        order_by=(FoodPost.post_date.desc(), FoodPost.id.desc()))
+
+
+def nearby_candidates(lat, lon, radius_km):
+    """
+    Live posts (as PostRecords, newest first) that may lie within radius_km
+    of (lat, lon); callers still do the exact distance check. Queries are
+    quantized (geo.quantize_query) so nearby points and similar radii share
+    one cached candidate list in nearby_results, which is only dropped when
+    a post in one of its cells changes.
+    """
+    quantized = quantize_query(lat, lon, radius_km)
+    if quantized is None:
+        boxes = bounding_boxes(lat, lon, radius_km)
+        return _live_posts_in(boxes, cover_cells(boxes))
+    # The shared circle holds everything any query quantized the same way can match
+    boxes = bounding_boxes(*query_circle(*quantized))
+    cells = cover_cells(boxes)
+    return nearby_results.get(quantized, cells, lambda: _live_posts_in(boxes, cells))
+
+
+def nearby_page(lat, lon, radius_km, cursor=None, limit=PAGE_SIZE):
+    """
+    One page of live posts within radius_km, closest first, as
+    (records, {post_id: distance_km}, next_cursor). Pages are keyed on
+    (distance, id), so posts at the same spot keep a stable order.
+    """
+    candidates = nearby_candidates(lat, lon, radius_km)
+    # One extra tells whether there is a next page
+    ranked = nearest(lat, lon, [post.lat for post in candidates], [post.lon for post in candidates],
+                     max_km=radius_km, k=limit + 1, ids=[post.id for post in candidates],
+                     after=decode_distance_cursor(cursor) if cursor else None)
+    page = [(candidates[i], distance) for i, distance in ranked[:limit]]
+    next_cursor = encode_distance_cursor(page[-1][1], page[-1][0].id) if len(ranked) > limit else None
+    return [post for post, _ in page], {post.id: distance for post, distance in page}, next_cursor
+
+
+# --- Validators for conditional GETs (see http_cache.py) ---
+# Each is one small aggregate query: the newest update stamp catches edits
+# and inserts, the row counts catch deletes.
+def live_feed_stamp():
+    """(newest post update, number of live posts) for list and nearby responses."""
+    return db.session.execute(db.select(
+        db.select(func.max(FoodPost.updated_at)).scalar_subquery(),
+        db.select(func.count(FoodPost.id)).where(*LIVE_POST_FILTER).scalar_subquery(),
+    )).one()
+
+
+def dashboard_stamp(user_id):
+    """Stamps and counts covering everything on a user's dashboard."""
+    my_posts = FoodPost.user_id == user_id
+    requests_on_mine = Request.food_id.in_(db.select(FoodPost.id).where(my_posts))
+    mine = Request.requester_id == user_id
+    return db.session.execute(db.select(
+        db.select(User.updated_at).where(User.id == user_id).scalar_subquery(),
+        db.select(func.max(FoodPost.updated_at)).where(my_posts).scalar_subquery(),
+        db.select(func.count(FoodPost.id)).where(my_posts).scalar_subquery(),
+        db.select(func.max(Request.updated_at)).where(or_(requests_on_mine, mine)).scalar_subquery(),
+        db.select(func.count(Request.id)).where(or_(requests_on_mine, mine)).scalar_subquery(),
+        db.select(func.max(FoodPost.updated_at)).join(Request, Request.food_id == FoodPost.id)
+            .where(mine).scalar_subquery(),
+        db.select(func.max(Rating.id)).where(or_(Rating.from_user_id == user_id, Rating.to_user_id == user_id))
+            .scalar_subquery(),
+    )).one()
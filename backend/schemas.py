@@ -0,0 +1,99 @@
+#schemas.py
+# Declarative serializers for the JSON API. A Schema maps field names to
+# getters and has a compact default field set; clients can ask for exactly
+# what they need with ?fields=id,lat,lon.
+SUMMARY_LENGTH = 140
+
+
+def _iso(stamp):
+    return stamp.isoformat() + 'Z' if stamp else None
+
+
+def _summary(text):
+    if text is None or len(text) <= SUMMARY_LENGTH:
+        return text
+    return text[:SUMMARY_LENGTH - 1].rstrip() + '…'
+
+
+class Schema:
+    """
+    fields maps a name to a getter: an attribute name, or a callable taking
+    the object. A getter of None means the value is passed to dump() by the
+    caller (e.g. distance_km, which isn't a property of the post).
+    """
+
+    def __init__(self, fields, default):
+        self.fields = fields
+        self.default = tuple(default)
+
+    def parse_fields(self, arg):
+        """Field names from a ?fields= value (None/empty means the defaults); ValueError on unknown names."""
+        if not arg:
+            return self.default
+        names = tuple(dict.fromkeys(name.strip() for name in arg.split(',') if name.strip()))
+        unknown = [name for name in names if name not in self.fields]
+        if unknown or not names:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}. "
+                             f"Available: {', '.join(self.fields)}")
+        return names
+
+    def dump(self, obj, fields=None, **extra):
+        out = {}
+        for name in fields or self.default:
+            getter = self.fields[name]
+            if getter is None:
+                out[name] = extra.get(name)
+            elif callable(getter):
+                out[name] = getter(obj)
+            else:
+                out[name] = getattr(obj, getter)
+        return out
+
+    def dump_many(self, objs, fields=None):
+        return [self.dump(obj, fields) for obj in objs]
+
+
+# Works on FoodPost rows and cache.PostRecord snapshots alike
+POST_SCHEMA = Schema({
+    'id': 'id',
+    'food_name': 'food_name',
+    'summary': lambda p: _summary(p.description),
+    'description': 'description',
+    'quantity': 'quantity',
+    'city': 'city',
+    'lat': 'lat',
+    'lon': 'lon',
+    'image_url': 'image_url',
+    'thumbnail_url': lambda p: p.thumbnail_url or p.image_url,
+    'status': 'status',
+    'author_username': lambda p: p.author_username if hasattr(p, 'author_username') else p.author.username,
+    'post_date': lambda p: _iso(p.post_date),
+    'expires_at': lambda p: _iso(getattr(p, 'expires_at', None)),  # not on PostRecord snapshots
+    'distance_km': None,
+}, default=('id', 'food_name', 'summary', 'quantity', 'city', 'lat', 'lon', 'thumbnail_url',
+            'author_username', 'post_date'))
+
+POST_DETAIL_FIELDS = ('id', 'food_name', 'description', 'quantity', 'city', 'lat', 'lon', 'image_url',
+                      'thumbnail_url', 'status', 'author_username', 'post_date', 'expires_at')
+
+USER_SCHEMA = Schema({
+    'username': 'username',
+    'avg_rating': 'avg_rating',
+    'num_ratings': 'num_ratings',
+    'total_donations': 'donations_count',
+    'successful_pickups': 'claimed_count',
+    'currently_available': 'available_count',
+    'food_claimed': 'food_claimed_count',
+    'rating_counts': lambda u: {str(score): count for score, count in u.rating_counts.items()},
+}, default=('username', 'avg_rating', 'num_ratings', 'total_donations', 'successful_pickups',
+            'currently_available', 'food_claimed', 'rating_counts'))
+
+REQUEST_SCHEMA = Schema({
+    'id': 'id',
+    'status': 'status',
+    'request_date': lambda r: _iso(r.request_date),
+    'post_id': 'food_id',
+    'food_name': lambda r: r.food_post.food_name,
+    'requester_username': lambda r: r.requester.username,
+    'rating': None,
+}, default=('id', 'status', 'request_date', 'post_id', 'food_name', 'requester_username', 'rating'))
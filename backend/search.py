@@ -0,0 +1,160 @@
+#search.py
+# Full-text search over food_name, description and city.
+#   PostgreSQL: a generated tsvector column (food_post.search_vector) with a
+#               GIN index; PostgreSQL keeps it current on insert and update.
+#   SQLite:     an FTS5 external-content table (food_post_fts) kept in step
+#               with food_post by triggers.
+# Both are created by migration 8 (migrations.py). Until it has run, search
+# falls back to LIKE so development databases built with create_all work.
+import logging
+import re
+
+from sqlalchemy import column, func, inspect, literal_column, or_, table, text
+
+from models import db, FoodPost
+from queries import PAGE_SIZE, post_record_select, in_cells, in_boxes
+from cache import PostRecord
+from geo import nearest, bounding_boxes, cover_cells
+
+log = logging.getLogger(__name__)
+
+MAX_TERMS = 8
+# bm25 / setweight column weights: name, description, city
+SQLITE_WEIGHTS = (10.0, 2.0, 5.0)
+
+food_post_fts = table('food_post_fts', column('rowid'))
+
+# engine url -> whether the full-text index exists, see has_search_index()
+_index_available = {}
+
+SQLITE_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS food_post_fts USING fts5(
+           food_name, description, city,
+           content='food_post', content_rowid='id', tokenize='porter unicode61')""",
+    """CREATE TRIGGER IF NOT EXISTS food_post_fts_insert AFTER INSERT ON food_post BEGIN
+           INSERT INTO food_post_fts(rowid, food_name, description, city)
+           VALUES (new.id, new.food_name, new.description, new.city);
+       END""",
+    """CREATE TRIGGER IF NOT EXISTS food_post_fts_delete AFTER DELETE ON food_post BEGIN
+           INSERT INTO food_post_fts(food_post_fts, rowid, food_name, description, city)
+           VALUES ('delete', old.id, old.food_name, old.description, old.city);
+       END""",
+    # Only when the indexed text changes, so status/stamp updates stay cheap
+    """CREATE TRIGGER IF NOT EXISTS food_post_fts_update
+           AFTER UPDATE OF food_name, description, city ON food_post BEGIN
+           INSERT INTO food_post_fts(food_post_fts, rowid, food_name, description, city)
+           VALUES ('delete', old.id, old.food_name, old.description, old.city);
+           INSERT INTO food_post_fts(rowid, food_name, description, city)
+           VALUES (new.id, new.food_name, new.description, new.city);
+       END""",
+    "INSERT INTO food_post_fts(food_post_fts) VALUES ('rebuild')",
+]
+
+POSTGRES_DDL = [
+    """ALTER TABLE food_post ADD COLUMN IF NOT EXISTS search_vector tsvector
+           GENERATED ALWAYS AS (
+               setweight(to_tsvector('english', coalesce(food_name, '')), 'A') ||
+               setweight(to_tsvector('english', coalesce(city, '')), 'B') ||
+               setweight(to_tsvector('english', coalesce(description, '')), 'C')
+           ) STORED""",
+    "CREATE INDEX IF NOT EXISTS ix_food_post_search ON food_post USING GIN (search_vector)",
+]
+
+
+def create_search_index(conn):
+    """Build the dialect's full-text index (idempotent; used by migration 8)."""
+    ddl = {'sqlite': SQLITE_DDL, 'postgresql': POSTGRES_DDL}.get(conn.dialect.name)
+    if ddl is None:
+        log.warning("No full-text index for %s; search uses LIKE", conn.dialect.name)
+        return
+    for statement in ddl:
+        conn.execute(text(statement))
+    _index_available.clear()
+
+
+def search_terms(q):
+    """Words of a query string, lower-cased and de-duplicated (at most MAX_TERMS)."""
+    words = re.findall(r'\w+', (q or '').lower())
+    return list(dict.fromkeys(words))[:MAX_TERMS]
+
+
+def has_search_index():
+    """Whether migration 8 has run on this database (checked once per process)."""
+    engine = db.engine
+    if engine.url not in _index_available:
+        inspector = inspect(engine)
+        if engine.dialect.name == 'sqlite':
+            found = inspector.has_table('food_post_fts')
+        elif engine.dialect.name == 'postgresql':
+            found = 'search_vector' in {c['name'] for c in inspector.get_columns('food_post')}
+        else:
+            found = False
+        if not found:
+            log.warning("Full-text index missing (run `flask db-upgrade`); search falls back to LIKE")
+        _index_available[engine.url] = found
+    return _index_available[engine.url]
+
+
+def search_select(terms, *criteria):
+    """
+    post_record_select() plus a `rank` column for posts matching every term
+    (as a prefix, so 'bre' finds 'bread'), best match first.
+    """
+    dialect = db.engine.dialect.name
+    stmt = post_record_select(*criteria)
+    if not has_search_index():
+        # Unindexed fallback: every term somewhere in the text, newest first
+        for term in terms:
+            pattern = f'%{term}%'
+            stmt = stmt.where(or_(FoodPost.food_name.ilike(pattern), FoodPost.description.ilike(pattern),
+                                  FoodPost.city.ilike(pattern)))
+        return stmt.add_columns(literal_column('0').label('rank')).order_by(
+            FoodPost.post_date.desc(), FoodPost.id.desc())
+
+    if dialect == 'sqlite':
+        # Terms are \w+ only, so quoting them can't produce FTS5 syntax errors
+        match = ' '.join(f'"{term}"*' for term in terms)
+        rank = func.bm25(literal_column('food_post_fts'), *SQLITE_WEIGHTS)
+        return (stmt.join(food_post_fts, food_post_fts.c.rowid == FoodPost.id)
+                .where(literal_column('food_post_fts').op('MATCH')(match))
+                .add_columns(rank.label('rank'))
+                # bm25() is lower-is-better
+                .order_by(rank, FoodPost.post_date.desc(), FoodPost.id.desc()))
+
+    query = func.to_tsquery('english', ' & '.join(f'{term}:*' for term in terms))
+    vector = literal_column('food_post.search_vector')
+    rank = func.ts_rank_cd(vector, query)
+    return (stmt.where(vector.op('@@')(query))
+            .add_columns(rank.label('rank'))
+            .order_by(rank.desc(), FoodPost.post_date.desc(), FoodPost.id.desc()))
+
+
+def search_posts(q, *criteria, limit=None, offset=0):
+    """
+    Ranked PostRecords matching q and criteria (e.g. LIVE_POST_FILTER plus
+    a geohash/box prefilter) in one query. Returns [] for an empty query.
+    """
+    terms = search_terms(q)
+    if not terms:
+        return []
+    stmt = search_select(terms, *criteria).offset(offset)
+    if limit is not None:
+        stmt = stmt.limit(limit)
+    return [PostRecord(*row[:-1]) for row in db.session.execute(stmt)]
+
+
+def search_nearby(q, lat, lon, radius_km, *criteria, offset=0, limit=PAGE_SIZE):
+    """
+    Ranked matches within radius_km of (lat, lon), as
+    (records, {post_id: distance_km}, next_offset). The geohash cells and
+    bounding box go into the same query as the text match; the exact circle
+    is applied afterwards, so a page can come back a little short.
+    """
+    boxes = bounding_boxes(lat, lon, radius_km)
+    records = search_posts(q, *criteria, in_cells(cover_cells(boxes)), in_boxes(boxes),
+                           limit=limit + 1, offset=offset)
+    next_offset = offset + limit if len(records) > limit else None
+    records = records[:limit]
+    in_range = {records[i].id: distance for i, distance in nearest(
+        lat, lon, [r.lat for r in records], [r.lon for r in records], max_km=radius_km)}
+    return [r for r in records if r.id in in_range], in_range, next_offset
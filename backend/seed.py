@@ -0,0 +1,161 @@
+#seed.py
+# Synthetic data for benchmarks and local load testing: users, posts spread
+# around a handful of Indian cities, requests and ratings in realistic
+# proportions. Rows go in with bulk INSERTs, then the seeded users' stats
+# counters and ratings are recomputed so the data is consistent with what
+# the routes would have produced. Posts past their expires_at are seeded as expired;
+# `flask sweep-posts` then archives the old ones (see expiry.py).
+#
+#   flask --app app seed --users 2000 --posts 50000
+import random
+from datetime import datetime, timedelta
+
+from sqlalchemy import func
+from werkzeug.security import generate_password_hash
+
+from models import db, User, FoodPost, Request, Rating
+from geo import encode_geohash
+from stats import recompute_stats
+from expiry import POST_TTL_CHOICES
+
+SEED_PASSWORD = 'password'  # every seeded user logs in with this
+
+# (city, lat, lon, share of posts)
+CITIES = [
+    ('Mumbai', 19.0760, 72.8777, 0.30),
+    ('Delhi', 28.6139, 77.2090, 0.25),
+    ('Bengaluru', 12.9716, 77.5946, 0.20),
+    ('Pune', 18.5204, 73.8567, 0.10),
+    ('Chennai', 13.0827, 80.2707, 0.10),
+    ('Jaipur', 26.9124, 75.7873, 0.05),
+]
+CITY_SPREAD_DEG = 0.25  # roughly 25 km around each centre
+
+FOODS = ['Rice', 'Bread', 'Dal', 'Chapati', 'Biryani', 'Idli', 'Dosa', 'Samosa', 'Paneer curry',
+         'Noodles', 'Pasta', 'Sandwiches', 'Fruit', 'Bananas', 'Apples', 'Milk', 'Cake', 'Cookies', 'Soup']
+WORDS = ['fresh', 'homemade', 'leftover', 'party', 'extra', 'vegetarian', 'spicy', 'sweet', 'packed',
+         'warm', 'today', 'evening', 'lunch', 'dinner', 'boxes', 'plates', 'family', 'wedding', 'hostel']
+QUANTITIES = ['1 box', '2 boxes', '5 plates', '10 plates', '1 kg', '3 kg', 'a family meal', '20 packets']
+
+BATCH = 5000
+
+
+def _insert(model, rows):
+    """
+    Bulk-insert rows and return their new ids, in row order. The database
+    assigns the ids, so PostgreSQL's sequences stay ahead of the data.
+    """
+    ids = []
+    stmt = db.insert(model).returning(model.id, sort_by_parameter_order=True)
+    for i in range(0, len(rows), BATCH):
+        ids.extend(db.session.execute(stmt, rows[i:i + BATCH]).scalars())
+    return ids
+
+
+def _chunks(ids):
+    for i in range(0, len(ids), BATCH):
+        yield ids[i:i + BATCH]
+
+
+def _city(rng):
+    roll, total = rng.random(), 0.0
+    for city in CITIES:
+        total += city[3]
+        if roll <= total:
+            return city
+    return CITIES[0]
+
+
+def seed(num_users=500, num_posts=10000, requests_per_post=2.0, days=60, seed_value=42):
+    """
+    Insert num_users users and num_posts posts with about requests_per_post
+    requests each. Returns {'users': n, 'posts': n, 'requests': n, 'ratings': n}.
+    Commits.
+    """
+    rng = random.Random(seed_value)
+    now = datetime.utcnow()
+    password_hash = generate_password_hash(SEED_PASSWORD)
+    # Only names the users; the ids come from the database
+    first_name = (db.session.execute(db.select(func.max(User.id))).scalar() or 0) + 1
+
+    # --- Users ---
+    users = [dict(username=f'user{first_name + i}', email=f'user{first_name + i}@example.com',
+                  password_hash=password_hash, is_admin=False)
+             for i in range(num_users)]
+    user_ids = _insert(User, users)
+    # A minority of very active donors, as in real sharing apps
+    donors = user_ids[:max(1, num_users // 5)]
+
+    # --- Posts ---
+    posts = []
+    for i in range(num_posts):
+        city, lat0, lon0, _ = _city(rng)
+        lat = lat0 + rng.gauss(0, CITY_SPREAD_DEG / 2)
+        lon = lon0 + rng.gauss(0, CITY_SPREAD_DEG / 2)
+        posted = now - timedelta(minutes=rng.randrange(days * 24 * 60))
+        approval = rng.choices(['approved', 'pending', 'declined'], weights=[85, 10, 5])[0]
+        food = rng.choice(FOODS)
+        posts.append(dict(
+            food_name=f'{rng.choice(WORDS).title()} {food.lower()}',
+            description=' '.join(rng.choice(WORDS + FOODS).lower() for _ in range(rng.randrange(6, 30))),
+            quantity=rng.choice(QUANTITIES), city=city, lat=lat, lon=lon, geohash=encode_geohash(lat, lon),
+            image_url='https://res.cloudinary.com/demo/image/upload/sample.jpg', thumbnail_url=None,
+            image_status='ready', status='available', approval_status=approval,
+            phone_number=f'9{rng.randrange(10 ** 9):09d}', post_date=posted, updated_at=posted,
+            expires_at=posted + timedelta(hours=rng.choice(POST_TTL_CHOICES)),
+            user_id=rng.choice(donors) if rng.random() < 0.8 else rng.choice(user_ids),
+        ))
+
+    # --- Requests and ratings ---
+    # Built before anything is inserted (accepting a request changes its post's
+    # status), so they point at their post / request by list position for now
+    requests, request_posts = [], []
+    ratings, rating_requests = [], []
+    for post_index, post in enumerate(posts):
+        expired = post['expires_at'] <= now
+        if post['approval_status'] != 'approved':
+            if expired:
+                post.update(status='expired', updated_at=post['expires_at'])
+            continue
+        count = min(int(rng.expovariate(1 / requests_per_post)), len(user_ids) - 1)
+        requesters = [u for u in rng.sample(user_ids, count + 1) if u != post['user_id']][:count]
+        accepted = rng.random() < 0.6 and requesters
+        for j, requester in enumerate(requesters):
+            if accepted:
+                status = 'accepted' if j == 0 else 'declined'
+            else:
+                status = 'declined' if expired else 'pending'
+            asked = post['post_date'] + timedelta(minutes=rng.randrange(1, 600))
+            if status == 'accepted' and rng.random() < 0.7:
+                ratings.append(dict(score=rng.choices([5, 4, 3, 2, 1], weights=[50, 30, 10, 6, 4])[0],
+                                    comment=None, rating_date=asked + timedelta(hours=2),
+                                    from_user_id=requester, to_user_id=post['user_id']))
+                rating_requests.append(len(requests))
+            requests.append(dict(status=status, request_date=asked, updated_at=asked, requester_id=requester))
+            request_posts.append(post_index)
+        if accepted:
+            post['status'] = 'claimed'
+        elif expired:
+            post.update(status='expired', updated_at=post['expires_at'])
+
+    post_ids = _insert(FoodPost, posts)
+    for request, post_index in zip(requests, request_posts):
+        request['food_id'] = post_ids[post_index]
+    request_ids = _insert(Request, requests)
+    for rating, request_index in zip(ratings, rating_requests):
+        rating['request_id'] = request_ids[request_index]
+    _insert(Rating, ratings)
+
+    # --- Derived columns, for the seeded users only: everyone else's counters
+    # may include archived rows (see stats.py) that these live-table counts miss ---
+    for chunk in _chunks(user_ids):
+        db.session.execute(db.update(User).where(User.id.in_(chunk)).values(
+            num_ratings=db.select(func.count(Rating.id)).where(Rating.to_user_id == User.id).scalar_subquery(),
+            avg_rating=func.coalesce(
+                db.select(func.round(func.avg(Rating.score), 2)).where(Rating.to_user_id == User.id)
+                .scalar_subquery(),
+                0.0),
+        ), execution_options={'synchronize_session': False})
+        recompute_stats(chunk)
+    db.session.commit()
+    return {'users': len(users), 'posts': len(posts), 'requests': len(requests), 'ratings': len(ratings)}
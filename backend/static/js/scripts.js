@@ -66,6 +66,8 @@ function initMap() {
         const map = new google.maps.Map(searchMapDiv, { center: startCoords, zoom: 5 });
         // Assign the marker to the global variable so the search button can find it
         searchMapMarker = new google.maps.Marker({ position: startCoords, map: map, draggable: true });
+        // The nearby search below re-runs (debounced) when the pin is dropped somewhere new
+        searchMapMarker.addListener('dragend', () => document.dispatchEvent(new Event('search-marker-moved')));
 
         if (navigator.geolocation) {
             navigator.geolocation.getCurrentPosition((position) => {
@@ -81,6 +83,10 @@ function initMap() {
 
 // --- 2. Other Scripts (Run after page loads) ---
 document.addEventListener('DOMContentLoaded', () => {
+    // Anything from the server or the user goes through this before it is put into HTML
+    const escapeHtml = (value) => String(value).replace(/[&<>"']/g, (c) => (
+        { '&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;' }[c]
+    ));
 
         // --- Hamburger Menu Toggle ---
     const hamburgerBtn = document.getElementById('hamburger-btn');
@@ -134,6 +140,14 @@ document.addEventListener('DOMContentLoaded', () => {
         });
     }
     
+    // Admin bulk moderation: "Select all" ticks every checkbox belonging to its form
+    document.querySelectorAll('.bulk-select-all').forEach(toggle => {
+        toggle.addEventListener('change', () => {
+            document.querySelectorAll(`input[name="post_ids"][form="${toggle.dataset.form}"]`)
+                .forEach(box => { box.checked = toggle.checked; });
+        });
+    });
+
     // Slider and Input Box Synchronization
     const radiusSlider = document.getElementById('radius-slider');
     const radiusInput = document.getElementById('radius');
@@ -142,9 +156,80 @@ document.addEventListener('DOMContentLoaded', () => {
         radiusInput.addEventListener('input', () => { radiusSlider.value = radiusInput.value; });
     }
     
-    // UPDATED Nearby Search Logic
+    // UPDATED Nearby Search Logic (paginated: the API returns { posts, next_cursor })
     const findNearbyBtn = document.getElementById('find-nearby-btn');
     if (findNearbyBtn) {
+        const postContainer = document.querySelector('#nearby-posts-container');
+
+        const renderNearbyPosts = (posts) => {
+            posts.forEach(post => {
+                const postCardHTML = `
+                <a href="/post/${encodeURIComponent(post.id)}" class="post-card-link">
+                    <div class="post-card">
+                        <img src="${escapeHtml(post.thumbnail_url)}" alt="${escapeHtml(post.food_name)}" loading="lazy">
+                        <h3>${escapeHtml(post.food_name)}</h3>
+                        <p class="post-description">${escapeHtml(post.description)}</p>
+                        <p><strong>Quantity:</strong> ${escapeHtml(post.quantity)}</p>
+                        <p><strong>Location:</strong> ${escapeHtml(post.city)} (${escapeHtml(post.distance_km)} km away)</p>
+                        <p class="posted-by">Posted by: ${escapeHtml(post.author_username)}</p>
+                    </div>
+                </a>`;
+                postContainer.insertAdjacentHTML('beforeend', postCardHTML);
+            });
+        };
+
+        // Only the newest search matters: starting one aborts the request still in flight
+        let nearbyController = null;
+        let hasSearched = false;
+
+        const loadNearbyPage = (lat, lon, radius, cursor, query) => {
+            let url = `/api/nearby_posts?lat=${lat}&lon=${lon}&radius_km=${radius}`;
+            if (query) {
+                // Text search: results come back best match first
+                url += `&q=${encodeURIComponent(query)}`;
+            }
+            if (cursor) {
+                url += `&cursor=${encodeURIComponent(cursor)}`;
+            }
+            if (!cursor && nearbyController) {
+                nearbyController.abort();
+            }
+            if (!cursor) {
+                nearbyController = new AbortController();
+            }
+            return fetch(url, { signal: nearbyController.signal })
+                .then(response => response.json())
+                .then(data => {
+                    const oldLoadMore = document.getElementById('nearby-load-more');
+                    if (oldLoadMore) {
+                        oldLoadMore.remove();
+                    }
+                    if (!cursor) {
+                        postContainer.innerHTML = '';
+                        if (data.posts.length === 0) {
+                            postContainer.innerHTML = query
+                                ? '<p>No matching food found within that radius. Try other words or a larger distance!</p>'
+                                : '<p>No food found within that radius. Try a larger distance!</p>';
+                            return;
+                        }
+                    }
+                    renderNearbyPosts(data.posts);
+                    if (data.next_cursor) {
+                        const loadMoreBtn = document.createElement('button');
+                        loadMoreBtn.id = 'nearby-load-more';
+                        loadMoreBtn.className = 'load-more';
+                        loadMoreBtn.textContent = 'Load more';
+                        loadMoreBtn.addEventListener('click', () => loadNearbyPage(lat, lon, radius, data.next_cursor, query));
+                        postContainer.after(loadMoreBtn);
+                    }
+                })
+                .catch(err => {
+                    if (err.name !== 'AbortError') {
+                        console.error("Nearby search failed:", err);
+                    }
+                });
+        };
+
         findNearbyBtn.addEventListener('click', () => {
             // Check if the search map's marker has been created
             if (!searchMapMarker) {
@@ -153,38 +238,187 @@ document.addEventListener('DOMContentLoaded', () => {
             }
 
             const radius = document.getElementById('radius').value;
-            const postContainer = document.querySelector('#nearby-posts-container');
             
             // Get coordinates from the map marker, NOT from a new geolocation call
             const position = searchMapMarker.getPosition();
             const lat = position.lat();
             const lon = position.lng();
 
-            postContainer.innerHTML = `<p>Searching for food within ${radius} km...</p>`;
+            const query = document.getElementById('search-query').value.trim();
 
-            fetch(`/api/nearby_posts?lat=${lat}&lon=${lon}&radius_km=${radius}`)
-                .then(response => response.json())
-                .then(posts => {
-                    postContainer.innerHTML = '';
-                    if (posts.length > 0) {
-                        posts.forEach(post => {
-                            const postCardHTML = `
-                            <a href="/post/${post.id}" class="post-card-link">
-                                <div class="post-card">
-                                    <img src="${post.image_url}" alt="${post.food_name}">
-                                    <h3>${post.food_name}</h3>
-                                    <p class="post-description">${post.description}</p>
-                                    <p><strong>Quantity:</strong> ${post.quantity}</p>
-                                    <p><strong>Location:</strong> ${post.city}</p>
-                                    <p class="posted-by">Posted by: ${post.author_username}</p>
-                                </div>
-                            </a>`;
-                            postContainer.innerHTML += postCardHTML;
-                        });
-                    } else {
-                        postContainer.innerHTML = '<p>No food found within that radius. Try a larger distance!</p>';
+            postContainer.innerHTML = `<p>Searching for food within ${escapeHtml(radius)} km...</p>`;
+            loadNearbyPage(lat, lon, radius, null, query);
+            hasSearched = true;
+        });
+
+        // Once results are showing, moving the pin or the radius refreshes them,
+        // but only after things settle, so a drag or slide costs one request
+        let searchTimer = null;
+        const scheduleSearch = () => {
+            if (!hasSearched) {
+                return;
+            }
+            clearTimeout(searchTimer);
+            searchTimer = setTimeout(() => findNearbyBtn.click(), 400);
+        };
+        document.addEventListener('search-marker-moved', scheduleSearch);
+        const radiusControl = document.getElementById('radius');
+        const radiusRange = document.getElementById('radius-slider');
+        if (radiusControl) {
+            radiusControl.addEventListener('input', scheduleSearch);
+        }
+        if (radiusRange) {
+            radiusRange.addEventListener('change', scheduleSearch);
+        }
+
+        // Pressing Enter in the text box runs the search too
+        const searchQueryInput = document.getElementById('search-query');
+        if (searchQueryInput) {
+            searchQueryInput.addEventListener('keydown', (e) => {
+                if (e.key === 'Enter') {
+                    findNearbyBtn.click();
+                }
+            });
+        }
+    }
+
+    // --- Live Feed (post-approved / post-claimed / posts-expired / request-received) ---
+    // Pages that show posts or requests update in place instead of being reloaded.
+    const eventsUrl = document.body.dataset.eventsUrl;
+    const livePostsContainer = document.getElementById('all-posts-container');
+    const hasLiveCards = livePostsContainer || document.querySelector('[data-request-id], .request-list, .no-requests');
+    if (eventsUrl && hasLiveCards) {
+        const onPostApproved = (post) => {
+            if (!livePostsContainer || livePostsContainer.querySelector(`[data-post-id="${post.post_id}"]`)) {
+                return;
+            }
+            const emptyNote = livePostsContainer.querySelector('.empty-feed');
+            if (emptyNote) {
+                emptyNote.remove();
+            }
+            livePostsContainer.insertAdjacentHTML('afterbegin', `
+                <a href="/post/${post.post_id}" class="post-card-link" data-post-id="${post.post_id}">
+                    <div class="post-card">
+                        <img src="${escapeHtml(post.thumbnail_url)}" loading="lazy" alt="${escapeHtml(post.food_name)}">
+                        <h3>${escapeHtml(post.food_name)}</h3>
+                        <p class="post-description">${escapeHtml(post.description)}</p>
+                        <p><strong>Quantity:</strong> ${escapeHtml(post.quantity)}</p>
+                        <p><strong>Location:</strong> ${escapeHtml(post.city)}</p>
+                        <p class="posted-by">Posted by: ${escapeHtml(post.author_username)}</p>
+                    </div>
+                </a>`);
+        };
+
+        const onPostClaimed = (claim) => {
+            if (livePostsContainer) {
+                const card = livePostsContainer.querySelector(`[data-post-id="${claim.post_id}"]`);
+                if (card) {
+                    card.remove();
+                }
+            }
+            // The requester's own pickup cards for this post
+            document.querySelectorAll(`[data-request-id][data-post-id="${claim.post_id}"]`).forEach((card) => {
+                const status = card.querySelector('.request-status');
+                if (status && status.textContent === 'pending') {
+                    status.textContent = String(claim.request_id) === card.dataset.requestId ? 'accepted' : 'declined';
+                }
+            });
+        };
+
+        const onPostsExpired = (expiry) => {
+            expiry.post_ids.forEach((postId) => {
+                if (livePostsContainer) {
+                    const card = livePostsContainer.querySelector(`[data-post-id="${postId}"]`);
+                    if (card) {
+                        card.remove();
+                    }
+                }
+                // Pending pickup requests for an expired post are declined
+                document.querySelectorAll(`[data-request-id][data-post-id="${postId}"] .request-status`).forEach((status) => {
+                    if (status.textContent === 'pending') {
+                        status.textContent = 'declined';
                     }
                 });
-        });
+            });
+        };
+
+        const onRequestReceived = (req) => {
+            const card = document.querySelector(`.post-card[data-post-id="${req.post_id}"]:not([data-request-id])`);
+            if (!card) {
+                return;
+            }
+            let list = card.querySelector('.request-list');
+            if (!list) {
+                const noRequests = card.querySelector('.no-requests');
+                list = document.createElement('ul');
+                list.className = 'request-list';
+                if (noRequests) {
+                    noRequests.replaceWith(list);
+                } else {
+                    card.appendChild(list);
+                }
+            }
+            const username = escapeHtml(req.requester_username);
+            list.insertAdjacentHTML('beforeend', `
+                <li>
+                    Request from <strong><a href="/profile/${encodeURIComponent(req.requester_username)}" class="posted-by-anchor">${username}</a></strong>
+                    <a href="/handle_request/${req.request_id}/accept">Accept</a> |
+                    <a href="/handle_request/${req.request_id}/decline">Decline</a>
+                </li>`);
+        };
+
+        const handlers = {
+            'post-approved': onPostApproved,
+            'post-claimed': onPostClaimed,
+            'posts-expired': onPostsExpired,
+            'request-received': onRequestReceived,
+        };
+
+        if (window.EventSource) {
+            // The server closes each stream after a while; EventSource reconnects
+            // on its own and resumes from Last-Event-ID. When the server is out of
+            // live-feed slots it answers 503, EventSource gives up, and we open a
+            // new stream a little later from the last event seen.
+            let lastEventId = null;
+            const connect = () => {
+                const url = lastEventId ? `${eventsUrl}?after=${encodeURIComponent(lastEventId)}` : eventsUrl;
+                const source = new EventSource(url);
+                Object.entries(handlers).forEach(([type, handler]) => {
+                    source.addEventListener(type, (e) => {
+                        lastEventId = e.lastEventId || lastEventId;
+                        handler(JSON.parse(e.data));
+                    });
+                });
+                source.addEventListener('error', () => {
+                    if (source.readyState === EventSource.CLOSED) {
+                        setTimeout(connect, 15000 + Math.random() * 5000);
+                    }
+                });
+            };
+            connect();
+        } else {
+            // Long-poll fallback: each request waits server-side until something happens
+            const pollUrl = document.body.dataset.pollUrl;
+            const poll = (after) => {
+                const url = after === null ? pollUrl : `${pollUrl}?after=${encodeURIComponent(after)}`;
+                fetch(url)
+                    .then(response => {
+                        if (!response.ok) {
+                            throw new Error(`poll failed: ${response.status}`);
+                        }
+                        return response.json();
+                    })
+                    .then(data => {
+                        data.events.forEach(ev => {
+                            if (handlers[ev.type]) {
+                                handlers[ev.type](ev.data);
+                            }
+                        });
+                        poll(data.last_id);
+                    })
+                    .catch(() => setTimeout(() => poll(after), 15000));
+            };
+            poll(null);
+        }
     }
-});
\ No newline at end of file
+});
@@ -0,0 +1,65 @@
+#stats.py
+# Per-user counters stored on User (see the *_count columns in models.py).
+# Routes adjust them in the same transaction as the change they describe;
+# recompute_stats() rebuilds them from the underlying tables, archives
+# included (see expiry.py), so archiving a post leaves every counter as is.
+from sqlalchemy import func
+
+from models import db, User, FoodPost, Request, Rating, food_post_archive, request_archive, rating_archive
+
+RATING_COLUMNS = {score: f'rating_{score}_count' for score in range(1, 6)}
+
+
+def adjust_counts(user_id, **deltas):
+    """
+    Add deltas to a user's counters with a single UPDATE, e.g.
+    adjust_counts(user.id, donations_count=1, available_count=1).
+    The increment happens in SQL, so concurrent requests can't lose updates.
+    """
+    deltas = {name: delta for name, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    values = {getattr(User, name): getattr(User, name) + delta for name, delta in deltas.items()}
+    User.query.filter_by(id=user_id).update(values)
+
+
+def rating_column(score):
+    """Counter column name for a star score, or None for out-of-range scores."""
+    return RATING_COLUMNS.get(score)
+
+
+def _count(table, *criteria):
+    return db.select(func.count()).select_from(table).where(*criteria).scalar_subquery()
+
+
+def stats_update(user_ids=None):
+    """The UPDATE that recomputes every counter from the source tables."""
+    posts, requests, ratings = food_post_archive.c, request_archive.c, rating_archive.c
+    values = {
+        'donations_count': _count(FoodPost, FoodPost.user_id == User.id)
+                           + _count(food_post_archive, posts.user_id == User.id),
+        'claimed_count': _count(FoodPost, FoodPost.user_id == User.id, FoodPost.status == 'claimed')
+                         + _count(food_post_archive, posts.user_id == User.id, posts.status == 'claimed'),
+        # Archived posts are never available
+        'available_count': _count(FoodPost, FoodPost.user_id == User.id, FoodPost.status == 'available'),
+        'food_claimed_count': _count(Request, Request.requester_id == User.id, Request.status == 'accepted')
+                              + _count(request_archive, requests.requester_id == User.id,
+                                       requests.status == 'accepted'),
+    }
+    for score, column in RATING_COLUMNS.items():
+        values[column] = (_count(Rating, Rating.to_user_id == User.id, Rating.score == score)
+                          + _count(rating_archive, ratings.to_user_id == User.id, ratings.score == score))
+
+    stmt = db.update(User).values(**values)
+    if user_ids is not None:
+        stmt = stmt.where(User.id.in_(list(user_ids)))
+    return stmt
+
+
+def recompute_stats(user_ids=None):
+    """
+    Rebuild the counters in one UPDATE (optionally limited to user_ids).
+    Returns the number of users updated; the caller commits.
+    """
+    result = db.session.execute(stats_update(user_ids), execution_options={'synchronize_session': False})
+    return result.rowcount
@@ -0,0 +1,98 @@
+#storage.py
+# Where post images live. CloudinaryStorage is the production backend;
+# LocalStorage writes into static/uploads so the app (and the upload
+# pipeline) can run without network access. Pick one with IMAGE_STORAGE.
+# The cloudinary package is slow to import and only needed once an image is
+# stored or deleted, so CloudinaryStorage imports it on first use.
+import io
+import os
+import threading
+import uuid
+
+# Admin API limit on public ids per delete_resources call
+CLOUDINARY_DELETE_BATCH = 100
+
+
+def public_id_from_url(url):
+    """Cloudinary public id of an uploaded image URL (file name without extension)."""
+    return url.split('/')[-1].split('.')[0]
+
+
+class CloudinaryStorage:
+    name = 'cloudinary'
+
+    def __init__(self, cloud_name=None, api_key=None, api_secret=None):
+        self._credentials = dict(cloud_name=cloud_name, api_key=api_key, api_secret=api_secret)
+        self._configured = False
+        self._lock = threading.Lock()
+
+    def _cloudinary(self):
+        """The cloudinary package, imported and configured on first use."""
+        import cloudinary
+        import cloudinary.api
+        import cloudinary.uploader
+        if not self._configured:
+            with self._lock:
+                if not self._configured:
+                    cloudinary.config(secure=True, **self._credentials)
+                    self._configured = True
+        return cloudinary
+
+    def upload(self, data, filename=None):
+        """Upload image bytes and return the public URL."""
+        result = self._cloudinary().uploader.upload(io.BytesIO(data))
+        return result.get('secure_url')
+
+    def owns(self, url):
+        return bool(url) and 'res.cloudinary.com' in url
+
+    def delete(self, url):
+        if self.owns(url):
+            self._cloudinary().uploader.destroy(public_id_from_url(url))
+
+    def delete_many(self, urls):
+        """Delete many images with one delete_resources call per 100 ids."""
+        public_ids = [public_id_from_url(url) for url in urls if self.owns(url)]
+        for i in range(0, len(public_ids), CLOUDINARY_DELETE_BATCH):
+            self._cloudinary().api.delete_resources(public_ids[i:i + CLOUDINARY_DELETE_BATCH])
+
+
+class LocalStorage:
+    """Stores images under static/uploads and serves them from /static/uploads/."""
+    name = 'local'
+
+    def __init__(self, root, url_prefix='/static/uploads/'):
+        self.root = root
+        self.url_prefix = url_prefix
+
+    def upload(self, data, filename=None):
+        ext = os.path.splitext(filename or '')[1].lower() or '.jpg'
+        name = f"{uuid.uuid4().hex}{ext}"
+        os.makedirs(self.root, exist_ok=True)
+        with open(os.path.join(self.root, name), 'wb') as f:
+            f.write(data)
+        return self.url_prefix + name
+
+    def owns(self, url):
+        return bool(url) and url.startswith(self.url_prefix)
+
+    def delete(self, url):
+        if self.owns(url):
+            path = os.path.join(self.root, os.path.basename(url))
+            if os.path.exists(path):
+                os.remove(path)
+
+    def delete_many(self, urls):
+        for url in urls:
+            self.delete(url)
+
+
+def storage_from_config(app):
+    """Build the backend named by IMAGE_STORAGE ('cloudinary' by default)."""
+    kind = app.config.get('IMAGE_STORAGE', 'cloudinary')
+    if kind == 'local':
+        return LocalStorage(os.path.join(app.static_folder, 'uploads'))
+    if kind == 'cloudinary':
+        return CloudinaryStorage(app.config.get('CLOUDINARY_CLOUD_NAME'), app.config.get('CLOUDINARY_API_KEY'),
+                                 app.config.get('CLOUDINARY_API_SECRET'))
+    raise ValueError(f"Unknown IMAGE_STORAGE: {kind!r}")
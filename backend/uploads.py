@@ -0,0 +1,244 @@
+#uploads.py
+# Background image uploads. post_food/edit_post call queue_upload(), which
+# stores the image bytes in the pending_upload table in the same
+# transaction as the post, so a restart or deploy can't lose them. Once the
+# transaction commits, a small thread pool claims the job, resizes the image
+# (imaging.py, imported on first use), pushes it and its thumbnail to
+# storage (with retries) and then fills in image_url / thumbnail_url /
+# image_status, dropping the job in the same commit.
+# Replaced images go through the deletion outbox (outbox.py).
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from sqlalchemy import event, or_
+from sqlalchemy.orm import Session
+
+from models import db, FoodPost, PendingUpload
+from storage import storage_from_config
+from outbox import queue_deletion
+
+log = logging.getLogger(__name__)
+
+PLACEHOLDER_IMAGE_URL = '/static/img/placeholder.svg'
+
+# FoodPost.image_status values
+IMAGE_PENDING = 'pending'
+IMAGE_READY = 'ready'
+IMAGE_FAILED = 'failed'
+
+# session.info key set when a session has queued uploads
+_QUEUED = 'uploads_queued'
+
+
+def queue_upload(post, data, filename=None):
+    """Record an image for post; the upload workers pick it up once the current transaction commits."""
+    if post.id is None:
+        db.session.flush()  # a new post needs its id first
+    db.session.add(PendingUpload(post_id=post.id, data=data, filename=filename))
+    db.session.info[_QUEUED] = True
+
+
+class UploadQueue:
+    """
+    Per-process upload worker pool draining the pending_upload table. The
+    pool is created on first use, so gunicorn workers forked from a
+    preloaded app each get their own threads. Commits that queued uploads
+    wake it, and each worker drains once when it serves its first request,
+    which picks up jobs left behind by a restart. Jobs are claimed with a
+    guarded UPDATE, so workers never run the same job twice at once.
+    """
+
+    def __init__(self, app=None, storage=None):
+        self.app = None
+        self.storage = storage
+        self._executor = None
+        self._started_pid = None
+        self._timer = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app, storage)
+
+    def init_app(self, app, storage=None):
+        self.app = app
+        self.storage = storage or self.storage or storage_from_config(app)
+        self.workers = int(app.config.get('UPLOAD_WORKERS', 2))
+        self.retries = int(app.config.get('UPLOAD_RETRIES', 3))
+        self.backoff = float(app.config.get('UPLOAD_RETRY_BACKOFF', 1.0))
+        # A claim older than this is taken over by another worker
+        self.lease = timedelta(seconds=float(app.config.get('UPLOAD_LEASE_SECONDS', 300)))
+        # Claims per job (each with its own retries) before the post is marked failed
+        self.max_attempts = int(app.config.get('UPLOAD_MAX_ATTEMPTS', 3))
+        app.before_request(self._ensure_started)
+        for name, hook in _SESSION_HOOKS:
+            if not event.contains(Session, name, hook):
+                event.listen(Session, name, hook)
+
+    @property
+    def executor(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='upload')
+        return self._executor
+
+    def _ensure_started(self):
+        # Once per process: pick up the jobs a previous process left queued
+        if self._started_pid != os.getpid():
+            self._started_pid = os.getpid()
+            self.kick()
+
+    def kick(self):
+        """Have a worker drain the queued jobs; returns a Future (mostly useful in tests)."""
+        return self.executor.submit(self._drain)
+
+    def shutdown(self, wait=True):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
+
+    # --- Worker side ---
+    def _drain(self):
+        with self.app.app_context():
+            try:
+                handled = self.run_all()
+                self._recheck_claimed()
+                return handled
+            except Exception:
+                log.exception("Upload worker failed")
+
+    def _recheck_claimed(self):
+        # Jobs other workers hold may belong to a process that died (e.g. just
+        # before this one booted); look again once their claims lapse
+        oldest = db.session.execute(db.select(db.func.min(PendingUpload.claimed_at))).scalar()
+        db.session.commit()
+        if oldest is None:
+            return
+        delay = max((oldest + self.lease - datetime.utcnow()).total_seconds(), 0) + 1
+        with self._lock:
+            if self._timer is None or not self._timer.is_alive():
+                self._timer = threading.Timer(delay, self.kick)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def run_all(self):
+        """Process queued jobs until none are left to claim; returns how many were handled."""
+        handled = 0
+        while self.run_next():
+            handled += 1
+        return handled
+
+    def claim_next(self):
+        """Claim the oldest job nobody holds (or whose claim has lapsed). Returns it, or None."""
+        while True:
+            now = datetime.utcnow()
+            claimable = or_(PendingUpload.claimed_at.is_(None), PendingUpload.claimed_at < now - self.lease)
+            job_id = db.session.execute(
+                db.select(PendingUpload.id).where(claimable).order_by(PendingUpload.id).limit(1)).scalar()
+            if job_id is None:
+                db.session.commit()
+                return None
+            # Another worker may have claimed it since the SELECT; only one UPDATE matches
+            claimed = db.session.execute(
+                db.update(PendingUpload)
+                .where(PendingUpload.id == job_id, claimable)
+                .values(claimed_at=now, attempts=PendingUpload.attempts + 1)
+            ).rowcount
+            db.session.commit()
+            if claimed:
+                return db.session.get(PendingUpload, job_id)
+
+    def run_next(self):
+        """Claim and process one job. Returns False when there was none."""
+        job = self.claim_next()
+        if job is None:
+            return False
+        job_id, post_id, data, filename, attempts = job.id, job.post_id, job.data, job.filename, job.attempts
+        db.session.expunge(job)  # keep the bytes out of the session's later commits
+        if attempts > self.max_attempts:
+            # Claimed and lost this many times (e.g. the image kills the worker), so stop trying
+            log.error("Giving up on the image for post %s after %s attempts", post_id, attempts - 1)
+            self._finish(job_id, post_id, None)
+        else:
+            self._run(job_id, post_id, data, filename)
+        return True
+
+    def _upload_with_retries(self, data, filename):
+        for attempt in range(1, self.retries + 1):
+            try:
+                return self.storage.upload(data, filename)
+            except Exception:
+                log.warning("Image upload failed (attempt %s/%s)", attempt, self.retries, exc_info=True)
+                if attempt == self.retries:
+                    raise
+                time.sleep(self.backoff * 2 ** (attempt - 1))
+
+    def _process_and_upload(self, data, filename):
+        from imaging import process_image  # Pillow is only loaded once a worker handles an image
+        processed = process_image(data)
+        base = os.path.splitext(filename or '')[0] or 'image'
+        image_url = self._upload_with_retries(processed.data, base + processed.extension)
+        try:
+            thumbnail_url = self._upload_with_retries(processed.thumbnail, base + '_thumb' + processed.extension)
+        except Exception:
+            queue_deletion(image_url)
+            db.session.commit()
+            raise
+        return image_url, thumbnail_url
+
+    def _run(self, job_id, post_id, data, filename):
+        try:
+            urls = self._process_and_upload(data, filename)
+        except Exception:
+            log.exception("Giving up on the image for post %s", post_id)
+            urls = None
+        return self._finish(job_id, post_id, urls)
+
+    def _finish(self, job_id, post_id, urls):
+        """Apply a job's outcome ((image_url, thumbnail_url), or None if it failed) and drop the job."""
+        db.session.execute(db.delete(PendingUpload).where(PendingUpload.id == job_id))
+        post = db.session.get(FoodPost, post_id)
+        newer = db.session.execute(db.select(PendingUpload.id).where(
+            PendingUpload.post_id == post_id, PendingUpload.id > job_id).limit(1)).scalar()
+        if post is None or newer is not None:
+            # The post was deleted while we were uploading, or edited again with another image
+            if urls:
+                queue_deletion(*urls)
+            db.session.commit()
+            return None
+        if urls is None:
+            post.image_status = IMAGE_FAILED
+            db.session.commit()
+            return None
+        # An edit replaces the previous image; it is deleted once the swap commits
+        queue_deletion(post.image_url, post.thumbnail_url)
+        post.image_url, post.thumbnail_url = urls
+        post.image_status = IMAGE_READY
+        db.session.commit()
+        return post.image_url
+
+    def stats(self):
+        return {
+            'queued': PendingUpload.query.filter(PendingUpload.claimed_at.is_(None)).count(),
+            'in_progress': PendingUpload.query.filter(PendingUpload.claimed_at.is_not(None)).count(),
+        }
+
+
+upload_queue = UploadQueue()
+
+
+# --- Session hooks ---
+def _kick(session):
+    if session.info.pop(_QUEUED, False):
+        upload_queue.kick()
+
+
+def _reset(session):
+    session.info.pop(_QUEUED, None)
+
+
+_SESSION_HOOKS = (
+    ('after_commit', _kick),
+    ('after_rollback', _reset),
+)
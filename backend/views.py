@@ -0,0 +1,708 @@
+#views.py
+# The site's pages and form handlers. Routes are declared with @route and
+# added to the app by init_views() (called from create_app in app.py), so
+# they keep their plain endpoint names ('home', 'dashboard', ...) for url_for.
+from flask import (render_template, request, redirect, url_for, flash, abort, Response, stream_with_context,
+                   jsonify, current_app)
+from flask_login import LoginManager, login_user, logout_user, login_required, current_user
+from werkzeug.security import generate_password_hash, check_password_hash
+from werkzeug.utils import secure_filename
+import math
+import os
+import time
+from sqlalchemy.exc import IntegrityError
+# Import both models now
+from models import db, User, FoodPost, Request, Rating
+from geo import encode_geohash
+from cache import live_posts, nearby_results, user_cache
+from fragments import fragment_cache
+from stats import adjust_counts, rating_column
+from claims import lock_post, accept_request, decline_request
+from moderation import MODERATION_ACTIONS, MAX_BULK_POSTS, moderate
+from uploads import upload_queue, queue_upload, PLACEHOLDER_IMAGE_URL, IMAGE_PENDING
+from outbox import deletion_flusher, queue_deletion
+from expiry import post_sweeper, post_expiry, POST_TTL_CHOICES
+from events import event_feed, format_sse, parse_position
+from schemas import POST_SCHEMA
+from search import search_nearby
+from http_cache import make_etag, not_modified, set_validators
+from queries import (LIVE_POST_FILTER, PAGE_SIZE, MAX_PAGE_SIZE, post_record_page, nearby_page, live_feed_stamp,
+                     decode_cursor, decode_distance_cursor, post_with_author, posts_with_requests, requests_with_posts,
+                     ratings_by_request)
+
+login_manager = LoginManager()
+login_manager.login_view = "login"
+
+# (rule, options, view) for every @route, added to the app by init_views()
+_routes = []
+
+
+def route(rule, **options):
+    """Like app.route, for views declared before the app exists."""
+    def decorator(view):
+        _routes.append((rule, options, view))
+        return view
+    return decorator
+
+
+def init_views(app):
+    app.context_processor(inject_google_api_key)
+    for rule, options, view in _routes:
+        app.add_url_rule(rule, view_func=view, **options)
+
+
+@login_manager.user_loader
+def load_user(user_id):
+    # Served from the per-worker identity cache, so most requests skip this query
+    return user_cache.load(int(user_id))
+
+def inject_google_api_key():
+    return dict(GOOGLE_API_KEY=os.environ.get('GOOGLE_API_KEY'))
+
+def cursor_arg(name='cursor'):
+    """Read a pagination cursor from the query string, 400 if it's malformed."""
+    cursor = request.args.get(name) or None
+    if cursor:
+        try:
+            decode_cursor(cursor)
+        except ValueError:
+            abort(400)
+    return cursor
+
+@route("/")
+def home():
+    if current_user.is_authenticated:
+        # NEW QUERY: Filter by status='available' AND approval_status='approved', one page at a time
+        cursor = cursor_arg()
+        posts, next_cursor = live_posts.get(('home', cursor), lambda: post_record_page(*LIVE_POST_FILTER, cursor=cursor))
+        return render_template("home.html", username=current_user.username, posts=posts, next_cursor=next_cursor)
+    return redirect(url_for("login"))
+
+@route("/register", methods=["GET", "POST"])
+def register():
+    if request.method == "POST":
+        username = request.form["username"]
+        email = request.form["email"]
+        password = request.form["password"]
+        confirm_password = request.form["confirm_password"]
+
+        # --- Change #1: Re-render with data on error, instead of redirecting ---
+        if password != confirm_password:
+            flash("Passwords do not match!", "error")
+            return render_template("register.html", form_data=request.form)
+
+        if User.query.filter_by(username=username).first():
+            flash("Username already taken!", "error")
+            return render_template("register.html", form_data=request.form)
+
+        if User.query.filter_by(email=email).first():
+            flash("Email already exists!", "error")
+            return render_template("register.html", form_data=request.form)
+        
+        # If all checks pass, create the user and redirect to login
+        new_user = User(
+            username=username,
+            email=email,
+            password_hash=generate_password_hash(password)
+        )
+        db.session.add(new_user)
+        db.session.commit()
+        flash("Registration successful! Please login.", "success")
+        return redirect(url_for("login"))
+
+    # This handles the initial GET request
+    return render_template("register.html", form_data={})
+
+@route("/login", methods=["GET", "POST"])
+def login():
+    if request.method == "POST":
+        username = request.form["username"]
+        password = request.form["password"]
+
+        user = User.query.filter_by(username=username).first()
+        if user and check_password_hash(user.password_hash, password):
+            login_user(user)
+            return redirect(url_for("home"))
+        
+        # On error, flash message and re-render with the username
+        flash("Invalid username or password", "error")
+        return render_template("login.html", form_data=request.form)
+
+    # This handles the initial GET request
+    return render_template("login.html", form_data={})
+
+@route("/logout")
+@login_required
+def logout():
+    logout_user()
+    return redirect(url_for("login"))
+
+
+# --- DELETED THE OLD admin_dashboard() function here ---
+
+# --- START: New unified dashboard() function ---
+@route('/dashboard')
+@login_required
+def dashboard():
+    # The stats are shown here, so read the user row fresh rather than from the identity cache
+    user = db.session.get(User, current_user.id, populate_existing=True)
+    
+    # === ADMIN CHECK ===
+    if user.is_admin:
+        # Fetch data needed for the admin dashboard (oldest pending first, newest approved first)
+        pending_cursor = cursor_arg('pending_cursor')
+        approved_cursor = cursor_arg('approved_cursor')
+        pending_posts, next_pending_cursor = live_posts.get(('admin_pending', pending_cursor), lambda: post_record_page(
+            FoodPost.approval_status == 'pending', cursor=pending_cursor, descending=False))
+        approved_posts, next_approved_cursor = live_posts.get(('admin_approved', approved_cursor), lambda: post_record_page(
+            FoodPost.approval_status == 'approved', cursor=approved_cursor))
+        
+        # Load the dedicated admin template with admin data
+        return render_template('admin_dashboard.html', 
+                               pending_posts=pending_posts, 
+                               approved_posts=approved_posts,
+                               pending_cursor=pending_cursor,
+                               approved_cursor=approved_cursor,
+                               next_pending_cursor=next_pending_cursor,
+                               next_approved_cursor=next_approved_cursor)
+    
+    # === REGULAR USER LOGIC (if not an admin) ===
+    
+    # --- Donation and Rating Stats come straight from the user's counters ---
+            
+    # --- Posts and Requests, with everything the template touches preloaded ---
+    my_posts = posts_with_requests(user)
+    my_requests = requests_with_posts(user)
+    request_ids = [req.id for post in my_posts for req in post.requests] + [req.id for req in my_requests]
+    
+    # Load the regular user template with user data
+    return render_template(
+        'dashboard.html', 
+        my_posts=my_posts, 
+        my_requests=my_requests,
+        ratings_by_request=ratings_by_request(request_ids),
+        total_donations=user.donations_count,
+        successful_pickups=user.claimed_count,
+        currently_available=user.available_count,
+        rating_counts=user.rating_counts,
+        food_claimed=user.food_claimed_count
+    )
+# --- END: New unified dashboard() function ---
+
+
+# ... 
+@route('/admin/verify_post/<int:post_id>/<action>')
+@login_required
+def verify_post(post_id, action):
+    # 1. Security check: Must be an admin
+    if not current_user.is_admin:
+        flash("Authorization failed.", "error")
+        return redirect(url_for('home'))
+
+    post = FoodPost.query.get_or_404(post_id)
+    
+    # 2. Validate action and update status
+    if action == 'approve':
+        post.approval_status = 'approved'
+        if post.status == 'available':
+            event_feed.publish('post-approved', {
+                "post_id": post.id, "food_name": post.food_name, "description": post.description,
+                "quantity": post.quantity, "city": post.city,
+                "thumbnail_url": post.thumbnail_url or post.image_url, "author_username": post.author.username,
+            })
+        flash(f"Post '{post.food_name}' approved and is now live.", 'success')
+        
+    elif action == 'decline':
+        # Optional: You might delete the post or just mark it as declined
+        post.approval_status = 'declined'
+        flash(f"Post '{post.food_name}' declined and will not be shown.", 'info')
+
+    else:
+        flash("Invalid verification action.", 'error')
+        # Changed redirect from 'admin_dashboard' to 'dashboard' since we are consolidating
+        return redirect(url_for('dashboard')) 
+
+    db.session.commit()
+    # Changed redirect from 'admin_dashboard' to 'dashboard' since we are consolidating
+    return redirect(url_for('dashboard'))
+
+
+@route('/admin/moderate', methods=['POST'])
+@login_required
+def moderate_posts():
+    # Approve, decline or delete many posts in one transaction (see moderation.py).
+    # The dashboard's checkbox form gets a redirect back to the same page;
+    # a JSON body ({"action": ..., "post_ids": [...]}) gets a JSON answer.
+    as_json = request.is_json
+    if not current_user.is_admin:
+        if as_json:
+            return jsonify({"error": "Authorization failed."}), 403
+        flash("Authorization failed.", "error")
+        return redirect(url_for('home'))
+
+    if as_json:
+        data = request.get_json(silent=True)
+        data = data if isinstance(data, dict) else {}
+        action, raw_ids = data.get('action'), data.get('post_ids')
+        # Only a list of ints: "123" or {"1": ...} would otherwise iterate into other posts' ids
+        if not isinstance(raw_ids, list) or not all(type(post_id) is int for post_id in raw_ids):
+            raw_ids = []  # rejected with a 400 below
+    else:
+        action, raw_ids = request.form.get('action'), request.form.getlist('post_ids')
+    back = url_for('dashboard', pending_cursor=request.form.get('pending_cursor') or None,
+                   approved_cursor=request.form.get('approved_cursor') or None)
+    try:
+        post_ids = sorted({int(post_id) for post_id in raw_ids})
+    except (TypeError, ValueError):
+        post_ids = None
+
+    if action not in MODERATION_ACTIONS or not post_ids or len(post_ids) > MAX_BULK_POSTS:
+        message = (f"Pick an action ({', '.join(MODERATION_ACTIONS)}) and between 1 and "
+                   f"{MAX_BULK_POSTS} posts.")
+        if as_json:
+            return jsonify({"error": message}), 400
+        flash(message, 'error')
+        return redirect(back)
+
+    try:
+        affected = moderate(action, post_ids)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        if as_json:
+            return jsonify({"error": f"Error moderating posts: {e}"}), 500
+        flash(f'Error moderating posts: {e}', 'error')
+        return redirect(back)
+
+    if as_json:
+        return jsonify({"action": action, "post_ids": affected})
+    flash(f"{action.capitalize()}d {len(affected)} of {len(post_ids)} selected post(s).", 'success')
+    return redirect(back)
+
+
+@route("/post_food", methods=["GET", "POST"])
+@login_required
+def post_food():
+    if request.method == "POST":
+        # 1. Check for the image file
+        if 'image' not in request.files or request.files['image'].filename == '':
+            flash('No image file was provided!', 'error')
+            return redirect(request.url)
+
+        file_to_upload = request.files['image']
+        image_data = file_to_upload.read()
+        image_name = secure_filename(file_to_upload.filename)
+
+        # 2. Create the database record with a placeholder image; the upload
+        #    is queued with it and runs in the background (see uploads.py)
+        new_post = FoodPost(
+            food_name=request.form['food_name'],
+            description=request.form['description'],
+            quantity=request.form['quantity'],
+            phone_number=request.form['phone_number'],
+            city=request.form['city'],
+            lat=float(request.form['lat']),
+            lon=float(request.form['lon']),
+            image_url=PLACEHOLDER_IMAGE_URL,
+            image_status=IMAGE_PENDING,
+            expires_at=post_expiry(request.form.get('available_for', type=float), current_app.config['POST_TTL_HOURS']),
+            author=current_user
+        )
+        new_post.geohash = encode_geohash(new_post.lat, new_post.lon)
+        db.session.add(new_post)
+        queue_upload(new_post, image_data, image_name)
+        adjust_counts(current_user.id, donations_count=1, available_count=1)
+        # 3. The upload workers pick the image up once this commits
+        db.session.commit()
+        flash('Food post request sent to admin!', 'success')
+        return redirect(url_for('home'))
+
+    # This is for the GET request (first time loading the page)
+    return render_template('post_food.html', ttl_choices=POST_TTL_CHOICES, default_ttl=current_app.config['POST_TTL_HOURS'])
+
+@route("/post/<int:post_id>")
+@login_required
+def post_details(post_id):
+    # Fetch the specific post (and its author) by its ID, or show a 404 error if not found
+    post = post_with_author(post_id)
+    return render_template('post_details.html', post=post)
+
+@route('/profile/<username>')
+@login_required
+def profile(username):
+    # Read the row fresh: on your own profile the identity map holds the cached current_user,
+    # whose counters and updated_at can lag behind the database (like dashboard)
+    user = User.query.filter_by(username=username).populate_existing().first_or_404()
+    
+    # --- Donation and Rating Stats are counters on the user row, no extra queries ---
+    return render_template(
+        'profile.html', 
+        user=user, 
+        total_donations=user.donations_count,
+        successful_pickups=user.claimed_count,
+        currently_available=user.available_count,
+        rating_counts=user.rating_counts,
+        food_claimed=user.food_claimed_count
+    )
+
+
+# --- API Endpoint for Nearby Posts ---
+# Used by the search page; the versioned API (api.py) has the same data at /api/v1/posts
+NEARBY_FIELDS = ('id', 'food_name', 'description', 'quantity', 'city', 'image_url', 'thumbnail_url',
+                 'author_username', 'distance_km')
+
+@route("/api/nearby_posts")
+@login_required
+def nearby_posts():
+    # Get user's location and radius from request arguments
+    try:
+        user_lat = float(request.args.get('lat'))
+        user_lon = float(request.args.get('lon'))
+        radius_km = float(request.args.get('radius_km', 5)) # Default radius is 5 km
+    except (TypeError, ValueError):
+        return jsonify({"error": "Invalid location or radius parameters."}), 400
+    # nan fails every comparison, so test finiteness first
+    if (not math.isfinite(radius_km) or radius_km <= 0
+            or not -90 <= user_lat <= 90 or not -180 <= user_lon <= 180):
+        return jsonify({"error": "Invalid location or radius parameters."}), 400
+    # Optional text query: results are then ranked by relevance (see search.py)
+    q = request.args.get('q', '').strip()
+    try:
+        cursor = request.args.get('cursor') or None
+        if cursor:
+            if q:
+                # Ranked results page by offset, so the cursor is just a number
+                if int(cursor) < 0:
+                    raise ValueError(cursor)
+            else:
+                decode_distance_cursor(cursor)
+        limit = min(int(request.args.get('limit', PAGE_SIZE)), MAX_PAGE_SIZE)
+    except ValueError:
+        return jsonify({"error": "Invalid cursor or limit."}), 400
+    if limit <= 0:
+        return jsonify({"error": "Invalid cursor or limit."}), 400
+
+    etag = make_etag(*live_feed_stamp())
+    cached = not_modified(etag)
+    if cached:
+        return cached
+
+    if q:
+        page, in_range, next_offset = search_nearby(q, user_lat, user_lon, radius_km, *LIVE_POST_FILTER,
+                                                    offset=int(cursor or 0), limit=limit)
+        next_cursor = str(next_offset) if next_offset is not None else None
+    else:
+        page, in_range, next_cursor = nearby_page(user_lat, user_lon, radius_km, cursor, limit)
+    nearby_posts_data = [POST_SCHEMA.dump(post, NEARBY_FIELDS, distance_km=round(in_range[post.id], 2))
+                         for post in page]
+    
+    return set_validators(jsonify({"posts": nearby_posts_data, "next_cursor": next_cursor}), etag)
+
+@route("/api/posts/<int:post_id>/image_status")
+@login_required
+def image_status(post_id):
+    post = FoodPost.query.get_or_404(post_id)
+    return jsonify({"id": post.id, "image_status": post.image_status, "image_url": post.image_url})
+
+# Route to create a new request
+@route('/request_food/<int:post_id>', methods=['POST'])
+@login_required
+def request_food(post_id):
+    post = FoodPost.query.get_or_404(post_id)
+    # Prevent user from requesting their own post
+    if post.author.id == current_user.id:
+        flash('You cannot request your own food post.', 'error')
+        return redirect(url_for('post_details', post_id=post.id))
+    if post.status == 'expired':
+        flash('This post has expired.', 'info')
+        return redirect(url_for('post_details', post_id=post.id))
+    
+    # Duplicates are caught by the unique (requester_id, food_id) index, so two
+    # concurrent clicks can't both get in between a check and the insert
+    new_request = Request(requester_id=current_user.id, food_id=post.id)
+    db.session.add(new_request)
+    try:
+        db.session.flush()
+    except IntegrityError:
+        db.session.rollback()
+        flash('You have already requested this item.', 'info')
+        return redirect(url_for('post_details', post_id=post_id))
+    # Only the donor gets this one
+    event_feed.publish('request-received', {
+        "request_id": new_request.id, "post_id": post.id, "food_name": post.food_name,
+        "requester_username": current_user.username,
+    }, user_id=post.user_id)
+    db.session.commit()
+    flash('Your request has been sent to the donor!', 'success')
+    return redirect(url_for('post_details', post_id=post.id))
+
+
+# --- Live feed: SSE stream with a long-poll fallback (see events.py) ---
+# How long a client turned away for lack of listener slots waits before trying again
+LISTENER_RETRY_SECONDS = 15
+
+def event_json(ev):
+    return {"id": ev.id, "type": ev.type, "data": ev.data}
+
+def feed_position(value):
+    """A client's live-feed position, or None when it's missing or malformed."""
+    if not value:
+        return None
+    try:
+        parse_position(value)
+    except ValueError:
+        return None
+    return value
+
+@route('/events/stream')
+@login_required
+def event_stream():
+    user_id = current_user.id
+    # EventSource sends Last-Event-ID when it reconnects; start from "now" otherwise
+    position = (feed_position(request.headers.get('Last-Event-ID'))
+                or feed_position(request.args.get('after'))
+                or event_feed.start())
+    stream_seconds = current_app.config['EVENT_STREAM_SECONDS']
+    # Don't keep the request's pooled connection checked out for the whole stream
+    db.session.close()
+    if not event_feed.join():
+        # Every listener slot is taken: EventSource gives up on a 503, and the page retries later
+        return Response(f"retry: {LISTENER_RETRY_SECONDS * 1000}\n\n", status=503, mimetype='text/event-stream',
+                        headers={'Retry-After': str(LISTENER_RETRY_SECONDS)})
+
+    def generate(position):
+        yield "retry: 2000\n\n"
+        deadline = time.monotonic() + stream_seconds
+        while (remaining := deadline - time.monotonic()) > 0:
+            events, new_position = event_feed.read(position, user_id, timeout=min(remaining, 15))
+            if events:
+                # The last event of a batch carries the position to resume from
+                for ev in events[:-1]:
+                    yield format_sse(ev)
+                yield format_sse(events[-1], new_position)
+            elif new_position != position:
+                yield f"id: {new_position}\n\n"  # no event, but the reconnect point moved
+            else:
+                yield ": keep-alive\n\n"
+            position = new_position
+
+    response = Response(stream_with_context(generate(position)), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    # Runs when the server closes the response, even if the stream never started
+    response.call_on_close(event_feed.leave)
+    return response
+
+@route('/events/poll')
+@login_required
+def event_poll():
+    user_id = current_user.id
+    after = feed_position(request.args.get('after'))
+    if after is None:
+        # First call: just hand out the starting point
+        return jsonify({"events": [], "last_id": event_feed.start()})
+    timeout = min(request.args.get('timeout', current_app.config['EVENT_POLL_SECONDS'], type=float),
+                  current_app.config['EVENT_POLL_SECONDS'])
+    db.session.close()
+    if not event_feed.join():
+        return (jsonify({"error": "Too many live connections, try again shortly.",
+                         "retry_after": LISTENER_RETRY_SECONDS}),
+                503, {'Retry-After': str(LISTENER_RETRY_SECONDS)})
+    try:
+        events, position = event_feed.read(after, user_id, timeout=max(timeout, 0))
+    finally:
+        event_feed.leave()
+    # last_id is an opaque position (see events.py); pass it back as after
+    return jsonify({"events": [event_json(ev) for ev in events], "last_id": position})
+
+
+@route('/search')
+@login_required
+def search():
+    return render_template('search.html')
+
+# Route to accept or decline a request
+@route('/handle_request/<int:request_id>/<action>')
+@login_required
+def handle_request(request_id, action):
+    req = Request.query.get_or_404(request_id)
+    # Security check
+    if req.food_post.author.id != current_user.id:
+        flash('You are not authorized to perform this action.', 'error')
+        return redirect(url_for('home'))
+
+    # Lock the post, then re-read the request: a concurrent click may have changed either
+    post = lock_post(req.food_id)
+    db.session.refresh(req)
+
+    if action == 'accept':
+        was_claimed = post.status == 'claimed'
+        if not accept_request(req, post):
+            db.session.rollback()
+            flash('This post is no longer available: it has been claimed or has expired.', 'error')
+            return redirect(url_for('dashboard'))
+        if not was_claimed:
+            event_feed.publish('post-claimed', {"post_id": req.food_id, "request_id": req.id})
+
+        flash(f"You have accepted the request from {req.requester.username}. The post is now marked as claimed.", 'success')
+
+    elif action == 'decline':
+        decline_request(req)
+        flash(f"You have declined the request from {req.requester.username}.", 'info')
+    
+    db.session.commit()
+    return redirect(url_for('dashboard'))
+
+
+@route('/delete_post/<int:post_id>', methods=['POST'])
+@login_required
+def delete_post(post_id):
+    post = FoodPost.query.get_or_404(post_id)
+    
+    # NEW SECURITY CHECK: Allow deletion if current_user is the author OR is an admin
+    if post.author.id != current_user.id and not current_user.is_admin:
+        flash('You are not authorized to delete this post.', 'error')
+        return redirect(url_for('dashboard'))
+    
+    try:
+        # Queue the image and its thumbnail for deletion; they are removed from
+        # storage in the background once this transaction commits
+        queue_deletion(post.image_url, post.thumbnail_url)
+
+        # Undo the post's contribution to the stats counters. Its requests and
+        # their ratings go with it (cascade), so those counts drop as well.
+        if post.status == 'claimed':
+            adjust_counts(post.user_id, donations_count=-1, claimed_count=-1)
+        elif post.status == 'expired':
+            adjust_counts(post.user_id, donations_count=-1)
+        else:
+            adjust_counts(post.user_id, donations_count=-1, available_count=-1)
+        for req in post.requests:
+            if req.status == 'accepted':
+                adjust_counts(req.requester_id, food_claimed_count=-1)
+            for rating in req.ratings:
+                column = rating_column(rating.score)
+                if column:
+                    adjust_counts(rating.to_user_id, **{column: -1})
+
+        # Delete the post from the database
+        db.session.delete(post)
+        db.session.commit()
+        flash('The post has been deleted.', 'success')  # Changed message to be generic for admin
+    except Exception as e:
+        db.session.rollback()
+        flash(f'Error deleting post: {e}', 'error')
+        
+    return redirect(url_for('dashboard'))
+
+@route('/edit_post/<int:post_id>', methods=['GET', 'POST'])
+@login_required
+def edit_post(post_id):
+    post = FoodPost.query.get_or_404(post_id)
+    
+    # Security check
+    if post.author.id != current_user.id:
+        flash('You are not authorized to edit this post.', 'error')
+        return redirect(url_for('home'))
+
+    if request.method == 'POST':
+        # Update text fields
+        post.food_name = request.form['food_name']
+        post.description = request.form['description']
+        post.quantity = request.form['quantity']
+        post.phone_number = request.form['phone_number']
+        
+        # Update location
+        post.lat = float(request.form['lat'])
+        post.lon = float(request.form['lon'])
+        post.geohash = encode_geohash(post.lat, post.lon)
+        post.city = request.form['city']
+        
+        # Handle optional new image upload. The current image stays up until the
+        # background upload finishes; the worker then swaps it and deletes the old one.
+        if 'image' in request.files:
+            file = request.files['image']
+            if file.filename != '': # Simply check if a file was actually provided
+                queue_upload(post, file.read(), secure_filename(file.filename))
+                post.image_status = IMAGE_PENDING
+
+        db.session.commit()
+        flash('Your post has been updated!', 'success')
+        return redirect(url_for('dashboard'))
+
+    # For a GET request, show the pre-filled form
+    return render_template('edit_post.html', post=post)
+
+@route('/submit_rating/<int:request_id>', methods=['POST'])
+@login_required
+def submit_rating(request_id):
+    req = Request.query.get_or_404(request_id)
+    score = int(request.form.get('score'))
+    comment = request.form.get('comment')  
+    # Security checks
+    if req.requester_id != current_user.id:
+        flash("You can only rate requests you made.", "error")
+        return redirect(url_for('dashboard'))
+    if req.status != 'accepted':
+        flash("You can only rate completed pickups.", "error")
+        return redirect(url_for('dashboard'))
+
+    # Prevent duplicate ratings
+    existing_rating = Rating.query.filter_by(request_id=request_id, from_user_id=current_user.id).first()
+    if existing_rating:
+        flash("You have already rated this pickup.", "info")
+        return redirect(url_for('dashboard'))
+
+    # Find the user to be rated (the donor)
+    donor = req.food_post.author
+    
+    # Create the new rating
+    new_rating = Rating(
+        score=score,
+        comment=comment,
+        from_user_id=current_user.id,
+        to_user_id=donor.id,
+        request_id=req.id
+    )
+    db.session.add(new_rating)
+    
+    # Update the donor's average rating
+    total_score = (donor.avg_rating * donor.num_ratings) + score
+    donor.num_ratings += 1
+    donor.avg_rating = round(total_score / donor.num_ratings, 2)
+    column = rating_column(score)
+    if column:
+        adjust_counts(donor.id, **{column: 1})
+    
+    db.session.commit()
+    flash("Thank you for your feedback!", "success")
+    return redirect(url_for('dashboard'))
+
+@route('/admin/cache_stats')
+@login_required
+def cache_stats():
+    # Per-worker counters, so hit each gunicorn worker to see the full picture
+    if not current_user.is_admin:
+        return jsonify({"error": "Authorization failed."}), 403
+    return jsonify({"live_posts": live_posts.stats(), "nearby": nearby_results.stats(),
+                    "users": user_cache.stats(), "fragments": fragment_cache.stats()})
+
+@route('/admin/deletion_stats')
+@login_required
+def deletion_stats():
+    if not current_user.is_admin:
+        return jsonify({"error": "Authorization failed."}), 403
+    return jsonify(deletion_flusher.stats())
+
+@route('/admin/upload_stats')
+@login_required
+def upload_stats():
+    if not current_user.is_admin:
+        return jsonify({"error": "Authorization failed."}), 403
+    return jsonify(upload_queue.stats())
+
+@route('/admin/sweep_stats')
+@login_required
+def sweep_stats():
+    if not current_user.is_admin:
+        return jsonify({"error": "Authorization failed."}), 403
+    return jsonify(post_sweeper.stats())